@@ -0,0 +1,76 @@
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emailverifier.lists import ListsError, load_lists
+from emailverifier.roles import ROLE_SEPARATORS, RoleMatcher
+
+# Compares the old per-address scan over every role prefix with the compiled
+# matcher on a synthetic list (about 10% role addresses).
+#   python benchmarks/bench_role_matcher.py [-n 1000000] [--roles roles.txt]
+
+def load_roles(path):
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            return {line.strip().lower() for line in f if line.strip()}
+    try:
+        return load_lists(free=False).roles  # The local snapshot the verifiers use
+    except ListsError as e:
+        print(f"{e}\nUsing 400 random prefixes instead.")
+        rng = random.Random(1)
+        return {''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(400)}
+
+def make_locals(roles, n):
+    rng = random.Random(42)
+    roles = sorted(roles)
+    local_parts = []
+    for _ in range(n):
+        if rng.random() < 0.1:
+            local_parts.append(rng.choice(roles) + rng.choice(['', '.sales', '-us', '_eu', 'x']))
+        else:
+            local_parts.append(''.join(rng.choices(string.ascii_lowercase + '.', k=rng.randint(4, 16))))
+    return local_parts
+
+def linear_scan(roles, separators):
+    def is_role_based(local):
+        return any(local == p or local.startswith(p + sep) for p in roles for sep in separators)
+    return is_role_based
+
+def timed(fn, local_parts):
+    start = time.perf_counter()
+    hits = sum(1 for local in local_parts if fn(local))
+    return time.perf_counter() - start, hits
+
+def main():
+    parser = argparse.ArgumentParser(description="Role-prefix matcher microbenchmark")
+    parser.add_argument('-n', type=int, default=1_000_000, help="Addresses to check")
+    parser.add_argument('--sample', type=int, default=20_000, help="Addresses timed with the slow scan (extrapolated to -n)")
+    parser.add_argument('--roles', help="Role list file (default: the verifiers' list snapshot)")
+    args = parser.parse_args()
+
+    roles = load_roles(args.roles)
+    local_parts = make_locals(roles, args.n)
+    sample = local_parts[:args.sample]
+    print(f"{len(roles)} role prefixes, {len(local_parts):,} addresses")
+
+    for separators in (ROLE_SEPARATORS, ROLE_SEPARATORS + ('',)):
+        start = time.perf_counter()
+        matcher = RoleMatcher(roles, separators)
+        build = time.perf_counter() - start
+        scan = linear_scan(roles, separators)
+        mismatches = sum(1 for local in sample if matcher(local) != scan(local))
+
+        scan_time, _ = timed(scan, sample)
+        scan_time *= len(local_parts) / max(1, len(sample))
+        matcher_time, hits = timed(matcher, local_parts)
+        print(f"\nseparators {separators!r}: {hits:,} role addresses, {mismatches} mismatches on the sample")
+        print(f"  linear scan  {scan_time:8.2f}s (extrapolated from {len(sample):,})")
+        print(f"  compiled     {matcher_time:8.2f}s (+{build * 1000:.1f}ms build)  -> {scan_time / matcher_time:,.0f}x faster")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+import argparse
+import ast
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+
+from fake_smtp_farm import BASE_PORT, DNS_PORT, DOMAIN_SUFFIX, PROFILES, Farm
+
+# End-to-end throughput of the verifiers against the local fake SMTP/DNS farm
+# (tools/fake_smtp_farm.py). Every target runs in its own process so peak
+# memory is its own; the farm runs in this one and is reset between targets.
+#   cli, cli-async         email_verifier_ultimate.main() (thread pool / async engine)
+#   thorough, fast, max    the shared Pipeline with that profile, as the GUIs run it
+#                          (email_verifier_gui / _gui_fast / _gui_max with their default settings)
+#
+#   python benchmarks/bench_verifiers.py [-n 10000] [--targets cli,max] [--servers fast,slow,greylist]
+#   python benchmarks/bench_verifiers.py --set PER_HOST_RATE=0 --set MAX_WORKERS=50 --save after.json --baseline before.json
+# Latency is per address: read from the input until its result came out.
+# A second table breaks the time down by stage (p95 of each, from the
+# engine's metrics: DNS, TCP connect, banner, HELO, MAIL, RCPT, local checks).
+# Retries are off unless --set RETRY_DELAYS=... (CLI) or --set retry_delays=...
+# (profiles) is given, so greylisted addresses end up Unknown.
+
+CLI_TARGETS = {'cli': False, 'cli-async': True}  # target -> ASYNC_ENGINE
+PROFILE_TARGETS = ('thorough', 'fast', 'max')
+
+def make_list(path, n, domains, invalid, no_mx, seed=42):
+    # ok* mailboxes exist on the farm, no* don't, nx* domains have no MX
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(n):
+            roll = rng.random()
+            if roll < no_mx:
+                f.write(f"user{i}@nx{i}{DOMAIN_SUFFIX}\n")
+            else:
+                local = 'no' if roll < no_mx + invalid else 'ok'
+                f.write(f"{local}{i}@d{rng.randrange(domains)}{DOMAIN_SUFFIX}\n")
+
+def use_stub_dns(port):
+    # Every dnspython lookup in this process goes to the farm's DNS server
+    import dns.asyncresolver
+    import dns.resolver
+    for module in (dns.resolver, dns.asyncresolver):
+        resolver = module.Resolver(configure=False)
+        resolver.nameservers = ['127.0.0.1']
+        resolver.port = port
+        module.default_resolver = resolver
+
+def peak_memory_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def parse_setting(text):
+    name, _, value = text.partition('=')
+    try:
+        return name, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return name, value
+
+def timed_backend(latencies, statuses):
+    # Wraps SMTPBackend.verify to time every address from being read to its result (and count the statuses)
+    from emailverifier.backends import SMTPBackend
+    verify = SMTPBackend.verify
+
+    def timed_verify(self, emails):
+        read_at = {}
+
+        def reading():
+            for email in emails:
+                read_at[email] = time.perf_counter()
+                yield email
+
+        for email, result in verify(self, reading()):
+            latencies.append(time.perf_counter() - read_at.pop(email))
+            statuses[result.status] = statuses.get(result.status, 0) + 1
+            yield email, result
+
+    SMTPBackend.verify = timed_verify
+
+def run_cli(list_path, settings, async_engine):
+    import email_verifier_ultimate as cli
+    from emailverifier.lists import Lists
+    cli.INPUT_FILE = list_path
+    cli.RESULTS_DB_FILE = None
+    cli.RETRY_DELAYS = ()
+    cli.ASYNC_ENGINE = async_engine
+    cli.load_lists = lambda free=True: Lists(set(), set(), set(), 'bench')  # Synthetic domains are on no list
+    for name, value in settings:
+        setattr(cli, name, value)
+
+    latencies, statuses = [], {}
+    timed_backend(latencies, statuses)
+    sys.argv = ['email_verifier_ultimate.py']
+    start = time.perf_counter()
+    cli.main()
+    return time.perf_counter() - start, latencies, statuses
+
+def run_profile(list_path, settings, name):
+    from emailverifier.backends import SMTPBackend
+    from emailverifier.pipeline import PROFILES, Pipeline
+    from emailverifier.prefilter import ListChecker
+    profile = PROFILES[name]._replace(retry_delays=())
+    profile = profile._replace(**{key: value for key, value in settings if key in profile._fields})
+    with open(list_path, 'r', encoding='utf-8') as f:
+        emails = [line.strip() for line in f if line.strip()]
+
+    latencies, statuses = [], {}
+    timed_backend(latencies, statuses)
+    start = time.perf_counter()
+    Pipeline(SMTPBackend(profile), ListChecker()).run(emails, lambda email, result, stage, row: None)
+    return time.perf_counter() - start, latencies, statuses
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def worker(args):
+    # Runs one target (in a fresh process, with the farm already up) and writes its numbers to args.report
+    from emailverifier.metrics import REGISTRY
+    use_stub_dns(args.dns_port)
+    settings = [parse_setting(s) for s in args.set]
+    if args.worker in CLI_TARGETS:
+        elapsed, latencies, statuses = run_cli(args.list, settings, CLI_TARGETS[args.worker])
+    else:
+        elapsed, latencies, statuses = run_profile(args.list, settings, args.worker)
+    latencies.sort()
+    with open(args.list, 'r', encoding='utf-8') as f:
+        total = sum(1 for line in f if line.strip())
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump({'addresses': total, 'seconds': elapsed, 'per_second': total / elapsed if elapsed else 0.0,
+                   'p50': percentile(latencies, 0.50), 'p99': percentile(latencies, 0.99),
+                   'peak_mb': peak_memory_mb(), 'unknown': statuses.get('Unknown', 0),
+                   'stages': {stage['stage']: stage['p95'] for stage in REGISTRY.stage_summary()}}, f)
+
+def run_target(target, args, list_path, workdir):
+    # Fresh working directory: no DNS/catch-all cache or outputs carried over between targets
+    os.makedirs(workdir)
+    report = os.path.join(workdir, 'report.json')
+    command = [sys.executable, os.path.abspath(__file__), '--worker', target, '--list', list_path,
+               '--dns-port', str(args.dns_port), '--report', report]
+    for setting in args.set:
+        command += ['--set', setting]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.environ.get('PYTHONPATH', '')]))
+    completed = subprocess.run(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if completed.returncode or not os.path.exists(report):
+        print(f"{target}: failed\n{completed.stderr[-2000:]}")
+        return None
+    with open(report, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def ms(seconds):
+    return f"{seconds * 1000:9.1f}" if seconds is not None else f"{'n/a':>9}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifier throughput against a local fake SMTP/DNS farm")
+    parser.add_argument('-n', type=int, default=10_000, help="Addresses in the synthetic list")
+    parser.add_argument('--domains', type=int, default=500, help="Distinct domains in the list")
+    parser.add_argument('--invalid', type=float, default=0.3, help="Share of addresses whose mailbox doesn't exist")
+    parser.add_argument('--no-mx', type=float, default=0.02, help="Share of addresses on domains without MX")
+    parser.add_argument('--targets', default=','.join([*CLI_TARGETS, *PROFILE_TARGETS]),
+                        help=f"Comma-separated ({', '.join([*CLI_TARGETS, *PROFILE_TARGETS])})")
+    parser.add_argument('--servers', default='fast,slow,greylist,strict',
+                        help=f"Farm mail server profiles, one server each ({', '.join(PROFILES)})")
+    parser.add_argument('--dns-latency', type=float, default=0.0, help="Seconds before each DNS answer")
+    parser.add_argument('--base-port', type=int, default=BASE_PORT)
+    parser.add_argument('--dns-port', type=int, default=DNS_PORT)
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help="Override a CLI config constant (e.g. PER_HOST_RATE=0), or a profile field (e.g. workers=80)")
+    parser.add_argument('--save', help="Write the results as JSON (to compare later runs)")
+    parser.add_argument('--baseline', help="Results JSON from --save to compare against")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--list', help=argparse.SUPPRESS)
+    parser.add_argument('--report', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    targets = args.targets.split(',')
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='bench_verifiers_') as tmp, \
+            Farm(args.servers.split(','), args.base_port, args.dns_port, args.dns_latency) as farm:
+        list_path = os.path.join(tmp, 'emails.txt')
+        make_list(list_path, args.n, args.domains, args.invalid, args.no_mx)
+        print(f"{args.n:,} addresses on {args.domains:,} domains, servers: {args.servers}")
+        print(f"\n{'target':10} {'addr/s':>9} {'seconds':>9} {'p50 ms':>9} {'p99 ms':>9} {'peak MB':>8} "
+              f"{'sessions':>9} {'refused':>8} {'RCPTs':>9} {'unknown':>8}")
+        for target in targets:
+            farm.reset()
+            result = run_target(target, args, list_path, os.path.join(tmp, target))
+            if result is None:
+                continue
+            servers = farm.stats()['servers'].values()
+            result['sessions'] = sum(server['connections'] for server in servers)
+            result['refused'] = sum(server['refused'] for server in servers)
+            result['rcpt'] = sum(server['rcpt'] for server in servers)
+            results[target] = result
+            peak = f"{result['peak_mb']:8.0f}" if result['peak_mb'] is not None else f"{'n/a':>8}"
+            line = (f"{target:10} {result['per_second']:9.1f} {result['seconds']:9.1f} "
+                    f"{ms(result['p50'])} {ms(result['p99'])} {peak} {result['sessions']:9,} {result['refused']:8,} "
+                    f"{result['rcpt']:9,} {result['unknown']:8,}")
+            if target in baseline and baseline[target]['per_second']:
+                line += f"  ({result['per_second'] / baseline[target]['per_second'] - 1:+.0%} addr/s vs baseline)"
+            print(line)
+
+    from emailverifier.metrics import STAGES
+    print(f"\n{'p95 ms':10} " + ' '.join(f"{stage:>9}" for stage in STAGES))
+    for target, result in results.items():
+        print(f"{target:10} " + ' '.join(ms(result.get('stages', {}).get(stage)) for stage in STAGES))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'args': {k: v for k, v in vars(args).items() if k not in ('worker', 'list', 'report')},
+                       'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
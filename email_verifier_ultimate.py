@@ -1,117 +1,118 @@
-import re
-import dns.resolver
-import smtplib
-import socket
-import time
-import requests
+import argparse
 import csv
+import logging
 import os
-from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from emailverifier.backends import SMTPBackend
+from emailverifier.catch_all import CatchAllCache
+from emailverifier.checkpoint import Checkpoint
+from emailverifier.dns_cache import DNSCache
+from emailverifier.lists import ListsError, load_lists, make_checker
+from emailverifier.logs import start_logging
+from emailverifier.metrics import REGISTRY, STAGES, start_metrics_server
+from emailverifier.mx_health import HealthRegistry
+from emailverifier.pipeline import DUPLICATE, PROFILES, STORED, Pipeline
+from emailverifier.result_store import ResultStore
+from emailverifier.smtp_session import INVALID, UNKNOWN, VALID
 
 # Config
 INPUT_FILE = 'emails.csv'                  # Can be .txt or .csv (one email per line or in first column)
 VALID_OUTPUT = 'valid_emails.csv'
 INVALID_OUTPUT = 'invalid_emails.csv'
+UNKNOWN_OUTPUT = 'unknown_emails.csv'       # Still temporary failures after every retry (greylisting, timeouts)
 LOG_FILE = 'verification_log.txt'
-DISPOSABLE_LIST_URL = 'https://raw.githubusercontent.com/disposable-email-domains/disposable-email-domains/main/disposable_email_blocklist.conf'
-ROLE_LIST_URL = 'https://raw.githubusercontent.com/mixmaxhq/role-based-email-addresses/master/roles.txt'  # ~400 common roles
-SENDER_EMAIL = 'verifier@example.com'      # Fake sender
-TIMEOUT = 10                               # Connection timeout
-MAX_WORKERS = 20                           # Parallel threads
-BATCH_SIZE = 100                           # 0 = no batching
-DELAY_BETWEEN_BATCHES = 10                 # Seconds
+LOG_JSON = False                           # One JSON object per line (time, level, message, email, status, ...) instead of text
+LOG_MAX_BYTES = 50 * 1024 * 1024           # Rotate the log at this size (0 = never)
+LOG_BACKUPS = 3                            # Rotated logs kept (verification_log.txt.1, .2, ...)
+CONSOLE_LEVEL = 'DEBUG'                    # 'DEBUG' = every address, 'INFO' = progress and summary only, 'WARNING' = problems only
+PROGRESS_EVERY = 1000                      # Addresses between progress lines (0 = none)
+METRICS_PORT = 9108                        # Live Prometheus metrics at http://127.0.0.1:9108/metrics during the run (None = off)
+PROFILE = 'thorough'                       # thorough / fast / max (see emailverifier/pipeline.py)
+# None = the profile's value (thorough's shown in brackets)
+SENDER_EMAIL = None                        # Fake sender [verifier@example.com]
+TIMEOUT = None                             # Connection timeout [10]
+MAX_WORKERS = None                         # Parallel threads (a cap with ADAPTIVE_CONCURRENCY) [50]
+WINDOW_SIZE = None                         # Max addresses read ahead of finished results (memory stays flat) [2000]
+PREFILTER_PROCESSES = os.cpu_count() or 1  # Processes for the syntax/disposable/role checks (1 = in-process)
+PER_HOST_RATE = None                       # New SMTP sessions per second per MX host (0 = unlimited) [2.0]
+PER_HOST_BURST = None                      # Sessions an idle MX host may get back to back [5]
+PER_HOST_MAX_CONNECTIONS = None            # Simultaneous sessions per MX host (both engines; a cap with ADAPTIVE_CONCURRENCY) [5]
+ADAPTIVE_CONCURRENCY = None                # Learn how many sessions each MX host and the run take from latency and 4xx/timeouts [True]
 EMAIL_COLUMN = 0                           # Column index for email in CSV (0 = first column)
+SESSION_REUSE = None                       # One SMTP session per domain (many RCPT TO per connection) [True]
+RCPT_PER_TRANSACTION = None                # RCPT TO per MAIL transaction (RSET between) [20]
+MAX_RCPT_PER_SESSION = None                # Recipients per MX connection before reconnecting [100]
+ASYNC_ENGINE = None                        # asyncio engine instead of the thread pool [False]
+ASYNC_MAX_CONCURRENCY = None               # Probes in flight (async engine) [1000]
+MX_RACE = None                             # Race backup MX hosts after a short stagger instead of trying them one by one [True]
+MX_RACE_STAGGER = None                     # Seconds the preferred MX gets before the next one joins [0.25]
+RETRY_DELAYS = None                        # Backoff (seconds) before re-probing a temporary failure; () = no retries [(60, 300, 900)]
+CIRCUIT_FAILURES = 3                       # Unanswered probes in a row before an MX is skipped ("MX unreachable")
+CIRCUIT_COOLDOWN = 120                     # Seconds a failing MX is skipped before it is tried again
+CATCH_ALL_CHECK = None                     # Probe each domain once with a random address; accept-all domains skip per-address probes [True]
+CATCH_ALL_TTL = 86400                      # Seconds a domain's catch-all verdict is reused
+DNS_CACHE_FILE = 'dns_cache.sqlite3'       # Persistent MX cache shared across runs (honours record TTLs)
+RESULTS_DB_FILE = 'verification_results.sqlite3'  # Durable per-address results (None = always probe everything)
+FRESHNESS_DAYS = 30                        # Only re-probe addresses whose stored result is older than this
+CHECKPOINT_FILE = 'verification_checkpoint.json'  # Progress snapshot for --resume
+CHECKPOINT_INTERVAL = 30                   # Seconds between checkpoints
+CANONICALIZE = False                       # Provider aliases are one mailbox (Gmail dots, +tags at Gmail/Outlook/iCloud/...)
 
-disposable_domains = set()
-role_prefixes = set()
-
-def log_message(message):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_entry = f"[{timestamp}] {message}\n"
-    print(message)
-    with open(LOG_FILE, 'a', encoding='utf-8') as logf:
-        logf.write(log_entry)
+dns_cache = DNSCache(DNS_CACHE_FILE)
+catch_all_cache = CatchAllCache(DNS_CACHE_FILE, CATCH_ALL_TTL)
+mx_health = HealthRegistry(CIRCUIT_FAILURES, CIRCUIT_COOLDOWN)
 
-def load_disposable_domains():
-    global disposable_domains
-    log_message("Downloading latest disposable domains list...")
-    try:
-        response = requests.get(DISPOSABLE_LIST_URL, timeout=15)
-        response.raise_for_status()
-        disposable_domains = {line.strip().lower() for line in response.text.splitlines() if line.strip()}
-        log_message(f"Loaded {len(disposable_domains)} disposable domains.")
-    except Exception as e:
-        log_message(f"Warning: Could not download disposable list ({e}). Continuing without.")
+log_writer = None  # Set up by main()
 
-def load_role_prefixes():
-    global role_prefixes
-    log_message("Downloading latest role-based prefixes list...")
-    try:
-        response = requests.get(ROLE_LIST_URL, timeout=15)
-        response.raise_for_status()
-        role_prefixes = {line.strip().lower() for line in response.text.splitlines() if line.strip()}
-        log_message(f"Loaded {len(role_prefixes)} role-based prefixes.")
-    except Exception as e:
-        log_message(f"Warning: Could not download role list ({e}). Continuing without role detection.")
+def log_message(message, level=logging.INFO, **fields):
+    # Queued for the background log writer (see start_logging); fields go into LOG_JSON lines
+    log_writer.log(level, message, fields)
 
-def is_disposable(email):
-    domain = email.split('@')[1].lower()
-    return domain in disposable_domains
-
-def is_role_based(email):
-    local_part = email.split('@')[0].lower()
-    # Check if local_part starts with any role prefix (or exact match)
-    return any(local_part == prefix or local_part.startswith(prefix + '.') or local_part.startswith(prefix + '-') or local_part.startswith(prefix + '_') for prefix in role_prefixes)
-
-def is_valid_syntax(email):
-    regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(regex, email.strip()) is not None
+def log_concurrency_summary(top=5):
+    # The connection limits the run ended up with: overall and the MX hosts that pushed back hardest
+    limits = mx_health.concurrency.snapshot()
+    overall, _ = limits.pop(None)
+    if not limits:
+        return
+    tightest = sorted(limits.items(), key=lambda item: item[1][0])[:top]
+    log_message(f"Connection limits learnt: {overall} sessions at once overall; tightest MX hosts: "
+                + ', '.join(f"{mx} {limit}" for mx, (limit, _) in tightest))
 
-def get_mx_record(domain):
-    try:
-        records = dns.resolver.resolve(domain, 'MX')
-        mx_hosts = sorted([(r.preference, str(r.exchange).rstrip('.')) for r in records])
-        return [host for _, host in mx_hosts]
-    except Exception:
-        return None
+def log_timing_summary(top=5):
+    # Where the run's time went: every stage the engine timed, the MX hosts
+    # that took longest to talk to and the commonest results
+    stages = REGISTRY.stage_summary()
+    if not stages:
+        return
+    log_message("\n=== Time by stage ===")
+    log_message(f"{'stage':<8}{'count':>10}{'total s':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage in stages:
+        log_message(f"{stage['stage']:<8}{stage['count']:>10,}{stage['seconds']:>10.1f}"
+                    + ''.join(f"{stage[key] * 1000:>10.2f}" for key in ('mean', 'p50', 'p95', 'p99')))
+    hosts = REGISTRY.host_summary(top)
+    if hosts:
+        log_message("Slowest MX hosts:")
+    for mx, seconds, stages in hosts:
+        breakdown = ', '.join(f"{stage} {stages[stage]:.1f}s" for stage in STAGES if stage in stages)
+        log_message(f"  {mx}: {seconds:.1f}s ({breakdown})")
+    log_message("Top results:")
+    for count, status, reason in REGISTRY.result_counts(top):
+        log_message(f"{count:>10,}  {reason}")
 
-def smtp_verify(email, mx_host):
-    try:
-        server = smtplib.SMTP(mx_host, timeout=TIMEOUT)
-        server.ehlo_or_helo_if_needed()
-        server.mail(SENDER_EMAIL)
-        code, _ = server.rcpt(email)
-        server.quit()
-        return code in (250, 251)
-    except Exception:
-        return False
+def build_profile():
+    # PROFILE with every config constant above that isn't None applied on top
+    overrides = {
+        'sender': SENDER_EMAIL, 'timeout': TIMEOUT, 'workers': MAX_WORKERS, 'window': WINDOW_SIZE,
+        'per_host_rate': PER_HOST_RATE, 'per_host_burst': PER_HOST_BURST, 'per_host_connections': PER_HOST_MAX_CONNECTIONS,
+        'session_reuse': SESSION_REUSE, 'rcpt_per_transaction': RCPT_PER_TRANSACTION, 'max_rcpt': MAX_RCPT_PER_SESSION,
+        'async_engine': ASYNC_ENGINE, 'async_concurrency': ASYNC_MAX_CONCURRENCY, 'mx_race': MX_RACE,
+        'mx_stagger': MX_RACE_STAGGER, 'retry_delays': RETRY_DELAYS, 'catch_all_check': CATCH_ALL_CHECK,
+        'adaptive': ADAPTIVE_CONCURRENCY,
+    }
+    return PROFILES[PROFILE]._replace(**{k: v for k, v in overrides.items() if v is not None})
 
-def verify_email(email):
-    email = email.strip().lower()
-    if not email or not is_valid_syntax(email):
-        return False, "Invalid syntax"
-    
-    if is_disposable(email):
-        return False, "Disposable/temporary email"
-    
-    if is_role_based(email):
-        return False, "Role-based email (generic/group)"
-    
-    domain = email.split('@')[1]
-    mx_hosts = get_mx_record(domain)
-    if not mx_hosts:
-        return False, "No MX record (domain inactive)"
-    
-    for mx in mx_hosts[:3]:
-        if smtp_verify(email, mx):
-            return True, "Valid (SMTP accepted)"
-        time.sleep(0.2)
-    
-    return False, "Invalid (SMTP rejected/no response)"
-
-def load_emails_from_file():
-    emails = []
+def iter_emails_from_file():
+    # Generator: one address at a time, never the whole file in memory
     ext = os.path.splitext(INPUT_FILE)[1].lower()
     
     if ext == '.csv':
@@ -122,79 +123,145 @@ def load_emails_from_file():
                     if row and len(row) > EMAIL_COLUMN:
                         email = row[EMAIL_COLUMN].strip()
                         if email:
-                            emails.append(email)
+                            yield email
         except Exception as e:
-            log_message(f"Error reading CSV: {e}")
+            log_message(f"Error reading CSV: {e}", logging.ERROR)
     else:  # .txt or others
         try:
             with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-                emails = [line.strip() for line in f if line.strip()]
+                for line in f:
+                    if line.strip():
+                        yield line.strip()
         except Exception as e:
-            log_message(f"Error reading file: {e}")
-    
-    return emails
+            log_message(f"Error reading file: {e}", logging.ERROR)
 
-def save_csv_results(valid, invalid):
-    # Valid
-    with open(VALID_OUTPUT, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['Email', 'Status', 'Reason'])
-        for email, reason in valid:
-            writer.writerow([email, 'Valid', reason])
-    
-    # Invalid
-    with open(INVALID_OUTPUT, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['Email', 'Status', 'Reason'])
-        for email, reason in invalid:
-            writer.writerow([email, 'Invalid', reason])
+def open_csv_output(path, resume=False):
+    # Line-buffered so every finished result is on disk right away
+    f = open(path, 'a' if resume else 'w', encoding='utf-8', newline='', buffering=1)
+    writer = csv.writer(f)
+    if f.tell() == 0:
+        writer.writerow(['Email', 'Status', 'Reason', 'MX', 'SMTP Code'])
+    return f, writer
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Verify the emails in INPUT_FILE (see Config at the top of this file).")
+    parser.add_argument('--resume', action='store_true',
+                        help=f"continue an interrupted run from {CHECKPOINT_FILE}, appending to the existing outputs")
+    return parser.parse_args()
 
 def main():
-    open(LOG_FILE, 'w').close()  # Clear log
+    global log_writer
+    args = parse_args()
+    if not args.resume:
+        open(LOG_FILE, 'w').close()  # Clear log
+    log_writer = start_logging(logging.getLogger('email_verifier'), LOG_FILE, LOG_JSON, CONSOLE_LEVEL, LOG_MAX_BYTES,
+                               LOG_BACKUPS)
+    try:
+        verify(args)
+    finally:
+        log_writer.close()  # Writes out whatever is still queued
+
+def verify(args):
     log_message("=== Email Verification Started ===")
     
-    load_disposable_domains()
-    load_role_prefixes()
+    profile = build_profile()
+    try:
+        lists = load_lists(free=profile.skip_free)
+    except ListsError as e:
+        log_message(str(e), logging.ERROR)
+        raise SystemExit(1)
+    log_message(f"Loaded {len(lists.disposable)} disposable domains, {len(lists.roles)} role-based prefixes"
+                + (f", {len(lists.free)} free email domains" if profile.skip_free else "")
+                + f" (list snapshot {lists.version}).")
+    checker = make_checker(lists, profile.skip_free, profile.bare_roles)
     
-    emails = load_emails_from_file()
-    if not emails:
+    total = sum(1 for _ in iter_emails_from_file())  # Streaming count, for progress only
+    if not total:
         log_message("No emails found in input file.")
         return
     
-    total = len(emails)
     log_message(f"Loaded {total} emails from {INPUT_FILE}")
+    metrics_server = start_metrics_server(METRICS_PORT, health=mx_health) if METRICS_PORT else None
+    if metrics_server:
+        log_message(f"Live metrics at {metrics_server.url}")
+    elif METRICS_PORT:
+        log_message(f"Port {METRICS_PORT} is in use (another verifier?); no metrics endpoint this run.",
+                    logging.WARNING)
     
-    valid = []
-    invalid = []
-    processed = 0
+    counts = {VALID: 0, INVALID: 0, UNKNOWN: 0}
+    checkpoint = Checkpoint(CHECKPOINT_FILE, INPUT_FILE, [VALID_OUTPUT, INVALID_OUTPUT, UNKNOWN_OUTPUT],
+                            CHECKPOINT_INTERVAL)
+    resume = args.resume and checkpoint.load()
+    if resume:
+        counts.update(checkpoint.counts)
+        log_message(f"Resuming from {CHECKPOINT_FILE}: {sum(counts.values())} addresses already done")
+    elif args.resume:
+        log_message(f"No usable checkpoint in {CHECKPOINT_FILE} for {INPUT_FILE}. Starting from scratch.")
+    processed = sum(counts.values())
+    store = ResultStore(RESULTS_DB_FILE) if RESULTS_DB_FILE else None
+    valid_file, valid_writer = open_csv_output(VALID_OUTPUT, resume)
+    invalid_file, invalid_writer = open_csv_output(INVALID_OUTPUT, resume)
+    unknown_file, unknown_writer = open_csv_output(UNKNOWN_OUTPUT, resume)
+    writers = {VALID: valid_writer, INVALID: invalid_writer, UNKNOWN: unknown_writer}
     
-    for i in range(0, total, BATCH_SIZE if BATCH_SIZE > 0 else total):
-        batch = emails[i:i + (BATCH_SIZE if BATCH_SIZE > 0 else total)]
-        
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            future_to_email = {executor.submit(verify_email, email): email for email in batch}
-            
-            for future in as_completed(future_to_email):
-                email = future_to_email[future]
-                is_valid, reason = future.result()
-                processed += 1
-                status_msg = f"[{processed}/{total}] {email} - {'Valid' if is_valid else 'Invalid'}: {reason}"
-                log_message(status_msg)
-                
-                if is_valid:
-                    valid.append((email, reason))
-                else:
-                    invalid.append((email, reason))
-        
-        if BATCH_SIZE > 0 and i + BATCH_SIZE < total:
-            log_message(f"Batch complete. Waiting {DELAY_BETWEEN_BATCHES}s before next...")
-            time.sleep(DELAY_BETWEEN_BATCHES)
+    def record(email, status, reason, mx, code, note=''):
+        nonlocal processed
+        processed += 1
+        log_message(f"[{processed}/{total}] {email} - {status}: {reason}{note}", logging.DEBUG,
+                    email=email, status=status, reason=reason, mx=mx, smtp_code=code)
+        counts[status] += 1
+        writers[status].writerow([email, status, reason, mx or '', code or ''])
+        checkpoint.finished(email)
+        checkpoint.save([valid_file, invalid_file, unknown_file], counts)
+        if PROGRESS_EVERY and processed % PROGRESS_EVERY == 0:
+            log_message(f"Progress: {processed:,}/{total:,} (valid {counts[VALID]:,}, invalid {counts[INVALID]:,}, "
+                        f"unknown {counts[UNKNOWN]:,})")
     
-    save_csv_results(valid, invalid)
+    def rows_to_process():
+        # Skips rows finished before a resume
+        for i, email in enumerate(iter_emails_from_file()):
+            if checkpoint.should_process(i):
+                checkpoint.started(i, email)
+                yield email
+    
+    def on_result(email, result, stage, row):
+        record(email, result.status, result.reason, result.mx, result.smtp_code,
+               {STORED: ' (stored result)', DUPLICATE: ' (duplicate of an earlier row)'}.get(stage, ''))
+    
+    # Rows failing the local checks (checked across PREFILTER_PROCESSES
+    # processes), stored results and repeats of an address already settled go
+    # straight to the outputs; only the rest reaches DNS/SMTP, once per mailbox
+    backend = SMTPBackend(profile, dns_cache, catch_all_cache, mx_health)
+    pipeline = Pipeline(backend, checker, store, FRESHNESS_DAYS * 86400, profile.window, PREFILTER_PROCESSES,
+                        CANONICALIZE)
+    completed = False
+    try:
+        pipeline.run(rows_to_process(), on_result)
+        completed = True
+    finally:
+        if completed:
+            checkpoint.clear()
+        else:
+            checkpoint.save([valid_file, invalid_file, unknown_file], counts, force=True)
+            log_message(f"Interrupted. Progress saved to {CHECKPOINT_FILE}; run again with --resume to continue.",
+                        logging.WARNING)
+        valid_file.close()
+        invalid_file.close()
+        unknown_file.close()
+        if metrics_server:
+            metrics_server.close()
     
     log_message("\n=== Verification Complete ===")
-    log_message(f"Valid: {len(valid)} → {VALID_OUTPUT}")
-    log_message(f"Invalid: {len(invalid)} → {INVALID_OUTPUT}")
+    log_message(f"Valid: {counts['Valid']} → {VALID_OUTPUT}")
+    log_message(f"Invalid: {counts['Invalid']} → {INVALID_OUTPUT}")
+    log_message(f"Unknown: {counts['Unknown']} → {UNKNOWN_OUTPUT}")
+    for mx, health in mx_health.snapshot().items():
+        if health['circuit_opens']:
+            log_message(f"MX {mx} skipped as unreachable: {health['timeouts']}/{health['probes']} probes unanswered, "
+                        f"circuit opened {health['circuit_opens']}x")
+    if profile.adaptive:
+        log_concurrency_summary()
+    log_timing_summary()
     log_message(f"Full log saved to {LOG_FILE}")
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+# Shared verification helpers used by the CLI and the Streamlit apps
@@ -0,0 +1,143 @@
+import threading
+
+HOST_START = 2                             # Sessions a new MX host starts with (then doubling until it pushes back)
+GLOBAL_START = 10                          # Probes in flight a run starts with (same)
+ADAPTIVE_MAX = 1000                        # Ceiling of any limit; the profile's own caps apply on top
+FAILURE_BACKOFF = 0.5                      # Limit multiplier on a timeout or 4xx reply
+LATENCY_BACKOFF = 0.75                     # Limit multiplier when replies slow down
+LATENCY_TOLERANCE = 2.0                    # Replies this many times slower than a host's best mean it is queueing us...
+LATENCY_FLOOR = 0.05                       # ...if they are also this many seconds slower (ignores jitter on fast hosts)
+LATENCY_SMOOTHING = 0.2                    # Weight of the newest sample in the smoothed latencies
+BASELINE_DRIFT = 0.01                      # How fast a host's best latency creeps towards newer samples (routes change)
+ADAPTIVE_POLL = 0.05                       # Seconds between re-checks of a limit only other runs' sessions can free
+
+class AIMDLimit:
+    # Additive-increase / multiplicative-decrease limit, TCP style: it grows
+    # by one per good sample until the first congestion signal (slow start:
+    # doubling per window), then by one per window; a congestion signal
+    # multiplies it by the given backoff, at most once per window, so one
+    # overload answered by a burst of failures counts once. A window is as
+    # many samples as the limit. It only grows while it is in use (`used`):
+    # a limit nobody reaches says nothing about the servers.
+
+    def __init__(self, initial, minimum=1, maximum=ADAPTIVE_MAX):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.slow_start = True
+        self._since_decrease = maximum     # The first signal always counts
+
+    @property
+    def value(self):
+        return int(self.limit)
+
+    def good(self, used=True):
+        self._since_decrease += 1
+        if used:
+            self.limit = min(self.maximum, self.limit + (1 if self.slow_start else 1 / self.limit))
+
+    def congested(self, backoff):
+        self._since_decrease += 1
+        if self._since_decrease >= self.value:
+            self.limit = max(self.minimum, self.limit * backoff)
+            self.slow_start = False
+            self._since_decrease = 0
+
+def is_slow(latency, best):
+    return latency > best * LATENCY_TOLERANCE and latency - best > LATENCY_FLOOR
+
+class HostLimit:
+    # One MX host's limit, sessions open to it, its best (lowest, slowly drifting) and smoothed latency
+
+    def __init__(self, start):
+        self.limit = AIMDLimit(start)
+        self.in_flight = 0
+        self.best = None
+        self.latency = None
+
+class AdaptiveConcurrency:
+    # How many probes may be in flight, learnt from the probes' outcomes
+    # (HealthRegistry.record() passes every one on to sample()):
+    #   per MX host: a timeout or 4xx cuts its limit in half, replies getting
+    #     much slower than the host's best (it is queueing us) cut it by a
+    #     quarter, any other answer grows it
+    #   globally: cut when replies get much slower than each host's own best
+    #     across the board, i.e. this machine or its network is the
+    #     bottleneck. Failures don't count there: one host throttling us is
+    #     that host's limit's business.
+    # Schedulers start a session only when try_acquire() admits it and
+    # release() it afterwards: the limits are compared with every run's
+    # sessions together (GUI jobs share one controller), clamped to the
+    # caller's cap (profile.per_host_connections). A limit only grows while at
+    # least half of it is in use.
+
+    def __init__(self, host_start=HOST_START, global_start=GLOBAL_START, maximum=ADAPTIVE_MAX):
+        self.host_start = host_start
+        self.maximum = maximum
+        self._hosts = {}
+        self._global = AIMDLimit(global_start, 1, maximum)
+        self._global_ratio = 1.0           # Smoothed latency / host's best, over every host
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _host(self, mx_host):
+        if mx_host not in self._hosts:
+            self._hosts[mx_host] = HostLimit(self.host_start)
+        return self._hosts[mx_host]
+
+    def try_acquire(self, mx_host, cap=None):
+        # Counts a session to mx_host as started if there is room for it under
+        # the host's limit (and cap) and the global one; False otherwise
+        with self._lock:
+            host = self._host(mx_host)
+            limit = host.limit.value if cap is None else min(cap, host.limit.value)
+            if host.in_flight >= limit or self._in_flight >= self._global.value:
+                return False
+            host.in_flight += 1
+            self._in_flight += 1
+            return True
+
+    def release(self, mx_host):
+        with self._lock:
+            self._host(mx_host).in_flight -= 1
+            self._in_flight -= 1
+
+    def sample(self, mx_host, code, latency=None):
+        #   code: the MX's reply (None if it never answered), latency: seconds until it
+        with self._lock:
+            host = self._host(mx_host)
+            used = host.in_flight * 2 >= host.limit.value
+            if code is None or 400 <= code <= 499:
+                host.limit.congested(FAILURE_BACKOFF)
+                return
+            if latency is None:
+                host.limit.good(used)
+                return
+            best = host.best if host.best is not None else latency
+            host.best = latency if latency < best else best + (latency - best) * BASELINE_DRIFT
+            host.latency = latency if host.latency is None else \
+                LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * host.latency
+            if is_slow(host.latency, host.best):
+                host.limit.congested(LATENCY_BACKOFF)
+            else:
+                host.limit.good(used)
+            ratio = latency / best if is_slow(latency, best) else 1.0
+            self._global_ratio = LATENCY_SMOOTHING * ratio + (1 - LATENCY_SMOOTHING) * self._global_ratio
+            if self._global_ratio > LATENCY_TOLERANCE:
+                self._global.congested(LATENCY_BACKOFF)
+            else:
+                self._global.good(self._in_flight * 2 >= self._global.value)
+
+    def host_limit(self, mx_host):
+        host = self._hosts.get(mx_host)
+        return host.limit.value if host is not None else self.host_start
+
+    def global_limit(self):
+        return self._global.value
+
+    def snapshot(self):
+        # {mx_host: (limit, sessions open)} plus the global pair under None
+        with self._lock:
+            hosts = {mx: (host.limit.value, host.in_flight) for mx, host in self._hosts.items()}
+            hosts[None] = (self._global.value, self._in_flight)
+            return hosts
@@ -0,0 +1,475 @@
+import asyncio
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+import dns.asyncresolver
+
+from . import metrics, runner
+
+from .adaptive import ADAPTIVE_POLL
+from .catch_all import canary_address, verdict_from_code
+from .dns_cache import NEGATIVE_ERRORS, NEGATIVE_TTL, mx_hosts_from_answer
+from .metrics import BANNER, Stopwatch
+from .mx_health import HealthRegistry
+from .mx_race import MX_RACE_STAGGER, is_conclusive, race_outcome
+from .scheduler import PER_HOST_BURST, PER_HOST_RATE, TokenBucket
+from .smtp_session import (CONNECT, HELO, MAIL, MAX_RCPT_PER_SESSION, RCPT, RCPT_PER_TRANSACTION, SENDER_EMAIL,
+                           TOO_MANY_RECIPIENTS, Probe, enhanced_status, merge_probes, no_probe)
+
+MAX_CONCURRENCY = 1000                     # Probes in flight across all hosts
+PER_HOST_LIMIT = 10                        # Simultaneous connections to one MX host (caps, with adaptive limits)
+
+_local_hostname = None
+
+def local_hostname():
+    # smtplib looks this up on every connection; once per process is enough
+    global _local_hostname
+    if _local_hostname is None:
+        _local_hostname = socket.getfqdn()
+    return _local_hostname
+
+def split_host(mx_host, default_port=25):
+    # Same "host:port" convention smtplib.SMTP.connect accepts
+    host, sep, port = mx_host.rpartition(':')
+    if sep and port.isdigit():
+        return host, int(port)
+    return mx_host, default_port
+
+class SMTPReplyError(Exception):
+    # A reply that ends the dialogue; carries it for the Probe
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message!r}")
+        self.code = code
+        self.message = message
+
+class AsyncSMTP:
+    # Minimal non-blocking SMTP client: just enough dialogue for RCPT probing.
+    # Replies are (code, text of the last line).
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def connect(self, mx_host, watch):
+        # TCP connect and the 220 banner, each timed on the Stopwatch
+        host, port = split_host(mx_host)
+        self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.timeout)
+        watch.lap(BANNER)
+        code, message = await self.reply()
+        if code != 220:
+            raise SMTPReplyError(code, message)
+        watch.lap(HELO)
+
+    async def reply(self):
+        while True:
+            line = await asyncio.wait_for(self.reader.readline(), self.timeout)
+            if not line:
+                raise ConnectionError("connection closed")
+            if line[3:4] != b'-':
+                return int(line[:3]), line[4:].strip()
+
+    async def command(self, line):
+        self.writer.write(line.encode('ascii', 'replace') + b'\r\n')
+        await asyncio.wait_for(self.writer.drain(), self.timeout)
+        return await self.reply()
+
+    async def hello(self):
+        code, _ = await self.command(f"EHLO {local_hostname()}")
+        if not 200 <= code <= 299:
+            code, message = await self.command(f"HELO {local_hostname()}")
+            if not 200 <= code <= 299:
+                raise SMTPReplyError(code, message)
+
+    async def mail(self, sender):
+        return await self.command(f"MAIL FROM:<{sender}>")
+
+    async def rcpt(self, email):
+        return await self.command(f"RCPT TO:<{email}>")
+
+    async def rset(self):
+        return await self.command("RSET")
+
+    async def quit(self):
+        try:
+            await self.command("QUIT")
+        finally:
+            self.close()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+class AsyncGate:
+    # Admission to one MX host, by acquire() / release() (an adaptive
+    # controller's try_acquire / release, which count every run's sessions,
+    # so the limit follows it up and down). A session leaving here wakes the
+    # next waiter; while none of ours is running only others' (another host,
+    # another job) can make room, and they don't notify us, so one waiter
+    # polls for it.
+
+    def __init__(self, acquire, release):
+        self.acquire = acquire
+        self.release = release
+        self.active = 0
+        self._polling = False
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            while not self.acquire():
+                if self.active or self._polling:
+                    await self._cond.wait()
+                    continue
+                self._polling = True
+                try:
+                    await asyncio.wait_for(self._cond.wait(), ADAPTIVE_POLL)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    self._polling = False
+            self.active += 1
+            self._cond.notify()  # The next waiter tries too, in case the limit grew
+
+    async def __aexit__(self, *exc):
+        self.release()
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+class AsyncEngine:
+    # One event loop (in a helper thread) drives every DNS lookup and SMTP
+    # dialogue. The engine works as an executor for emailverifier.runner:
+    # submit() schedules a coroutine and returns a concurrent future, so
+    # verify_each / verify_grouped (windowing, retries) behave exactly like
+    # the thread-pool versions and input is only ever read by the caller.
+    # With `adaptive`, SMTP sessions are also held to the health registry's
+    # learnt limits (per MX host and all together), shared with any other
+    # engine or scheduler using that registry.
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, per_host_limit=PER_HOST_LIMIT, dns_cache=None,
+                 per_host_rate=PER_HOST_RATE, per_host_burst=PER_HOST_BURST, catch_all_cache=None, health=None,
+                 adaptive=False):
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.dns_cache = dns_cache
+        self.per_host_rate = per_host_rate
+        self.per_host_burst = per_host_burst
+        self.catch_all_cache = catch_all_cache
+        self._host_slots = {}
+        self._host_buckets = {}
+        self._mx_lookups = {}
+        self._catch_all_checks = {}
+        self._stragglers = set()
+        self.health = health if health is not None else HealthRegistry()
+        self.limits = self.health.concurrency if adaptive else None
+        self._loop = None
+        self._thread = None
+        self._limit = None
+
+    async def _offload(self, fn, *args):
+        # The caches are SQLite: their reads and commits run in the loop's
+        # default executor so they never stall the probes in flight
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def _resolve_mx(self, domain, lifetime):
+        if self.dns_cache is not None:
+            found, hosts = await self._offload(self.dns_cache.get, domain)
+            if found:
+                metrics.count('dns_cache_hits')
+                return hosts
+        start = time.monotonic()
+        try:
+            hosts, ttl = mx_hosts_from_answer(await dns.asyncresolver.resolve(domain, 'MX', lifetime=lifetime))
+        except NEGATIVE_ERRORS:
+            hosts, ttl = None, NEGATIVE_TTL
+        except Exception:
+            return None
+        finally:
+            metrics.observe(metrics.DNS, time.monotonic() - start)
+        if self.dns_cache is not None:
+            await self._offload(self.dns_cache.put, domain, hosts, ttl)
+        return hosts
+
+    async def get_mx_record(self, domain, lifetime=None):
+        # Concurrent lookups of the same domain share one query
+        return await self._shared(self._mx_lookups, domain, self._resolve_mx, domain, lifetime)
+
+    async def _check_catch_all(self, domain, mx_host, sender, timeout, paced):
+        if self.catch_all_cache is not None:
+            found, verdict = await self._offload(self.catch_all_cache.get, domain)
+            if found:
+                return verdict
+        probe = await self.smtp_check(canary_address(domain), mx_host, sender, timeout, paced)
+        verdict = verdict_from_code(probe.rcpt_code)
+        if verdict is not None and self.catch_all_cache is not None:
+            await self._offload(self.catch_all_cache.put, domain, verdict)
+        return verdict
+
+    async def is_catch_all(self, domain, mx_host, sender=SENDER_EMAIL, timeout=10, paced=True):
+        # Async twin of catch_all.CatchAllCache.check; concurrent checks of a domain share one probe
+        return await self._shared(self._catch_all_checks, domain, self._check_catch_all,
+                                  domain, mx_host, sender, timeout, paced)
+
+    def _shared(self, tasks, key, coro_fn, *args):
+        # The task already running for key, or a new one. It leaves `tasks`
+        # when it settles, so the map only holds work in flight; later callers
+        # find the answer in the caches instead
+        if key not in tasks:
+            task = tasks[key] = asyncio.ensure_future(coro_fn(*args))
+            task.add_done_callback(lambda done: tasks.pop(key) if tasks.get(key) is done else None)
+        return tasks[key]
+
+    @asynccontextmanager
+    async def _slots(self, mx_host):
+        # A connection slot at mx_host (with adaptive limits, also a session slot overall)
+        if mx_host not in self._host_slots:
+            if self.limits is None:
+                self._host_slots[mx_host] = asyncio.Semaphore(self.per_host_limit)
+            else:
+                self._host_slots[mx_host] = AsyncGate(lambda: self.limits.try_acquire(mx_host, self.per_host_limit),
+                                                      lambda: self.limits.release(mx_host))
+        async with self._host_slots[mx_host]:
+            yield
+
+    def _bucket(self, mx_host):
+        if mx_host not in self._host_buckets:
+            self._host_buckets[mx_host] = TokenBucket(self.per_host_rate, self.per_host_burst)
+        return self._host_buckets[mx_host]
+
+    async def pace(self, mx_host):
+        # Waits for a token from mx_host's bucket; waiting only parks this
+        # coroutine. A caller that paces a whole verification this way (as
+        # MXScheduler does a job routed to its primary MX) runs the sessions
+        # in it with paced=False.
+        while True:
+            delay = self._bucket(mx_host).take()
+            if not delay:
+                return
+            await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def _session(self, mx_host, paced=True):
+        # A slot for one SMTP session to mx_host and, if paced, a token from
+        # the host's bucket; like MXScheduler, a probe waiting for its token
+        # doesn't hold a slot meanwhile
+        while True:
+            async with self._slots(mx_host):
+                delay = self._bucket(mx_host).take() if paced else 0
+                if not delay:
+                    yield
+                    return
+            await asyncio.sleep(delay)
+
+    async def smtp_check(self, email, mx_host, sender=SENDER_EMAIL, timeout=10, paced=True, started=None):
+        # Async twin of smtp_session.smtp_check -> Probe
+        #   started: set, gets mx_host once the probe has its session (see race_probe)
+        async with self._session(mx_host, paced):
+            if self.health.is_open(mx_host):
+                return no_probe(mx_host)  # Opened while this probe waited for a slot
+            if started is not None:
+                started.add(mx_host)
+            server = AsyncSMTP(timeout)
+            start = time.monotonic()
+            watch = Stopwatch(CONNECT, mx_host)
+            phase, code, message = CONNECT, None, None
+            try:
+                await server.connect(mx_host, watch)
+                phase = HELO
+                await server.hello()
+                watch.lap(MAIL)
+                phase = MAIL
+                code, message = await server.mail(sender)
+                watch.lap(None)
+                if code == 250:
+                    phase, code, message = RCPT, None, None
+                    watch.start(RCPT)
+                    code, message = await server.rcpt(email)
+                    watch.lap(None)
+                await server.quit()
+            except asyncio.CancelledError:
+                server.close()  # The engine is stopping
+                raise
+            except SMTPReplyError as e:
+                server.close()
+                code, message = e.code, e.message
+            except Exception:
+                server.close()
+            watch.stop()  # The stage it failed in, if any
+            self.health.record(mx_host, code, time.monotonic() - start)
+            return Probe(mx_host, code, enhanced_status(message), phase)
+
+    async def smtp_probe(self, email, mx_host, sender=SENDER_EMAIL, timeout=10):
+        # Just the RCPT reply code, or None if the dialogue never got that far
+        return (await self.smtp_check(email, mx_host, sender, timeout)).rcpt_code
+
+    async def race_probe(self, email, mx_hosts, sender=SENDER_EMAIL, timeout=10, stagger=MX_RACE_STAGGER):
+        # Async twin of mx_race.MXRacer.race. Once the race is decided, losing
+        # probes still waiting for a slot or token are dropped; those already
+        # talking to their MX run on in the background, like MXRacer's, so the
+        # health registry only ever sees real replies and real timeouts (a
+        # dead primary still opens its circuit, a slow one isn't blamed).
+        hosts = self.health.usable(mx_hosts)
+        if not hosts:
+            return no_probe(mx_hosts[0])
+        waiting = list(hosts)
+        running = set()
+        attempts = []
+        answers = {}
+        started = set()
+        try:
+            while waiting or running:
+                if waiting:
+                    mx = waiting.pop(0)
+                    attempts.append((asyncio.ensure_future(self.smtp_check(email, mx, sender, timeout,
+                                                                           started=started)), mx))
+                    running.add(attempts[-1][0])
+                done, running = await asyncio.wait(running, timeout=stagger if waiting else None,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    probe = task.result()
+                    if is_conclusive(probe):
+                        return probe
+                    answers[probe.mx] = probe
+        finally:
+            for task, mx in attempts:
+                if task.done():
+                    continue
+                if mx in started:
+                    self._stragglers.add(task)  # The loop only keeps weak references to tasks
+                    task.add_done_callback(self._stragglers.discard)
+                else:
+                    task.cancel()
+        return race_outcome(hosts, answers)
+
+    async def smtp_rcpt_many(self, emails, mx_host, sender=SENDER_EMAIL, timeout=10,
+                             rcpt_per_transaction=RCPT_PER_TRANSACTION, max_rcpt=MAX_RCPT_PER_SESSION, paced=True):
+        # Async twin of smtp_session.smtp_rcpt_many: {email: Probe}
+        probes = {}
+        pending = deque(emails)
+        failed = no_probe(mx_host)
+        while pending:
+            async with self._session(mx_host, paced):
+                if self.health.is_open(mx_host):
+                    break
+                server = AsyncSMTP(timeout)
+                start = time.monotonic()
+                watch = Stopwatch(CONNECT, mx_host)
+                answered = len(probes)
+                phase = CONNECT
+                try:
+                    await server.connect(mx_host, watch)
+                    phase = HELO
+                    await server.hello()
+                    watch.lap(None)
+                    sent = 0
+                    while pending and sent < max_rcpt:
+                        phase = MAIL
+                        watch.start(MAIL)
+                        code, message = await server.mail(sender)
+                        if code != 250:
+                            raise SMTPReplyError(code, message)
+                        phase = RCPT
+                        watch.lap(RCPT)
+                        in_transaction = 0
+                        while pending and in_transaction < rcpt_per_transaction and sent < max_rcpt:
+                            code, message = await server.rcpt(pending[0])
+                            watch.lap(RCPT)
+                            if code == TOO_MANY_RECIPIENTS and in_transaction:
+                                break
+                            if not sent:
+                                self.health.record(mx_host, code, time.monotonic() - start)
+                            probes[pending.popleft()] = Probe(mx_host, code, enhanced_status(message), RCPT)
+                            in_transaction += 1
+                            sent += 1
+                        watch.start(None)
+                        await server.rset()
+                    await server.quit()
+                    continue
+                except SMTPReplyError as e:
+                    failed = Probe(mx_host, e.code, enhanced_status(e.message), phase)
+                except Exception:
+                    failed = Probe(mx_host, None, None, phase)
+                watch.stop()  # The stage the session died in
+                server.close()
+                if len(probes) == answered:
+                    self.health.record(mx_host, failed.code)
+                break
+        for email in pending:
+            probes[email] = failed
+        return probes
+
+    async def smtp_probe_many(self, emails, mx_hosts, sender=SENDER_EMAIL, timeout=10,
+                              rcpt_per_transaction=RCPT_PER_TRANSACTION, max_rcpt=MAX_RCPT_PER_SESSION, paced=True,
+                              mx_pause=0):
+        # Async twin of smtp_session.smtp_probe_many: {email: Probe}
+        probes = {email: no_probe() for email in emails}
+        remaining = list(emails)
+        for i, mx in enumerate(mx_hosts):
+            if i and mx_pause:
+                await asyncio.sleep(mx_pause)
+            answers = await self.smtp_rcpt_many(remaining, mx, sender, timeout, rcpt_per_transaction, max_rcpt, paced)
+            remaining = merge_probes(probes, answers, remaining)
+            if not remaining:
+                break
+        return probes
+
+    def _start(self):
+        self._host_slots = {}
+        self._host_buckets = {}
+        self._mx_lookups = {}
+        self._catch_all_checks = {}
+        self._stragglers = set()
+        self._limit = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def _stop(self):
+        async def cancel_leftovers():
+            # Anything still running when the caller stopped reading (or failed)
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(cancel_leftovers(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = self._thread = None
+
+    async def _limited(self, coro_fn, args):
+        # At most max_concurrency jobs run at once, however many are submitted
+        if self._limit is None:
+            self._limit = asyncio.Semaphore(self.max_concurrency)
+        async with self._limit:
+            return await coro_fn(*args)
+
+    def submit(self, coro_fn, *args):
+        # Executor-style: runs coro_fn(*args) on the engine's loop, returns a concurrent.futures.Future
+        return asyncio.run_coroutine_threadsafe(self._limited(coro_fn, args), self._loop)
+
+    def verify_each(self, emails, verify_coro, window=None, retry=None):
+        #   verify_coro(email, engine) -> same result tuple as the sync verify_email
+        # At most window (default max_concurrency) addresses are read ahead.
+        self._start()
+        try:
+            yield from runner.verify_each(self, emails, lambda email: verify_coro(email, self),
+                                          window or self.max_concurrency, retry)
+        finally:
+            self._stop()
+
+    def verify_grouped(self, emails, local_check, verify_domain_coro, window=None, retry=None):
+        #   verify_domain_coro(domain, [normalized, ...], engine) -> {normalized: result}
+        self._start()
+        try:
+            yield from runner.verify_grouped(self, emails, local_check,
+                                             lambda domain, emails: verify_domain_coro(domain, emails, self),
+                                             window, retry)
+        finally:
+            self._stop()
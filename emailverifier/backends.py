@@ -0,0 +1,259 @@
+import asyncio
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import requests
+
+from .aio import AsyncEngine
+from .catch_all import CatchAllCache
+from .debounce import BULK_MIN_EMAILS, BulkError
+from .dns_cache import DNSCache
+from .mx_health import HealthRegistry
+from .mx_race import MXRacer
+from .normalize import normalize_email
+from .pipeline import THOROUGH, Result
+from .retry import RetryQueue
+from .runner import verify_each, verify_grouped
+from .scheduler import MXScheduler, primary_mx_of, then
+from .smtp_session import INVALID, UNKNOWN, VALID, smtp_check, smtp_probe, smtp_probe_many
+from .typos import suggest_domain
+
+def no_mx_result(domain):
+    return Result(INVALID, "No MX record (domain inactive)", suggest_domain(domain))
+
+def mx_unreachable_result(mx):
+    # The MX keeps timing out (circuit open), so there is no verdict either way
+    return Result(UNKNOWN, "Unknown (MX unreachable)", None, mx)
+
+def catch_all_result(mx):
+    # The MX accepted a made-up address, so its "250" says nothing about this mailbox
+    return Result(INVALID, "Catch-all domain (accepts any address, mailbox unverifiable)", None, mx, catch_all=True)
+
+class SMTPBackend:
+    # Verification over DNS + SMTP from this machine, tuned by a
+    # pipeline.Profile. The caches and the health registry can be passed in
+    # so long-lived frontends (Streamlit) share them between runs, and so can
+    # a thread pool (`executor`, used instead of one of profile.workers threads).
+    # verify(emails) yields (email, Result) as results complete.
+
+    def __init__(self, profile=THOROUGH, dns_cache=None, catch_all_cache=None, health=None, executor=None):
+        self.profile = profile
+        self.dns_cache = dns_cache if dns_cache is not None else DNSCache()
+        self.catch_all_cache = catch_all_cache if catch_all_cache is not None else CatchAllCache()
+        self.health = health if health is not None else HealthRegistry()
+        self.executor = executor
+        self._racer = None
+        self._catch_all_checks = {}        # domain -> Future, racing runs only
+        self._lock = threading.Lock()
+
+    def get_mx_record(self, domain):
+        mx_hosts = self.dns_cache.get_mx_record(domain, lifetime=self.profile.dns_lifetime)
+        return mx_hosts[:self.profile.max_mx] if mx_hosts else None
+
+    def smtp_result(self, probe):
+        if probe.status == VALID:
+            return Result(VALID, "Valid (SMTP accepted)", None, probe.mx, probe.code)
+        if probe.status == INVALID:
+            return Result(INVALID, f"Invalid (SMTP rejected: {probe.describe()})", None, probe.mx, probe.code)
+        if probe.code is None and probe.mx and self.health.is_open(probe.mx):
+            return mx_unreachable_result(probe.mx)
+        return Result(UNKNOWN, f"Unknown (temporary failure: {probe.describe()})", None, probe.mx, probe.code)
+
+    def _usable(self, domain, mx_hosts):
+        # (hosts worth probing, None), or (None, the Result every address of the domain gets)
+        if not mx_hosts:
+            return None, no_mx_result(domain)
+        reachable = self.health.usable(mx_hosts)
+        if not reachable:
+            return None, mx_unreachable_result(mx_hosts[0])
+        return reachable, None
+
+    def is_catch_all(self, domain, mx):
+        p = self.profile
+        return p.catch_all_check and self.catch_all_cache.check(
+            domain, lambda address: smtp_probe(address, mx, p.sender, p.timeout, health=self.health))
+
+    def verify_email(self, email):
+        p = self.profile
+        email = normalize_email(email)
+        domain = email.split('@')[1]
+        mx_hosts, settled = self._usable(domain, self.get_mx_record(domain))
+        if settled:
+            return settled
+        if self._racer:
+            return self._race(email, domain, mx_hosts)
+        if self.is_catch_all(domain, mx_hosts[0]):
+            return catch_all_result(mx_hosts[0])
+
+        for i, mx in enumerate(mx_hosts):
+            if i and p.mx_pause:
+                time.sleep(p.mx_pause)
+            probe = smtp_check(email, mx, p.sender, p.timeout, health=self.health)
+            if probe.status == VALID:
+                break
+        return self.smtp_result(probe)
+
+    def _race(self, email, domain, mx_hosts):
+        # verify_email with MX racing, run as a host-less scheduler job: the
+        # catch-all probe (one per domain, shared like AsyncEngine's) and the
+        # race's probes are queued for their own MX hosts, and the Result is a
+        # Future the scheduler waits on, so no worker blocks on a dead MX
+        def race(catch_all):
+            if catch_all:
+                return catch_all_result(mx_hosts[0])
+            return then(self._racer.race(email, mx_hosts), self.smtp_result)
+
+        found, catch_all = self.catch_all_cache.get(domain) if self.profile.catch_all_check else (True, False)
+        if found:
+            return race(catch_all)
+        with self._lock:
+            check = self._catch_all_checks.get(domain)
+            started = check is None
+            if started:
+                check = self._catch_all_checks[domain] = self._racer.scheduler.submit_to(
+                    mx_hosts[0], self.is_catch_all, domain, mx_hosts[0])
+        if started:
+            # Outside the lock: a future that is already done runs the callback at once
+            check.add_done_callback(lambda done: self._settled(domain, done))
+        return then(check, race)
+
+    def _settled(self, domain, check):
+        # A settled check leaves the map; its verdict, if conclusive, is in catch_all_cache
+        with self._lock:
+            if self._catch_all_checks.get(domain) is check:
+                del self._catch_all_checks[domain]
+
+    def verify_domain(self, domain, emails):
+        # Session-reuse path: every address of the domain over one SMTP connection per MX
+        p = self.profile
+        mx_hosts, settled = self._usable(domain, self.get_mx_record(domain))
+        if settled:
+            return {email: settled for email in emails}
+        if self.is_catch_all(domain, mx_hosts[0]):
+            return {email: catch_all_result(mx_hosts[0]) for email in emails}
+
+        probes = smtp_probe_many(emails, mx_hosts, p.sender, p.timeout, p.rcpt_per_transaction, p.max_rcpt, self.health,
+                                 p.mx_pause)
+        return {email: self.smtp_result(probes[email]) for email in emails}
+
+    async def _get_mx_record_async(self, domain, engine):
+        mx_hosts = await engine.get_mx_record(domain, self.profile.dns_lifetime)
+        return mx_hosts[:self.profile.max_mx] if mx_hosts else None
+
+    async def verify_email_async(self, email, engine):
+        # Paced like the thread path: by the primary MX once per address, or
+        # (racing) every probe by its own MX
+        p = self.profile
+        email = normalize_email(email)
+        domain = email.split('@')[1]
+        mx_hosts, settled = self._usable(domain, await self._get_mx_record_async(domain, engine))
+        if settled:
+            return settled
+        racing = p.mx_race and len(mx_hosts) > 1
+        if not racing:
+            await engine.pace(mx_hosts[0])
+        if p.catch_all_check and await engine.is_catch_all(domain, mx_hosts[0], p.sender, p.timeout, racing):
+            return catch_all_result(mx_hosts[0])
+        if racing:
+            return self.smtp_result(await engine.race_probe(email, mx_hosts, p.sender, p.timeout, p.mx_stagger))
+
+        for i, mx in enumerate(mx_hosts):
+            if i and p.mx_pause:
+                await asyncio.sleep(p.mx_pause)
+            probe = await engine.smtp_check(email, mx, p.sender, p.timeout, paced=False)
+            if probe.status == VALID:
+                break
+        return self.smtp_result(probe)
+
+    async def verify_domain_async(self, domain, emails, engine):
+        # One token from the primary MX's bucket for the domain's catch-all
+        # probe and sessions, like a verify_domain job on the scheduler
+        p = self.profile
+        mx_hosts, settled = self._usable(domain, await self._get_mx_record_async(domain, engine))
+        if settled:
+            return {email: settled for email in emails}
+        await engine.pace(mx_hosts[0])
+        if p.catch_all_check and await engine.is_catch_all(domain, mx_hosts[0], p.sender, p.timeout, paced=False):
+            return {email: catch_all_result(mx_hosts[0]) for email in emails}
+
+        probes = await engine.smtp_probe_many(emails, mx_hosts, p.sender, p.timeout, p.rcpt_per_transaction,
+                                              p.max_rcpt, paced=False, mx_pause=p.mx_pause)
+        return {email: self.smtp_result(probes[email]) for email in emails}
+
+    def verify(self, emails):
+        # Yields (email, Result) as results complete; at most profile.window
+        # addresses are read ahead. Work is paced per MX host, never by pausing
+        # the whole run, and Unknown results are probed again after each of
+        # profile.retry_delays.
+        p = self.profile
+        retry = RetryQueue(lambda result: result.status == UNKNOWN, p.retry_delays) if p.retry_delays else None
+        if p.async_engine:
+            engine = AsyncEngine(p.async_concurrency, p.per_host_connections, self.dns_cache, p.per_host_rate,
+                                 p.per_host_burst, self.catch_all_cache, self.health, p.adaptive)
+            if p.session_reuse:
+                yield from engine.verify_grouped(emails, None, self.verify_domain_async, p.window, retry)
+            else:
+                yield from engine.verify_each(emails, self.verify_email_async, p.window, retry)
+            return
+
+        racing = not p.session_reuse and p.mx_race and p.max_mx > 1
+        pool = nullcontext(self.executor) if self.executor else ThreadPoolExecutor(max_workers=p.workers)
+        # Racing: addresses aren't paced by their primary MX, each probe is (see _race)
+        host_of = (lambda email: None) if racing else primary_mx_of(self.get_mx_record)
+        with pool as executor, \
+                MXScheduler(executor, host_of, p.per_host_rate, p.per_host_burst, p.per_host_connections,
+                            self.health.concurrency if p.adaptive else None, p.workers) as scheduler:
+            if p.session_reuse:
+                yield from verify_grouped(scheduler, emails, None, self.verify_domain, p.window, retry)
+                return
+            if racing:
+                self._racer = MXRacer(lambda email, mx: smtp_check(email, mx, p.sender, p.timeout), scheduler,
+                                      p.mx_stagger, self.health)
+            try:
+                yield from verify_each(scheduler, emails, self.verify_email, p.window, retry)
+            finally:
+                self._racer = None
+                self._catch_all_checks = {}
+
+class DeBounceBackend:
+    # Verification through the DeBounce API (debounce.DeBounceClient). Inputs
+    # of bulk_min or more addresses are read in full and sent as one bulk
+    # list (if the client has a list host); smaller ones, or a bulk job that
+    # fails, go through single calls over the client's pooled session, at
+    # most `window` in flight.
+    #   on_bulk_progress(percentage), on_bulk_error(exception): optional UI hooks
+
+    def __init__(self, client, workers=20, window=500, bulk_min=BULK_MIN_EMAILS, on_bulk_progress=None,
+                 on_bulk_error=None):
+        self.client = client
+        self.workers = workers
+        self.window = window
+        self.bulk_min = bulk_min
+        self.on_bulk_progress = on_bulk_progress
+        self.on_bulk_error = on_bulk_error
+
+    def verify(self, emails):
+        emails = iter(emails)
+        if self.bulk_min and self.client.can_bulk:
+            head = list(islice(emails, self.bulk_min))
+            if len(head) < self.bulk_min:
+                emails = iter(head)
+            else:
+                batch = head + list(emails)
+                try:
+                    results = self.client.verify_bulk(batch, self.on_bulk_progress)
+                except (BulkError, requests.RequestException) as e:
+                    if self.on_bulk_error:
+                        self.on_bulk_error(e)
+                    emails = iter(batch)
+                else:
+                    for email in batch:
+                        yield email, Result(*results.get(normalize_email(email), ('Unknown', 'Missing from bulk results', '')))
+                    return
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for email, answer in verify_each(executor, emails, self.client.verify, self.window):
+                yield email, Result(*answer)
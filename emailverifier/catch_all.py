@@ -0,0 +1,95 @@
+import secrets
+import string
+import threading
+import time
+from contextlib import contextmanager
+
+from .db import LocalConnection
+from .dns_cache import DNS_CACHE_FILE
+from .smtp_session import ACCEPT_CODES
+
+CATCH_ALL_TTL = 86400                      # Seconds a domain's catch-all verdict is trusted
+MEMORY_SIZE = 100000                       # Verdicts kept in-process in front of SQLite (cleared when full)
+
+def canary_address(domain):
+    # A local part nobody has: if the MX accepts this, it accepts anything
+    return 'nx-' + ''.join(secrets.choice(string.ascii_lowercase + string.digits) for _ in range(20)) + '@' + domain
+
+def verdict_from_code(code):
+    # True = catch-all, False = rejects unknown users, None = no conclusive answer (timeout, 4xx)
+    if code in ACCEPT_CODES:
+        return True
+    if code is not None and 500 <= code <= 599:
+        return False
+    return None
+
+class CatchAllCache:
+    # Per-domain catch-all verdicts, in the same SQLite file as the MX cache
+    # so every verifier process shares them. check() probes each domain at
+    # most once per TTL, however many threads ask at the same time; a
+    # domain's lock only exists while some thread is checking it.
+
+    def __init__(self, path=DNS_CACHE_FILE, ttl=CATCH_ALL_TTL):
+        self.ttl = ttl
+        self._conn = LocalConnection(path)
+        self._memory = {}
+        self._locks = {}                   # domain -> [lock, threads using it]
+        self._locks_guard = threading.Lock()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS catch_all (domain TEXT PRIMARY KEY, verdict INTEGER NOT NULL, expires REAL NOT NULL)")
+        conn.execute("DELETE FROM catch_all WHERE expires < ?", (time.time(),))
+        conn.commit()
+
+    def get(self, domain):
+        # Returns (found, verdict)
+        now = time.time()
+        entry = self._memory.get(domain)
+        if entry and entry[0] > now:
+            return True, entry[1]
+        row = self._conn().execute("SELECT verdict, expires FROM catch_all WHERE domain = ?", (domain,)).fetchone()
+        if row and row[1] > now:
+            self._remember(domain, row[1], bool(row[0]))
+            return True, bool(row[0])
+        return False, None
+
+    def _remember(self, domain, expires, verdict):
+        if len(self._memory) >= MEMORY_SIZE:
+            self._memory.clear()
+        self._memory[domain] = (expires, verdict)
+
+    def put(self, domain, verdict):
+        expires = time.time() + self.ttl
+        self._remember(domain, expires, verdict)
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO catch_all (domain, verdict, expires) VALUES (?, ?, ?)",
+                     (domain, int(verdict), expires))
+        conn.commit()
+
+    @contextmanager
+    def _lock(self, domain):
+        with self._locks_guard:
+            entry = self._locks.setdefault(domain, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[domain]
+
+    def check(self, domain, probe):
+        #   probe(address) -> RCPT reply code, or None if the MX never answered
+        # Returns True / False, or None when the probe was inconclusive (not cached)
+        found, verdict = self.get(domain)
+        if found:
+            return verdict
+        with self._lock(domain):
+            found, verdict = self.get(domain)
+            if found:
+                return verdict
+            verdict = verdict_from_code(probe(canary_address(domain)))
+            if verdict is not None:
+                self.put(domain, verdict)
+            return verdict
@@ -0,0 +1,88 @@
+import json
+import os
+import time
+from collections import defaultdict, deque
+
+CHECKPOINT_FILE = 'verification_checkpoint.json'
+CHECKPOINT_INTERVAL = 30                   # Seconds between checkpoint writes
+
+def file_signature(path):
+    st = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': st.st_size, 'mtime': st.st_mtime}
+
+class Checkpoint:
+    # Progress is tracked by input row number: every row below `read` is done
+    # except the few still in flight (`pending`, bounded by the in-flight
+    # window). Output files are truncated back to the sizes they had at the
+    # checkpoint, so rows written after it are redone rather than duplicated.
+
+    def __init__(self, path, input_file, outputs, interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.input_file = input_file
+        self.outputs = list(outputs)
+        self.interval = interval
+        self.read = 0
+        self.counts = {}
+        self.output_sizes = {}
+        self._in_flight = defaultdict(deque)
+        self._resume_read = 0
+        self._resume_pending = set()
+        self._last_save = time.time()
+
+    def load(self):
+        # Returns False when there is nothing (valid) to resume from
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if state.get('input') != file_signature(self.input_file):
+            return False
+        if any(not os.path.exists(output) for output in state['output_sizes']):
+            return False
+        self._resume_read = state['read']
+        self._resume_pending = set(state['pending'])
+        self.counts = state['counts']
+        self.output_sizes = state['output_sizes']
+        for output, size in self.output_sizes.items():
+            os.truncate(output, size)
+        return True
+
+    def should_process(self, index):
+        return index >= self._resume_read or index in self._resume_pending
+
+    def started(self, index, email):
+        self._in_flight[email].append(index)
+        self.read = index + 1
+
+    def finished(self, email):
+        indexes = self._in_flight[email]
+        indexes.popleft()
+        if not indexes:
+            del self._in_flight[email]
+
+    def pending(self):
+        pending = [i for indexes in self._in_flight.values() for i in indexes]
+        # Rows skipped while resuming past `read` are still owed
+        pending.extend(i for i in self._resume_pending if i >= self.read)
+        return sorted(pending)
+
+    def save(self, files, counts, force=False):
+        # files: open output file objects, in the same order as self.outputs
+        if not force and time.time() - self._last_save < self.interval:
+            return
+        sizes = {}
+        for path, f in zip(self.outputs, files):
+            f.flush()
+            sizes[path] = f.tell()
+        state = {'input': file_signature(self.input_file), 'read': max(self.read, self._resume_read),
+                 'pending': self.pending(), 'counts': counts, 'output_sizes': sizes}
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)  # Atomic: a crash mid-write keeps the previous checkpoint
+        self._last_save = time.time()
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
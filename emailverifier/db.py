@@ -0,0 +1,17 @@
+import sqlite3
+import threading
+
+class LocalConnection:
+    # One SQLite connection per thread; WAL lets several processes share the file
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def __call__(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
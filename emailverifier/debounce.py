@@ -0,0 +1,176 @@
+import csv
+import io
+import os
+import time
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Endpoints can be pointed at tools/mock_debounce.py for local testing
+DEBOUNCE_API_URL = os.environ.get('DEBOUNCE_API_URL', 'https://api.debounce.io/v1/')
+DEBOUNCE_BULK_URL = os.environ.get('DEBOUNCE_BULK_URL', 'https://bulk.debounce.io/v1/')
+DEBOUNCE_LIST_DIR = os.environ.get('DEBOUNCE_LIST_DIR')    # Bulk lists are written here as CSV files...
+DEBOUNCE_LIST_URL = os.environ.get('DEBOUNCE_LIST_URL')    # ...which a web server publishes under this URL
+BULK_MIN_EMAILS = 1000                     # Smaller lists go through single-address calls
+BULK_POLL_INTERVAL = 5                     # Seconds between list status checks
+BULK_MAX_WAIT = 6 * 3600                   # Give up on a list after this many seconds
+REQUEST_TIMEOUT = 15
+
+DEBOUNCE_CODES = {  # DeBounce result code -> (status, reason)
+    '10': ('Valid', 'Deliverable'),
+    '7': ('Invalid', 'Undeliverable'),
+    '5': ('Invalid', 'Disposable'),
+    '8': ('Invalid', 'Catch-all'),
+    '6': ('Unknown', 'Unknown'),
+}
+
+class BulkError(Exception):
+    pass
+
+def make_session(pool_size=20, retries=3):
+    # One keep-alive connection pool for every call. Transient 429/5xx on GETs
+    # are retried with backoff (retries=0 for calls that must not repeat).
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(['GET']), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def result_from_code(code, reason='', suggestion=''):
+    # (status, reason, suggestion) for one DeBounce answer
+    status, mapped = DEBOUNCE_CODES.get(str(code), ('Unknown', reason or 'Unknown'))
+    return status, mapped, suggestion or ''
+
+def parse_results_csv(text):
+    # {email: (status, reason, suggestion)} from a downloaded results file.
+    # Columns are matched by name so extra provider columns are ignored.
+    reader = csv.reader(io.StringIO(text))
+    header = [h.strip().lower() for h in next(reader, [])]
+
+    def column(*names):
+        for name in names:
+            if name in header:
+                return header.index(name)
+        return None
+
+    email_col = column('email', 'email address')
+    code_col = column('debounce_code', 'code')
+    reason_col = column('debounce_reason', 'reason', 'debounce_result', 'result')
+    sugg_col = column('did_you_mean', 'debounce_did_you_mean')
+    if email_col is None or code_col is None:
+        raise BulkError(f"Unexpected results header: {header}")
+
+    results = {}
+    for row in reader:
+        if len(row) <= max(email_col, code_col):
+            continue
+        reason = row[reason_col] if reason_col is not None and reason_col < len(row) else ''
+        sugg = row[sugg_col] if sugg_col is not None and sugg_col < len(row) else ''
+        results[row[email_col].strip().lower()] = result_from_code(row[code_col].strip(), reason, sugg)
+    return results
+
+class ListHost:
+    # DeBounce's bulk API doesn't take a list in the request: upload/?url=...
+    # names a CSV file it downloads itself. Bulk lists are therefore written
+    # into `path`, a directory some web server publishes at `base_url` (an
+    # nginx location, a bucket synced from it, tools/mock_debounce.py --lists),
+    # and removed once their results are in.
+
+    def __init__(self, path, base_url):
+        self.path = path
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+
+    def publish(self, emails):
+        # Writes a one-column CSV under an unguessable name, returns its public URL
+        name = f'{uuid.uuid4().hex}.csv'
+        with open(os.path.join(self.path, name), 'w', encoding='utf-8', newline='') as f:
+            f.write('email\n' + ''.join(f'{email}\n' for email in emails))
+        return self.base_url + name
+
+    def remove(self, url):
+        try:
+            os.remove(os.path.join(self.path, url[len(self.base_url):]))
+        except OSError:
+            pass
+
+def default_list_host():
+    # From DEBOUNCE_LIST_DIR / DEBOUNCE_LIST_URL; None (no bulk lists) unless both are set
+    if DEBOUNCE_LIST_DIR and DEBOUNCE_LIST_URL:
+        return ListHost(DEBOUNCE_LIST_DIR, DEBOUNCE_LIST_URL)
+    return None
+
+class DeBounceClient:
+    # Single-address and bulk list verification over one pooled HTTP session.
+    # Bulk lists need a list_host (ListHost) to publish them for DeBounce to fetch.
+
+    def __init__(self, api_key, pool_size=20, api_url=DEBOUNCE_API_URL, bulk_url=DEBOUNCE_BULK_URL,
+                 timeout=REQUEST_TIMEOUT, list_host=None):
+        self.api_key = api_key
+        self.api_url = api_url
+        self.bulk_url = bulk_url
+        self.timeout = timeout
+        self.list_host = list_host if list_host is not None else default_list_host()
+        self.session = make_session(pool_size)
+        self._upload_session = make_session(1, retries=0)  # A retried upload would be a second (billed) list
+
+    @property
+    def can_bulk(self):
+        return self.list_host is not None
+
+    def verify(self, email):
+        # (status, reason, suggestion); network/API problems come back as Unknown
+        try:
+            response = self.session.get(self.api_url, params={'api': self.api_key, 'email': email}, timeout=self.timeout)
+            resp = response.json()['debounce']
+            return result_from_code(resp.get('code', '0'), resp.get('reason', ''), resp.get('did_you_mean', ''))
+        except Exception:
+            return 'Unknown', 'API Error', ''
+
+    def _bulk_call(self, path, params, session=None):
+        response = (session or self.session).get(self.bulk_url + path, params={'api': self.api_key, **params},
+                                                 timeout=self.timeout)
+        response.raise_for_status()
+        body = response.json()
+        if str(body.get('success')) != '1':
+            raise BulkError(body.get('debounce', {}).get('error') or body.get('error') or f"{path} failed")
+        return body['debounce']
+
+    def upload(self, list_url):
+        # Asks DeBounce to fetch and verify the list at list_url, returns its list id
+        return self._bulk_call('upload/', {'url': list_url}, self._upload_session)['list_id']
+
+    def status(self, list_id):
+        return self._bulk_call('status/', {'list_id': list_id})
+
+    def download(self, link):
+        response = self.session.get(link, timeout=max(self.timeout, 120))
+        response.raise_for_status()
+        return parse_results_csv(response.content.decode('utf-8-sig'))
+
+    def verify_bulk(self, emails, on_progress=None, poll_interval=BULK_POLL_INTERVAL, max_wait=BULK_MAX_WAIT):
+        # Publish, upload, poll until the list is done, download. Returns
+        # {normalized email: (status, reason, suggestion)}; raises BulkError
+        # (or a requests error) so the caller can fall back to single calls.
+        if not self.can_bulk:
+            raise BulkError("No list host to publish bulk lists from (set DEBOUNCE_LIST_DIR and DEBOUNCE_LIST_URL)")
+        list_url = self.list_host.publish(emails)
+        try:
+            list_id = self.upload(list_url)
+            deadline = time.time() + max_wait
+            while True:
+                state = self.status(list_id)
+                if on_progress:
+                    on_progress(float(state.get('percentage') or 0))
+                if state.get('status') == 'completed' and state.get('download_link'):
+                    return self.download(state['download_link'])
+                if state.get('status') in ('failed', 'error'):
+                    raise BulkError(f"List {list_id} failed: {state.get('reason', 'unknown error')}")
+                if time.time() > deadline:
+                    raise BulkError(f"List {list_id} not finished after {max_wait}s")
+                time.sleep(poll_interval)
+        finally:
+            self.list_host.remove(list_url)
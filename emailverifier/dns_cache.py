@@ -0,0 +1,84 @@
+import json
+import time
+
+import dns.resolver
+
+from . import metrics
+from .db import LocalConnection
+
+DNS_CACHE_FILE = 'dns_cache.sqlite3'       # Shared by every verifier process on the box
+NEGATIVE_TTL = 3600                        # Seconds to remember NXDOMAIN / no MX
+MIN_TTL = 300                              # Clamp tiny record TTLs
+MAX_TTL = 86400                            # ...and huge ones
+MEMORY_SIZE = 100000                       # Answers kept in-process in front of SQLite (cleared when full)
+
+NEGATIVE_ERRORS = (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer)
+
+def mx_hosts_from_answer(answer):
+    # Returns (hosts sorted by preference, ttl)
+    mx_hosts = sorted([(r.preference, str(r.exchange).rstrip('.')) for r in answer])
+    return [host for _, host in mx_hosts], answer.rrset.ttl
+
+def resolve_mx(domain, lifetime=None):
+    # Returns (hosts or None, ttl or None). ttl None = don't cache (timeouts, SERVFAIL).
+    try:
+        return mx_hosts_from_answer(dns.resolver.resolve(domain, 'MX', lifetime=lifetime))
+    except NEGATIVE_ERRORS:
+        return None, NEGATIVE_TTL
+    except Exception:
+        return None, None
+
+class DNSCache:
+    # SQLite (WAL mode) so concurrent CLI runs and Streamlit apps share answers,
+    # with an in-process dict (at most MEMORY_SIZE domains) in front to skip the
+    # database on hot domains.
+
+    def __init__(self, path=DNS_CACHE_FILE, negative_ttl=NEGATIVE_TTL):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self._conn = LocalConnection(path)
+        self._memory = {}
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS mx (domain TEXT PRIMARY KEY, hosts TEXT, expires REAL NOT NULL)")
+        conn.execute("DELETE FROM mx WHERE expires < ?", (time.time(),))
+        conn.commit()
+
+    def get(self, domain):
+        # Returns (found, hosts); hosts is None for a cached negative answer
+        now = time.time()
+        entry = self._memory.get(domain)
+        if entry and entry[0] > now:
+            return True, entry[1]
+        row = self._conn().execute("SELECT hosts, expires FROM mx WHERE domain = ?", (domain,)).fetchone()
+        if row and row[1] > now:
+            hosts = json.loads(row[0]) if row[0] is not None else None
+            self._remember(domain, row[1], hosts)
+            return True, hosts
+        return False, None
+
+    def _remember(self, domain, expires, hosts):
+        if len(self._memory) >= MEMORY_SIZE:
+            self._memory.clear()
+        self._memory[domain] = (expires, hosts)
+
+    def put(self, domain, hosts, ttl):
+        if hosts is None:
+            ttl = self.negative_ttl
+        expires = time.time() + min(max(ttl, MIN_TTL), MAX_TTL)
+        self._remember(domain, expires, hosts)
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO mx (domain, hosts, expires) VALUES (?, ?, ?)",
+                     (domain, json.dumps(hosts) if hosts is not None else None, expires))
+        conn.commit()
+
+    def get_mx_record(self, domain, lifetime=None):
+        found, hosts = self.get(domain)
+        if found:
+            metrics.count('dns_cache_hits')
+            return hosts
+        start = time.monotonic()
+        hosts, ttl = resolve_mx(domain, lifetime)
+        metrics.observe(metrics.DNS, time.monotonic() - start)
+        if ttl is not None:
+            self.put(domain, hosts, ttl)
+        return hosts
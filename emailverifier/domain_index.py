@@ -0,0 +1,114 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+
+MAGIC = b'DIX1'
+HEADER = struct.Struct('<4sI')             # Magic, number of domains
+MEMO_SIZE = 65536                          # Recently looked-up domains remembered per index (addresses repeat domains)
+
+def reverse_labels(domain):
+    # 'mail.example.com' -> 'com.example.mail': a domain and its parents share a prefix
+    return '.'.join(reversed(domain.split('.')))
+
+def build_index(domains):
+    # Serialized index: header, count + 1 little-endian uint32 offsets, then
+    # the label-reversed domains sorted bytewise and concatenated
+    keys = sorted({reverse_labels(domain.strip().lower()).encode('utf-8') for domain in domains if domain.strip()})
+    return (HEADER.pack(MAGIC, len(keys)) + struct.pack(f'<{len(keys) + 1}I', 0, *accumulate(map(len, keys)))
+            + b''.join(keys))
+
+def write_index(path, domains):
+    # Written next to the target and renamed, so readers never map a half-written file
+    staging = path + '.tmp'
+    with open(staging, 'wb') as f:
+        f.write(build_index(domains))
+    os.replace(staging, path)
+
+class DomainIndex:
+    # Read-only domain set that also matches subdomains: an index holding
+    # "tempdomain.xyz" contains "mail.tempdomain.xyz". The domains are stored
+    # label-reversed ("xyz.tempdomain") and sorted in one flat buffer, so a
+    # lookup is one binary search per label of the address's domain, and a
+    # 100k-domain list costs about its size in bytes instead of a set of str
+    # objects. Recent answers are memoized, so the gmail.coms of a list cost a
+    # dict lookup. Opened from a file (write_index) the buffer is a read-only mmap:
+    # every process mapping the same file shares its pages, and the index
+    # pickles as just its path, so prefilter workers map it rather than
+    # receiving a copy.
+
+    def __init__(self, data=None, path=None):
+        if path is not None:
+            with open(path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        elif data is None:
+            data = build_index(())
+        self._data = data
+        self.path = path
+        magic, self._count = HEADER.unpack_from(data, 0) if len(data) >= HEADER.size else (None, 0)
+        self._base = HEADER.size + 4 * (self._count + 1)
+        if magic != MAGIC or len(data) < self._base:
+            raise ValueError(f"Not a domain index: {path or 'data'}")
+        offsets = memoryview(data)[HEADER.size:self._base]
+        if sys.byteorder == 'little' and array('I').itemsize == 4:
+            self._offsets = offsets.cast('I')  # Read in place from the mapping
+        else:
+            self._offsets = array('I', offsets)  # Copied, for platforms where the file's layout isn't native
+            if sys.byteorder == 'big':
+                self._offsets.byteswap()
+        if len(data) != self._base + self._offsets[self._count]:
+            raise ValueError(f"Truncated domain index: {path or 'data'}")
+        self._memo = {}
+
+    @classmethod
+    def from_domains(cls, domains):
+        return cls(build_index(domains))  # In memory, for lists that never came from a snapshot
+
+    def __getitem__(self, i):
+        # i-th key (label-reversed, as bytes); makes the index a sequence bisect can search
+        return self._data[self._base + self._offsets[i]:self._base + self._offsets[i + 1]]
+
+    def match(self, domain):
+        # The listed domain covering `domain` (it, or its nearest-to-the-root
+        # listed parent), or None. Expects a lower-cased domain.
+        if domain in self._memo:
+            return self._memo[domain]
+        labels = domain.split('.')
+        found = None
+        key = b''
+        lo = 0
+        for depth, label in enumerate(reversed(labels), 1):
+            key = key + b'.' + label.encode('utf-8') if key else label.encode('utf-8')
+            lo = bisect_left(self, key, lo)  # Longer keys sort after their parents, so the search only narrows
+            if lo == self._count or not self[lo].startswith(key):
+                break  # Nothing listed under this suffix, so nothing deeper either
+            if self[lo] == key:
+                found = '.'.join(labels[-depth:])
+                break
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[domain] = found
+        return found
+
+    def __contains__(self, domain):
+        return self.match(domain) is not None
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        # Listed domains, in index (label-reversed) order
+        for i in range(self._count):
+            yield reverse_labels(self[i].decode('utf-8'))
+
+    def __reduce__(self):
+        if self.path is not None:
+            return DomainIndex, (None, self.path)
+        return DomainIndex, (bytes(self._data),)
+
+def as_domain_index(domains):
+    # Indexes pass through; any other iterable of domains is indexed in memory
+    return domains if isinstance(domains, DomainIndex) else DomainIndex.from_domains(domains)
@@ -0,0 +1,51 @@
+import csv
+import gzip
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Job results as columns and as download files, built a batch at a time
+# straight from the job store (JobStore.iter_results), never as one list of
+# dicts or a full DataFrame. Only the GUIs import this module: streamlit
+# brings pandas and pyarrow with it.
+
+COLUMNS = ['Email', 'Status', 'Reason', 'Suggestion', 'MX', 'SMTP Code']
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+# Status, reason, suggestion and MX repeat across rows, so they are stored as codes into a table of distinct values
+SCHEMA = pa.schema([('Email', pa.string()), ('Status', _CATEGORY), ('Reason', _CATEGORY), ('Suggestion', _CATEGORY),
+                    ('MX', _CATEGORY), ('SMTP Code', pa.int16())])
+CSV_COMPRESSION = 6                        # gzip level of the CSV downloads (9 is slower for a few % smaller)
+PARQUET_COMPRESSION = 'zstd'
+
+def to_batch(rows):
+    # JobRows as one Arrow RecordBatch: a contiguous buffer per column
+    columns = list(zip(*rows)) if rows else [()] * len(COLUMNS)
+    return pa.RecordBatch.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, SCHEMA)],
+                                      schema=SCHEMA)
+
+def to_frame(rows):
+    # DataFrame for one page of the results table (categorical columns, SMTP code as a nullable int)
+    return to_batch(rows).to_pandas(types_mapper={pa.int16(): pd.Int16Dtype()}.get)
+
+def csv_gz(batches):
+    # gzip-compressed CSV (header + every row of every batch), as bytes
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=CSV_COMPRESSION) as f:
+        text = io.TextIOWrapper(f, encoding='utf-8', newline='')
+        writer = csv.writer(text)
+        writer.writerow(COLUMNS)
+        for rows in batches:
+            writer.writerows(['' if value is None else value for value in row] for row in rows)
+        text.flush()
+        text.detach()
+    return buffer.getvalue()
+
+def parquet(batches):
+    # Every row of every batch as one Parquet file, as bytes
+    sink = pa.BufferOutputStream()
+    with pq.ParquetWriter(sink, SCHEMA, compression=PARQUET_COMPRESSION) as writer:
+        for rows in batches:
+            writer.write_batch(to_batch(rows))
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,235 @@
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .db import LocalConnection
+
+JOBS_DB_FILE = 'verification_jobs.sqlite3'
+MAX_RUNNING_JOBS = 2                       # Jobs verifying at once; later ones wait their turn
+SHARED_WORKERS = 200                       # Probe threads shared by every job of the process (a cap: limits adapt below)
+JOB_FLUSH_INTERVAL = 1.0                   # Seconds between result commits (what pollers see)
+JOB_TTL = 7 * 86400                        # Seconds finished jobs and their results are kept
+JOB_HEARTBEAT = 10.0                       # Seconds between an app process's "still running" stamps on its jobs
+JOB_ABANDONED_AFTER = 60.0                 # Unfinished jobs without a stamp for this long lost their process
+RESULT_BATCH = 50000                       # Rows per batch when exporting a job's results
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+JobInfo = namedtuple('JobInfo', 'id app label status total done message error created started finished')
+JobRow = namedtuple('JobRow', 'email status reason suggestion mx smtp_code')
+
+class JobCancelled(Exception):
+    pass
+
+class JobStore:
+    # Job state and every finished result, in SQLite so any Streamlit session
+    # (or a refreshed browser) can pick a job up by its ID and page through
+    # its results while it is still running.
+
+    def __init__(self, path=JOBS_DB_FILE, ttl=JOB_TTL):
+        self._conn = LocalConnection(path)
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, app TEXT NOT NULL, label TEXT, "
+                     "status TEXT NOT NULL, total INTEGER NOT NULL, done INTEGER NOT NULL DEFAULT 0, message TEXT, "
+                     "error TEXT, created REAL NOT NULL, started REAL, finished REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS job_results (job_id TEXT NOT NULL, seq INTEGER NOT NULL, email TEXT, "
+                     "status TEXT, reason TEXT, suggestion TEXT, mx TEXT, smtp_code INTEGER, input_row INTEGER, "
+                     "PRIMARY KEY (job_id, seq))")
+        if 'input_row' not in {column[1] for column in conn.execute("PRAGMA table_info(job_results)")}:
+            conn.execute("ALTER TABLE job_results ADD COLUMN input_row INTEGER")  # Databases from before row order
+        if 'owner' not in {column[1] for column in conn.execute("PRAGMA table_info(jobs)")}:
+            conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")  # Databases from before heartbeats
+            conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat REAL")
+        conn.execute("CREATE INDEX IF NOT EXISTS job_results_input_row ON job_results (job_id, input_row)")
+        cutoff = time.time() - ttl
+        conn.execute("DELETE FROM job_results WHERE job_id IN (SELECT id FROM jobs WHERE created < ?)", (cutoff,))
+        conn.execute("DELETE FROM jobs WHERE created < ?", (cutoff,))
+        conn.commit()
+
+    def create(self, app, total, label='', owner=None):
+        # owner: the JobManager running the job, which keeps its heartbeat fresh
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        conn = self._conn()
+        conn.execute("INSERT INTO jobs (id, app, label, status, total, created, owner, heartbeat) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (job_id, app, label, QUEUED, total, now, owner, now))
+        conn.commit()
+        return job_id
+
+    def heartbeat(self, owner):
+        # The owner's process is alive: stamps its unfinished jobs
+        conn = self._conn()
+        conn.execute("UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status IN (?, ?)",
+                     (time.time(), owner, QUEUED, RUNNING))
+        conn.commit()
+
+    def interrupt_abandoned(self, app, after=JOB_ABANDONED_AFTER):
+        # Jobs of this app left queued/running by a process that stopped (no
+        # heartbeat for `after` seconds) can't be resumed. Another process of
+        # the same app (a second Streamlit server) keeps stamping its own.
+        conn = self._conn()
+        conn.execute("UPDATE jobs SET status = ?, error = ?, finished = ? WHERE app = ? AND status IN (?, ?) "
+                     "AND (heartbeat IS NULL OR heartbeat < ?)",
+                     (FAILED, "Interrupted (the app was restarted)", time.time(), app, QUEUED, RUNNING,
+                      time.time() - after))
+        conn.commit()
+
+    def update(self, job_id, **fields):
+        conn = self._conn()
+        conn.execute(f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                     (*fields.values(), job_id))
+        conn.commit()
+
+    def add_results(self, job_id, first_seq, rows):
+        # rows: (input row, JobRow) pairs numbered from first_seq; also advances the job's done count
+        conn = self._conn()
+        conn.executemany("INSERT OR REPLACE INTO job_results (job_id, seq, input_row, email, status, reason, suggestion, "
+                         "mx, smtp_code) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         [(job_id, first_seq + i, input_row, *row) for i, (input_row, row) in enumerate(rows)])
+        conn.execute("UPDATE jobs SET done = ? WHERE id = ?", (first_seq + len(rows), job_id))
+        conn.commit()
+
+    def info(self, job_id):
+        row = self._conn().execute(f"SELECT {', '.join(JobInfo._fields)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return JobInfo(*row) if row else None
+
+    def _select(self, job_id, status):
+        sql = "SELECT email, status, reason, suggestion, mx, smtp_code FROM job_results WHERE job_id = ?"
+        return (sql + " AND status = ?", (job_id, status)) if status else (sql, (job_id,))
+
+    def results(self, job_id, offset=0, limit=-1, status=None, input_order=False):
+        # [JobRow, ...] in the order they finished (or, with input_order, in
+        # the order of the input rows): up to limit (-1 = all) from the
+        # offset-th on, counting only results with the given status if any
+        sql, params = self._select(job_id, status)
+        if status or input_order:
+            order = "input_row, seq" if input_order else "seq"
+            sql, params = sql + f" ORDER BY {order} LIMIT ? OFFSET ?", (*params, limit, offset)
+        else:  # seq is the position, so the offset is a seek rather than a scan
+            sql, params = sql + " AND seq >= ? ORDER BY seq LIMIT ?", (*params, offset, limit)
+        return [JobRow(*row) for row in self._conn().execute(sql, params)]
+
+    def iter_results(self, job_id, status=None, batch_size=RESULT_BATCH):
+        # Every result (with the given status) in input row order, as lists of
+        # JobRows, so an export never holds them all
+        sql, params = self._select(job_id, status)
+        cursor = self._conn().execute(sql + " ORDER BY input_row, seq", params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [JobRow(*row) for row in rows]
+
+    def counts(self, job_id):
+        # {status: number of results}
+        return dict(self._conn().execute("SELECT status, COUNT(*) FROM job_results WHERE job_id = ? GROUP BY status",
+                                         (job_id,)))
+
+class JobManager:
+    # Runs Pipelines in the background so a Streamlit rerun or a closed tab
+    # never stops a verification. One per process (st.cache_resource): at
+    # most max_running jobs run at once, the rest queue, and the thread-pool
+    # engine of every job probes through the one shared `executor` instead of
+    # a pool per session. A heartbeat thread marks this process's jobs as
+    # alive, so a manager starting up (a restart, or another server process
+    # of the same app) only fails the jobs nobody is running any more.
+
+    def __init__(self, app, store=None, max_running=MAX_RUNNING_JOBS, workers=SHARED_WORKERS,
+                 flush_interval=JOB_FLUSH_INTERVAL, heartbeat=JOB_HEARTBEAT):
+        self.app = app
+        self.owner = uuid.uuid4().hex[:12]
+        self.store = store if store is not None else JobStore()
+        self.flush_interval = flush_interval
+        self.heartbeat = heartbeat
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='probe')
+        self._runner = ThreadPoolExecutor(max_workers=max_running, thread_name_prefix='job')
+        self._queued = []
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self.store.interrupt_abandoned(app)
+        threading.Thread(target=self._beat, daemon=True, name='job-heartbeat').start()
+
+    def _beat(self):
+        while True:
+            time.sleep(self.heartbeat)
+            try:
+                self.store.heartbeat(self.owner)
+            except sqlite3.OperationalError:
+                pass  # Database busy: the next beat is well within JOB_ABANDONED_AFTER
+
+    def create(self, total, label=''):
+        # A job ID before the pipeline exists, so backend hooks can note() progress on it
+        return self.store.create(self.app, total, label, self.owner)
+
+    def start(self, job_id, pipeline, emails):
+        with self._lock:
+            self._queued.append(job_id)
+        self._runner.submit(self._run, job_id, pipeline, emails)
+        return job_id
+
+    def submit(self, pipeline, emails, label=''):
+        return self.start(self.create(len(emails), label), pipeline, emails)
+
+    def note(self, job_id, message):
+        # Free-text progress shown next to the job (e.g. a bulk upload's percentage)
+        self.store.update(job_id, message=message)
+
+    def cancel(self, job_id):
+        with self._lock:
+            self._cancelled.add(job_id)
+
+    def queue_position(self, job_id):
+        # Jobs ahead of a queued one (0 = next to start), None once it runs
+        with self._lock:
+            return self._queued.index(job_id) if job_id in self._queued else None
+
+    def _run(self, job_id, pipeline, emails):
+        with self._lock:
+            self._queued.remove(job_id)
+        if job_id in self._cancelled:
+            self.store.update(job_id, status=CANCELLED, finished=time.time())
+            return
+        self.store.update(job_id, status=RUNNING, started=time.time())
+        pending = []
+        written = 0
+        last_flush = time.monotonic()
+
+        def flush():
+            nonlocal written, last_flush
+            if pending:
+                self.store.add_results(job_id, written, pending)
+                written += len(pending)
+                pending.clear()
+            last_flush = time.monotonic()
+
+        def until_cancelled(emails):
+            # The pipeline's input: once the job is cancelled nothing more is read (and submitted)
+            for email in emails:
+                if job_id in self._cancelled:
+                    raise JobCancelled()
+                yield email
+
+        def on_result(email, result, stage, row):
+            if job_id in self._cancelled:
+                raise JobCancelled()
+            pending.append((row, JobRow(email, result.status, result.reason, result.suggestion or None, result.mx,
+                                        result.smtp_code)))
+            if time.monotonic() - last_flush >= self.flush_interval:
+                flush()
+
+        try:
+            pipeline.run(until_cancelled(emails), on_result)
+            status, error = DONE, None
+        except JobCancelled:
+            status, error = CANCELLED, None
+        except Exception as e:
+            status, error = FAILED, f"{type(e).__name__}: {e}"
+        finally:
+            with self._lock:
+                self._cancelled.discard(job_id)
+        flush()
+        self.store.update(job_id, status=status, error=error, finished=time.time())
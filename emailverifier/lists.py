@@ -0,0 +1,175 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections import namedtuple
+
+import requests
+
+from .domain_index import DomainIndex, write_index
+from .prefilter import ListChecker
+from .roles import ROLE_SEPARATORS
+
+DISPOSABLE_LIST_URL = 'https://raw.githubusercontent.com/disposable-email-domains/disposable-email-domains/main/disposable_email_blocklist.conf'
+ROLE_LIST_URL = 'https://raw.githubusercontent.com/mixmaxhq/role-based-email-addresses/master/roles.txt'  # ~400 common roles
+FREE_LIST_URL = 'https://raw.githubusercontent.com/Kikobeats/free-email-domains/master/domains.json'
+LIST_TIMEOUT = 15
+LISTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lists')
+KEEP_VERSIONS = 3                          # Snapshots kept on disk (the current one and older ones to roll back to)
+MAX_SHRINK = 0.5                           # A refresh losing more than this share of a list is refused (truncated download?)
+
+# Snapshot layout: lists/<version>/<name>.txt.gz (sorted, one entry per
+# line) plus manifest.json, and lists/CURRENT naming the version in use. The
+# domain lists also get a <name>.idx DomainIndex, memory-mapped when loaded.
+# Verifiers only ever read a snapshot; refresh_snapshot() (see
+# tools/refresh_lists.py) is the one place that downloads.
+Lists = namedtuple('Lists', 'disposable roles free version')
+
+class ListsError(Exception):
+    # No usable snapshot: the verifiers refuse to run rather than silently
+    # skip the disposable / role / free checks
+    pass
+
+# name -> (what it is, source URL, parser)
+SOURCES = {
+    'disposable': ('disposable domains', DISPOSABLE_LIST_URL, 'lines'),
+    'roles': ('role-based prefixes', ROLE_LIST_URL, 'lines'),
+    'free': ('free email domains', FREE_LIST_URL, 'json'),
+}
+INDEXED = ('disposable', 'free')           # Lists of domains, loaded as a DomainIndex (subdomains match too)
+
+def download_lines(url, timeout=LIST_TIMEOUT):
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    return {line.strip().lower() for line in response.text.splitlines() if line.strip()}
+
+def download_json_list(url, timeout=LIST_TIMEOUT):
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    return {entry.strip().lower() for entry in response.json() if entry.strip()}
+
+def current_version(path=LISTS_DIR):
+    # Name of the snapshot in use, or None before the first refresh
+    try:
+        with open(os.path.join(path, 'CURRENT'), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def read_list(path, version, name):
+    with gzip.open(os.path.join(path, version, f'{name}.txt.gz'), 'rt', encoding='utf-8') as f:
+        return {line.rstrip('\n') for line in f if line.strip()}
+
+def read_index(path, version, name):
+    # DomainIndex mapped from the snapshot. Snapshots written before indexes
+    # existed (or with a damaged one) are indexed from the list itself.
+    index = os.path.join(path, version, f'{name}.idx')
+    if os.path.exists(index):
+        try:
+            return DomainIndex(path=index)
+        except ValueError:
+            pass
+    write_index(index, read_list(path, version, name))
+    return DomainIndex(path=index)
+
+def read_manifest(path=LISTS_DIR, version=None):
+    version = version or current_version(path)
+    if not version:
+        return None
+    with open(os.path.join(path, version, 'manifest.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_lists(free=True, path=LISTS_DIR, version=None):
+    # Lists(disposable domains, role prefixes, free provider domains, version)
+    # from the current (or the given) snapshot; no network. The domain lists
+    # are DomainIndex objects mapped from the snapshot, shared by every
+    # process; free=False skips the free-provider list. Raises ListsError
+    # when there is no snapshot (a fresh clone: the lists aren't committed)
+    # or it can't be read.
+    version = version or current_version(path)
+    if version is None:
+        raise ListsError(f"No list snapshot in {path}: run `python tools/refresh_lists.py` once "
+                         "to download the disposable/role/free lists.")
+    try:
+        return Lists(read_index(path, version, 'disposable'), read_list(path, version, 'roles'),
+                     read_index(path, version, 'free') if free else set(), version)
+    except (OSError, EOFError, ValueError) as e:
+        raise ListsError(f"Could not read list snapshot {version} in {path} ({e}): run "
+                         "`python tools/refresh_lists.py`, or `--use VERSION` to go back to a kept one.")
+
+def make_checker(lists, skip_free=False, bare_roles=False):
+    # ListChecker for a profile: free providers only fail the local checks
+    # when skip_free is set, bare_roles also counts "info" in "infosales"
+    separators = ROLE_SEPARATORS + ('',) if bare_roles else ROLE_SEPARATORS
+    return ListChecker(lists.disposable, lists.roles, lists.free if skip_free else (), separators)
+
+def diff_lists(old, new):
+    # {name: (added, removed)} as sorted lists, old/new being {name: set}
+    return {name: (sorted(new[name] - old.get(name, set())), sorted(old.get(name, set()) - new[name])) for name in new}
+
+def write_snapshot(path, lists, sources=SOURCES):
+    # Writes lists ({name: set}) as a new version directory, returns its name.
+    # Everything lands in a temporary directory first and is renamed into
+    # place, so a half-written snapshot is never visible.
+    version = time.strftime('%Y%m%d-%H%M%S', time.gmtime())
+    while os.path.exists(os.path.join(path, version)):
+        version += '-1'
+    staging = os.path.join(path, f'.{version}.tmp')
+    os.makedirs(staging)
+    manifest = {'version': version, 'created': time.time(), 'lists': {}}
+    for name, entries in lists.items():
+        data = ''.join(f'{entry}\n' for entry in sorted(entries)).encode('utf-8')
+        with gzip.open(os.path.join(staging, f'{name}.txt.gz'), 'wb') as f:
+            f.write(data)
+        if name in INDEXED:
+            write_index(os.path.join(staging, f'{name}.idx'), entries)
+        manifest['lists'][name] = {'source': sources[name][1], 'entries': len(entries),
+                                   'sha256': hashlib.sha256(data).hexdigest()}
+    with open(os.path.join(staging, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.rename(staging, os.path.join(path, version))
+    return version
+
+def activate(path, version, keep=KEEP_VERSIONS):
+    # Atomically points CURRENT at version, then prunes all but the newest `keep` snapshots
+    pointer = os.path.join(path, 'CURRENT.tmp')
+    with open(pointer, 'w', encoding='utf-8') as f:
+        f.write(version + '\n')
+    os.replace(pointer, os.path.join(path, 'CURRENT'))
+    versions = sorted(entry for entry in os.listdir(path)
+                      if os.path.isfile(os.path.join(path, entry, 'manifest.json')))
+    for old in versions[:-keep] if keep else []:
+        if old != version:
+            shutil.rmtree(os.path.join(path, old), ignore_errors=True)
+
+def refresh_snapshot(path=LISTS_DIR, timeout=LIST_TIMEOUT, max_shrink=MAX_SHRINK, force=False, keep=KEEP_VERSIONS):
+    # Downloads every list, compares it with the current snapshot and swaps
+    # the new one in. Returns (version or None, {name: (added, removed)}, problems);
+    # nothing is swapped in when a download fails, or when a list comes back
+    # empty or shrinks by more than max_shrink (unless force).
+    os.makedirs(path, exist_ok=True)
+    old = {}
+    version = current_version(path)
+    if version:
+        old = {name: read_list(path, version, name) for name in SOURCES}
+    new, problems = {}, []
+    for name, (what, url, kind) in SOURCES.items():
+        try:
+            new[name] = (download_json_list if kind == 'json' else download_lines)(url, timeout)
+        except Exception as e:
+            problems.append(f"Could not download the {what} list ({e})")
+            continue
+        if not new[name]:
+            problems.append(f"The {what} list came back empty")
+        elif name in old and len(new[name]) < len(old[name]) * (1 - max_shrink):
+            problems.append(f"The {what} list shrank from {len(old[name]):,} to {len(new[name]):,} entries")
+    changes = diff_lists(old, new)
+    if any(name not in new for name in SOURCES) or (problems and not force):
+        return None, changes, problems
+    if version and not any(added or removed for added, removed in changes.values()):
+        return version, changes, problems  # Nothing changed: keep the current snapshot
+    version = write_snapshot(path, new)
+    activate(path, version, keep)
+    return version, changes, problems
@@ -0,0 +1,114 @@
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+LOG_BATCH = 1000                           # Records written per flush, at most
+LOG_MAX_BYTES = 50 * 1024 * 1024           # Rotate the log file at this size (0 = never)
+LOG_BACKUPS = 3                            # Rotated files kept (verification_log.txt.1, .2, ...)
+TEXT_FORMAT = '[%(asctime)s] %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+class JSONFormatter(logging.Formatter):
+    # One JSON object per line: time, level, message, plus the record's
+    # structured `fields` (logger.log(..., extra={'fields': {...}}))
+
+    def format(self, record):
+        entry = {'time': self.formatTime(record, DATE_FORMAT), 'level': record.levelname, 'message': record.getMessage()}
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _FlushPerBatch:
+    # emit() no longer flushes after every line: LogWriter calls flush_batch()
+    # once per batch (closing or rotating the file still flushes everything)
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        with self.lock:
+            if self.stream is not None:
+                self.stream.flush()
+
+class BatchedFileHandler(_FlushPerBatch, RotatingFileHandler):
+    pass
+
+class BatchedStreamHandler(_FlushPerBatch, logging.StreamHandler):
+    pass
+
+class LogWriter:
+    # Runs the real handlers on a background thread; the writer takes
+    # whatever has queued up (up to batch_size records), writes it and
+    # flushes each handler once. close() writes out everything still queued.
+    # log() is the hot path: it only queues (level, time, message, fields) and
+    # the LogRecord is built on the writer thread, skipping the caller lookup,
+    # record set-up and formatting logger.log() does in the caller's thread
+    # (several times the cost of the queue put). Records logged the normal
+    # way reach the same queue through the logger's QueueHandler.
+
+    def __init__(self, name, handlers, batch_size=LOG_BATCH):
+        self.name = name
+        self.queue = queue.SimpleQueue()
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def log(self, level, message, fields=None):
+        self.queue.put((level, time.time(), message, fields))
+
+    def _record(self, item):
+        level, created, message, fields = item
+        record = logging.LogRecord(self.name, level, '', 0, message, None, None)
+        record.created, record.msecs, record.fields = created, created % 1 * 1000, fields
+        return record
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for record in batch:
+                if record is None:
+                    self._flush()
+                    return
+                if type(record) is tuple:
+                    record = self._record(record)
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            self._flush()
+
+    def _flush(self):
+        for handler in self.handlers:
+            handler.flush_batch()
+
+    def close(self):
+        self.queue.put(None)
+        self._thread.join()
+        for handler in self.handlers:
+            handler.close()
+
+def start_logging(logger, path, json_lines=False, console_level=logging.DEBUG, max_bytes=LOG_MAX_BYTES,
+                  backups=LOG_BACKUPS, batch_size=LOG_BATCH):
+    # Sends logger's records through a LogWriter: every record to the
+    # (rotating) log file, as text or JSON lines, and console_level and up to
+    # stdout as plain messages. Returns the writer: log() through it on hot
+    # paths, close() it when done.
+    file_handler = BatchedFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+    file_handler.setFormatter(JSONFormatter() if json_lines else logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+    console = BatchedStreamHandler(sys.stdout)
+    console.setLevel(console_level)
+    writer = LogWriter(logger.name, [file_handler, console], batch_size)
+    logger.handlers = [QueueHandler(writer.queue)]
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    return writer
@@ -0,0 +1,255 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Where a run's time goes: per-stage timers (histograms overall and per MX
+# host) and result counters, recorded by the verification engine into one
+# process-wide REGISTRY (like prometheus_client's default registry) and
+# served in the Prometheus text format by start_metrics_server().
+
+METRICS_HOST = '127.0.0.1'                 # Local only
+METRICS_PORT = 9108                        # http://127.0.0.1:9108/metrics
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)  # Upper bounds (seconds)
+MAX_MX_HOSTS = 200                         # MX hosts timed one by one; later ones are added up under "other"
+PREFIX = 'emailverifier'
+
+# Stages, in the order an address goes through them. The SMTP ones match
+# smtp_session's phases (connect = TCP connect, banner = wait for the 220).
+LOCAL = 'local'
+DNS = 'dns'
+CONNECT = 'connect'
+BANNER = 'banner'
+HELO = 'helo'
+MAIL = 'mail'
+RCPT = 'rcpt'
+STAGES = (LOCAL, DNS, CONNECT, BANNER, HELO, MAIL, RCPT)
+OTHER_HOSTS = 'other'
+
+class Histogram:
+    # Observation counts per bucket (not cumulative; render() adds them up),
+    # sum, count and the largest observation
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds, n=1):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += n
+        self.sum += seconds * n
+        self.count += n
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        # Estimated from the buckets the way PromQL's histogram_quantile does
+        # (linear within the bucket), but never above the largest observation
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(self.buckets):
+                    return self.max
+                lower = self.buckets[i - 1] if i else 0.0
+                return min(self.max, lower + (self.buckets[i] - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+class Metrics:
+    # Thread-safe timers and counters for one process. Every recording call is
+    # a lock, a bisect and a few additions, cheap enough for every RCPT.
+
+    def __init__(self, buckets=BUCKETS, max_hosts=MAX_MX_HOSTS):
+        self.buckets = buckets
+        self.max_hosts = max_hosts
+        self.started = time.time()
+        self._stages = {}
+        self._hosts = {}                   # (mx, stage) -> Histogram
+        self._host_names = set()
+        self._results = defaultdict(int)   # (source, status, reason) -> count
+        self._counters = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _histogram(self, histograms, key):
+        if key not in histograms:
+            histograms[key] = Histogram(self.buckets)
+        return histograms[key]
+
+    def observe(self, stage, seconds, mx=None, count=1):
+        # count > 1: that many observations averaging seconds / count each (a chunk of local checks)
+        with self._lock:
+            self._histogram(self._stages, stage).observe(seconds / count, count)
+            if mx is not None:
+                if mx not in self._host_names:
+                    if len(self._host_names) >= self.max_hosts:
+                        mx = OTHER_HOSTS
+                    self._host_names.add(mx)
+                self._histogram(self._hosts, (mx, stage)).observe(seconds / count, count)
+
+    def result(self, status, reason, source):
+        with self._lock:
+            self._results[source, status, reason] += 1
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            for collection in (self._stages, self._hosts, self._host_names, self._results, self._counters):
+                collection.clear()
+
+    def stage_summary(self):
+        # [{stage, count, seconds, mean, p50, p95, p99}, ...], STAGES order first
+        with self._lock:
+            stages = sorted(self._stages.items(),
+                            key=lambda item: (STAGES.index(item[0]) if item[0] in STAGES else len(STAGES), item[0]))
+            return [_summary(stage=stage, histogram=histogram) for stage, histogram in stages]
+
+    def host_summary(self, top=10):
+        # [(mx, total seconds, {stage: seconds}), ...]: the top MX hosts by time spent talking to them
+        with self._lock:
+            hosts = defaultdict(dict)
+            for (mx, stage), histogram in self._hosts.items():
+                hosts[mx][stage] = histogram.sum
+        hosts = [(mx, sum(stages.values()), stages) for mx, stages in hosts.items()]
+        return sorted(hosts, key=lambda host: -host[1])[:top]
+
+    def result_counts(self, top=None):
+        # [(count, status, reason), ...], most frequent first, over every source
+        with self._lock:
+            totals = defaultdict(int)
+            for (_, status, reason), n in self._results.items():
+                totals[status, reason] += n
+        return sorted(((n, status, reason) for (status, reason), n in totals.items()), reverse=True)[:top]
+
+    def render(self, health=None):
+        # Prometheus text exposition format (0.0.4); with a HealthRegistry,
+        # its per-MX counters and circuit states too
+        lines = []
+        with self._lock:
+            _histograms(lines, f'{PREFIX}_stage_seconds', "Seconds per verification stage",
+                        {(('stage', stage),): histogram for stage, histogram in self._stages.items()})
+            _histograms(lines, f'{PREFIX}_mx_stage_seconds', "Seconds per SMTP stage and MX host",
+                        {(('mx', mx), ('stage', stage)): histogram for (mx, stage), histogram in self._hosts.items()})
+            lines += [f'# HELP {PREFIX}_results_total Results by source, status and reason',
+                      f'# TYPE {PREFIX}_results_total counter']
+            lines += [f'{PREFIX}_results_total{_labels(source=source, status=status, reason=reason)} {n}'
+                      for (source, status, reason), n in sorted(self._results.items())]
+            for name, n in sorted(self._counters.items()):
+                lines += [f'# TYPE {PREFIX}_{name}_total counter', f'{PREFIX}_{name}_total {n}']
+        if health is not None:
+            hosts = sorted(health.snapshot().items(), key=lambda item: -item[1]['probes'])[:self.max_hosts]
+            for field, kind in (('probes', 'counter'), ('timeouts', 'counter'), ('temp_failures', 'counter'),
+                                ('perm_failures', 'counter'), ('circuit_opens', 'counter'), ('avg_latency', 'gauge')):
+                name = f'{PREFIX}_mx_{field}' + ('_total' if kind == 'counter' else '_seconds')
+                lines.append(f'# TYPE {name} {kind}')
+                lines += [f'{name}{_labels(mx=mx)} {values[field]}' for mx, values in hosts
+                          if values[field] is not None]
+            lines.append(f'# TYPE {PREFIX}_mx_circuit_open gauge')
+            lines += [f'{PREFIX}_mx_circuit_open{_labels(mx=mx)} {int(values["state"] != "closed")}'
+                      for mx, values in hosts]
+            lines.append(f'# TYPE {PREFIX}_mx_connection_limit gauge')
+            lines += [f'{PREFIX}_mx_connection_limit{_labels(mx=mx)} {values["connection_limit"]}'
+                      for mx, values in hosts]
+            lines.append(f'# TYPE {PREFIX}_concurrency_limit gauge')
+            lines.append(f'{PREFIX}_concurrency_limit {health.concurrency.global_limit()}')
+        lines.append(f'# TYPE {PREFIX}_start_time_seconds gauge')
+        lines.append(f'{PREFIX}_start_time_seconds {self.started}')
+        return '\n'.join(lines) + '\n'
+
+def _summary(histogram, **labels):
+    return dict(labels, count=histogram.count, seconds=histogram.sum, mean=histogram.sum / histogram.count,
+                p50=histogram.quantile(0.5), p95=histogram.quantile(0.95), p99=histogram.quantile(0.99))
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+def _labels(*pairs, **labels):
+    pairs = pairs + tuple(labels.items())
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}' if pairs else ''
+
+def _histograms(lines, name, help_text, histograms):
+    lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for labels, histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, n in zip(histogram.buckets + ('+Inf',), histogram.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{_labels(*labels, le=bound)} {cumulative}')
+        lines.append(f'{name}_sum{_labels(*labels)} {histogram.sum}')
+        lines.append(f'{name}_count{_labels(*labels)} {histogram.count}')
+
+REGISTRY = Metrics()
+
+def observe(stage, seconds, mx=None, count=1):
+    REGISTRY.observe(stage, seconds, mx, count)
+
+def count(name, n=1):
+    REGISTRY.count(name, n)
+
+class Stopwatch:
+    # Times the stages of one SMTP dialogue into REGISTRY: lap(next) records
+    # the time since the last lap under the stage that just ended and starts
+    # `next` (None = stop timing until start()); stop() records the stage in
+    # progress, i.e. the one a failure or timeout happened in.
+
+    def __init__(self, stage, mx=None, metrics=None):
+        self.mx = mx
+        self.metrics = metrics if metrics is not None else REGISTRY
+        self.start(stage)
+
+    def start(self, stage):
+        self.stage, self.mark = stage, time.monotonic()
+
+    def lap(self, stage):
+        now = time.monotonic()
+        if self.stage is not None:
+            self.metrics.observe(self.stage, now - self.mark, self.mx)
+        self.stage, self.mark = stage, now
+
+    def stop(self):
+        self.lap(None)
+
+class MetricsServer:
+    # GET /metrics on a daemon thread (ThreadingHTTPServer), rendered fresh per scrape
+
+    def __init__(self, port=METRICS_PORT, host=METRICS_HOST, metrics=None, health=None):
+        metrics = metrics if metrics is not None else REGISTRY
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.render(health).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes would flood the console
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.url = f'http://{host}:{self._server.server_address[1]}/metrics'
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST, metrics=None, health=None):
+    # The running MetricsServer, or None if the port can't be bound (taken by another verifier)
+    try:
+        return MetricsServer(port, host, metrics, health)
+    except OSError:
+        return None
@@ -0,0 +1,104 @@
+import threading
+import time
+
+from .adaptive import AdaptiveConcurrency
+
+CIRCUIT_FAILURES = 3                       # Unanswered probes in a row that open an MX's circuit
+CIRCUIT_COOLDOWN = 120                     # Seconds an open circuit skips the MX before letting probes through again
+LATENCY_SMOOTHING = 0.2                    # Weight of the newest sample in the latency average
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+class HostHealth:
+    # Counters for one MX host; read them through HealthRegistry.snapshot()
+
+    def __init__(self):
+        self.probes = 0
+        self.timeouts = 0                  # No reply at all: refused, dropped or timed out
+        self.accepted = 0
+        self.temp_failures = 0             # 4xx
+        self.perm_failures = 0             # 5xx
+        self.latency = None                # Smoothed seconds until the RCPT reply
+        self.failures_in_row = 0
+        self.opened_at = None
+        self.circuit_opens = 0
+
+class HealthRegistry:
+    # Per-MX health shared by every worker of a process. After `failures`
+    # unanswered probes in a row the host's circuit opens and usable() leaves
+    # it out for `cooldown` seconds, so callers report "MX unreachable" at once
+    # instead of queueing more timeouts. After the cooldown probes go through
+    # again (half-open): one answer closes the circuit, one more miss reopens it.
+    # Every probe also feeds `concurrency`, the adaptive connection limits.
+
+    def __init__(self, failures=CIRCUIT_FAILURES, cooldown=CIRCUIT_COOLDOWN, concurrency=None):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.concurrency = concurrency if concurrency is not None else AdaptiveConcurrency()
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, mx_host):
+        if mx_host not in self._hosts:
+            self._hosts[mx_host] = HostHealth()
+        return self._hosts[mx_host]
+
+    def record(self, mx_host, code, latency=None):
+        #   code: RCPT reply code, or None if the MX never answered
+        self.concurrency.sample(mx_host, code, latency)
+        with self._lock:
+            host = self._host(mx_host)
+            host.probes += 1
+            if code is None:
+                host.timeouts += 1
+                host.failures_in_row += 1
+                if host.failures_in_row >= self.failures:
+                    if host.opened_at is None:
+                        host.circuit_opens += 1
+                    host.opened_at = time.monotonic()
+                return
+            if 200 <= code <= 299:
+                host.accepted += 1
+            elif 400 <= code <= 499:
+                host.temp_failures += 1
+            elif 500 <= code <= 599:
+                host.perm_failures += 1
+            if latency is not None:
+                host.latency = latency if host.latency is None else \
+                    LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * host.latency
+            host.failures_in_row = 0
+            host.opened_at = None
+
+    def state(self, mx_host):
+        host = self._hosts.get(mx_host)
+        if host is None or host.opened_at is None:
+            return CLOSED
+        if time.monotonic() - host.opened_at < self.cooldown:
+            return OPEN
+        return HALF_OPEN
+
+    def is_open(self, mx_host):
+        return self.state(mx_host) == OPEN
+
+    def usable(self, mx_hosts):
+        # The hosts worth probing, in preference order
+        return [mx for mx in mx_hosts if not self.is_open(mx)]
+
+    def snapshot(self):
+        # {mx_host: {counter: value}} for logs, tables and metrics
+        with self._lock:
+            hosts = list(self._hosts.items())
+        return {mx: {
+            'state': self.state(mx),
+            'probes': host.probes,
+            'timeouts': host.timeouts,
+            'accepted': host.accepted,
+            'temp_failures': host.temp_failures,
+            'perm_failures': host.perm_failures,
+            'timeout_rate': host.timeouts / host.probes if host.probes else 0.0,
+            'avg_latency': host.latency,
+            'circuit_opens': host.circuit_opens,
+            'connection_limit': self.concurrency.host_limit(mx),
+        } for mx, host in hosts}
@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from .mx_health import HealthRegistry
+from .smtp_session import RCPT, UNKNOWN, no_probe
+
+MX_RACE_STAGGER = 0.25                     # Seconds the preferred MX gets before the next one joins
+
+def is_conclusive(probe):
+    # Accepted or permanently rejected; silence and 4xx leave the race open
+    return probe.status != UNKNOWN
+
+def race_outcome(hosts, answers):
+    # No conclusive answer: the most preferred MX that answered RCPT, else the
+    # most preferred that said anything, else the last one tried
+    #   answers: {mx: Probe}
+    for reached in (lambda probe: probe.phase == RCPT, lambda probe: probe.code is not None):
+        for mx in hosts:
+            if mx in answers and reached(answers[mx]):
+                return answers[mx]
+    return answers[hosts[-1]]
+
+class MXRacer:
+    # Happy-eyeballs failover for single-address probes: the preferred MX
+    # starts alone, the next one joins after `stagger` seconds (or at once if
+    # the first fails), and the first conclusive answer wins. It has no
+    # threads of its own: every probe is queued on the caller's MXScheduler
+    # for its own host (submit_to), so it is paced and capped like any other
+    # session, and race() returns a Future instead of waiting for one, so no
+    # worker sits idle while a dead MX times out. Probes not yet started when
+    # the race is won are dropped; a running smtplib probe can't be
+    # interrupted, so it finishes and only updates the health registry.
+    #   probe(email, mx_host) -> smtp_session.Probe
+
+    def __init__(self, probe, scheduler, stagger=MX_RACE_STAGGER, health=None):
+        self.probe = probe
+        self.scheduler = scheduler
+        self.stagger = stagger
+        self.health = health if health is not None else HealthRegistry()
+
+    def _attempt(self, email, mx_host):
+        if self.health.is_open(mx_host):
+            return no_probe(mx_host)       # Opened while this probe waited in the host's queue
+        start = time.monotonic()
+        probe = self.probe(email, mx_host)
+        self.health.record(mx_host, probe.code, time.monotonic() - start)
+        return probe
+
+    def race(self, email, mx_hosts):
+        # Future of the Probe, like the one-by-one loop's; every circuit open -> no_probe(first MX)
+        hosts = self.health.usable(mx_hosts)
+        if not hosts:
+            future = Future()
+            future.set_result(no_probe(mx_hosts[0]))
+            return future
+        return Race(self, email, hosts).future
+
+class Race:
+    # One MXRacer.race() in progress: attempt i is queued straight away for
+    # i = 0, `stagger` seconds after attempt i - 1 started otherwise (a timer
+    # job on the scheduler), or as soon as every earlier attempt came back
+    # inconclusive. Probe callbacks run on the workers that finished them.
+
+    def __init__(self, racer, email, hosts):
+        self.racer = racer
+        self.email = email
+        self.hosts = hosts
+        self.future = Future()
+        self.future.set_running_or_notify_cancel()
+        self.attempts = []                 # Futures, in host order
+        self.answers = {}
+        self.finished = 0
+        self._lock = threading.RLock()     # A cancelled attempt (scheduler closed) calls back at once
+        with self._lock:
+            self._start()
+
+    def _start(self):
+        # Queues the next attempt (lock held)
+        turn = len(self.attempts)
+        mx = self.hosts[turn]
+        self.attempts.append(self.racer.scheduler.submit_to(mx, self.racer._attempt, self.email, mx))
+        self.attempts[-1].add_done_callback(self._done)
+        if turn + 1 < len(self.hosts):
+            self.racer.scheduler.submit_to(None, self._stagger_elapsed, turn + 1, delay=self.racer.stagger)
+
+    def _stagger_elapsed(self, turn):
+        with self._lock:
+            if len(self.attempts) == turn and not self.future.done():
+                self._start()
+
+    def _done(self, attempt):
+        probe = None if attempt.cancelled() or attempt.exception() is not None else attempt.result()
+        with self._lock:
+            if self.future.done():
+                return
+            self.finished += 1
+            if probe is not None:
+                self.answers[probe.mx] = probe
+            if probe is not None and is_conclusive(probe):
+                outcome = probe
+            elif self.finished < len(self.attempts):
+                return                     # Others still running
+            elif len(self.attempts) < len(self.hosts):
+                self._start()              # Every attempt so far failed: the next one goes now
+                return
+            else:
+                tried = [mx for mx in self.hosts if mx in self.answers]
+                outcome = race_outcome(tried, self.answers) if tried else no_probe(self.hosts[0])
+            self.future.set_result(outcome)
+            for other in self.attempts:
+                other.cancel()
@@ -0,0 +1,42 @@
+# Providers that deliver several spellings of an address to one mailbox:
+# domain -> (canonical domain, dots in the local part ignored, sub-address separator)
+PROVIDER_RULES = {
+    'gmail.com': ('gmail.com', True, '+'),
+    'googlemail.com': ('gmail.com', True, '+'),
+    'outlook.com': ('outlook.com', False, '+'),
+    'hotmail.com': ('hotmail.com', False, '+'),
+    'live.com': ('live.com', False, '+'),
+    'icloud.com': ('icloud.com', False, '+'),
+    'fastmail.com': ('fastmail.com', False, '+'),
+    'protonmail.com': ('protonmail.com', False, '+'),
+    'proton.me': ('proton.me', False, '+'),
+}
+
+def idna_domain(domain):
+    # ASCII (punycode) form of an internationalized domain, so "bücher.de"
+    # passes the syntax check and resolves; left as is if it can't be encoded
+    if domain.isascii():
+        return domain
+    try:
+        return domain.encode('idna').decode('ascii')
+    except UnicodeError:
+        return domain
+
+def normalize_email(email):
+    # Trimmed, lower-cased address with an IDNA-encoded domain: the key an
+    # address is deduplicated, stored and probed under
+    email = email.strip().lower()
+    local, at, domain = email.rpartition('@')
+    return f'{local}@{idna_domain(domain)}' if at else email
+
+def canonical_email(email, rules=PROVIDER_RULES):
+    # normalize_email() plus the provider's own equivalences: j.doe+news@gmail.com -> jdoe@gmail.com
+    email = normalize_email(email)
+    local, at, domain = email.rpartition('@')
+    if not at or domain not in rules:
+        return email
+    domain, ignore_dots, separator = rules[domain]
+    mailbox = local.split(separator, 1)[0] if separator else local
+    if ignore_dots:
+        mailbox = mailbox.replace('.', '')
+    return f'{mailbox or local}@{domain}'
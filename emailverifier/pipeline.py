@@ -0,0 +1,172 @@
+from collections import deque, namedtuple
+
+from . import metrics
+from .mx_race import MX_RACE_STAGGER
+from .normalize import canonical_email, normalize_email
+from .prefilter import DISPOSABLE, FREE, ROLE, SYNTAX, prefilter
+from .retry import RETRY_DELAYS
+from .runner import iter_chunks
+from .smtp_session import INVALID, MAX_RCPT_PER_SESSION, RCPT_PER_TRANSACTION, SENDER_EMAIL
+from .typos import suggest_domain
+
+WINDOW_SIZE = 2000                         # Addresses read ahead of finished results (memory stays flat)
+DEDUP_MEMORY = 200000                      # Settled mailboxes remembered for later duplicate rows (~200 bytes each)
+
+# Every verdict, whichever stage or backend produced it; catch_all marks one
+# for a domain that accepts any address (no RCPT code of the mailbox's own)
+Result = namedtuple('Result', 'status reason suggestion mx smtp_code catch_all', defaults=(None, None, None, False))
+
+# How a run trades accuracy for speed. Frontends start from one of PROFILES
+# and _replace() whatever their own settings (sliders, config) change.
+#   timeout, dns_lifetime   SMTP and DNS timeouts in seconds (None = resolver default)
+#   max_mx                  MX hosts tried per address, in preference order
+#   mx_race, mx_stagger     race backup MX hosts (single-address mode) instead of trying them in turn
+#   mx_pause                seconds between MX hosts when trying them in turn
+#   catch_all_check         probe each domain once with a made-up address
+#   session_reuse           one SMTP session per domain instead of one per address
+#   async_engine            asyncio engine instead of the thread pool
+#   workers                 threads (thread pool) / async_concurrency: probes in flight (async engine)
+#   per_host_*              pacing per MX host (sessions/sec, burst, simultaneous connections)
+#   adaptive                learn how many sessions each MX host (and the run as a whole) takes from
+#                           latency and 4xx/timeouts; workers / async_concurrency / per_host_connections are then caps
+#   rcpt_per_transaction, max_rcpt   RCPT TO per MAIL transaction / per connection
+#   retry_delays            backoff before re-probing Unknown results (() = no retries)
+#   window                  addresses read ahead of finished results
+#   skip_free, bare_roles   free providers fail the local checks / "infosales" counts as a role address
+Profile = namedtuple('Profile', 'name timeout dns_lifetime max_mx mx_race mx_stagger mx_pause sender catch_all_check '
+                                'session_reuse async_engine workers async_concurrency per_host_rate per_host_burst '
+                                'per_host_connections adaptive rcpt_per_transaction max_rcpt retry_delays window '
+                                'skip_free bare_roles')
+
+THOROUGH = Profile(
+    name='thorough', timeout=10, dns_lifetime=None, max_mx=3, mx_race=True, mx_stagger=MX_RACE_STAGGER, mx_pause=0.2,
+    sender=SENDER_EMAIL, catch_all_check=True, session_reuse=True, async_engine=False, workers=50,
+    async_concurrency=1000, per_host_rate=2.0, per_host_burst=5, per_host_connections=5, adaptive=True,
+    rcpt_per_transaction=RCPT_PER_TRANSACTION, max_rcpt=MAX_RCPT_PER_SESSION, retry_delays=RETRY_DELAYS,
+    window=WINDOW_SIZE, skip_free=False, bare_roles=False)
+
+PROFILES = {
+    'thorough': THOROUGH,
+    # Two MX hosts, shorter timeouts, no retries, free providers skipped
+    'fast': THOROUGH._replace(name='fast', timeout=8, dns_lifetime=10, max_mx=2, mx_race=False, mx_pause=0,
+                              workers=100, per_host_rate=4.0, retry_delays=(), skip_free=True, bare_roles=True),
+    # Primary MX only, aggressive timeouts, no rate cap (connection cap only)
+    'max': THOROUGH._replace(name='max', timeout=6, dns_lifetime=8, max_mx=1, mx_race=False, mx_pause=0,
+                             sender='check@example.com', workers=200, per_host_rate=0, per_host_burst=1,
+                             per_host_connections=20, retry_delays=(), skip_free=True),
+}
+
+# Where a result came from
+LOCAL = 'local'                            # Failed a local check (no network)
+STORED = 'stored'                          # Fresh result from the result store
+PROBED = 'probed'                          # Verified by the backend just now
+DUPLICATE = 'duplicate'                    # Same mailbox as an earlier row, which got the result first
+
+LOCAL_CHECK_REASONS = {
+    SYNTAX: "Invalid syntax",
+    DISPOSABLE: "Disposable/temporary email",
+    ROLE: "Role-based email (generic/group)",
+    FREE: "Free/personal email provider",
+}
+
+def local_result(email, failed):
+    # Result for an address that failed a local check; mistyped domains get a suggestion
+    email = email.strip().lower()
+    domain = email.split('@')[-1] if '@' in email else ''
+    suggestion = suggest_domain(domain) if failed == SYNTAX and domain else None
+    return Result(INVALID, LOCAL_CHECK_REASONS[failed], suggestion)
+
+class _Rows:
+    # Fan-out bookkeeping for one run: the input rows waiting on each mailbox
+    # key, and the results of the last `memory` keys settled, so a later row
+    # of the same mailbox is answered without any lookup or probe. Every row's
+    # result is counted in the metrics by stage, status and reason.
+
+    def __init__(self, on_result, memory):
+        self._on_result = on_result
+        self.memory = memory
+        self.waiting = {}
+        self.settled = {}
+
+    def on_result(self, email, result, stage, row):
+        metrics.REGISTRY.result(result.status, result.reason, stage)
+        self._on_result(email, result, stage, row)
+
+    def claim(self, key, row, email):
+        # True if the key is new and has to be looked up / probed; otherwise
+        # the row is answered now or joins the rows waiting on the key
+        if key in self.settled:
+            self.on_result(email, self.settled[key], DUPLICATE, row)
+            return False
+        if key in self.waiting:
+            self.waiting[key].append((row, email))
+            return False
+        self.waiting[key] = [(row, email)]
+        return True
+
+    def settle(self, key, result, stage):
+        for i, (row, email) in enumerate(self.waiting.pop(key)):
+            self.on_result(email, result, DUPLICATE if i else stage, row)
+        self.settled[key] = result
+        if len(self.settled) > self.memory:
+            del self.settled[next(iter(self.settled))]  # Oldest first
+
+class Pipeline:
+    # The run every frontend shares: addresses are normalized (trimmed,
+    # lower-cased, IDNA domain; with canonicalize also provider equivalences
+    # like Gmail's dots and +tags), then the local checks, then duplicates
+    # are collapsed, then results still fresh in the store, then the backend
+    # for the rest, so each distinct mailbox is looked up and probed once.
+    # Input is streamed a window at a time.
+    # on_result(email, Result, stage, row) is called in the caller's thread
+    # once per input row, with the row's own spelling and position, as soon
+    # as its mailbox is settled; probed results are written back to the store.
+    # The local checks run in-process unless `processes` says otherwise: a
+    # GUI may run several jobs at once and mustn't fork a pool per job, so
+    # only the CLI (one run per process) asks for PREFILTER_PROCESSES.
+
+    def __init__(self, backend, checker, store=None, max_age=0, window=WINDOW_SIZE, processes=1,
+                 canonicalize=False, dedup_memory=DEDUP_MEMORY):
+        self.backend = backend
+        self.checker = checker
+        self.store = store
+        self.max_age = max_age
+        self.window = window
+        self.processes = processes
+        self.normalize = canonical_email if canonicalize else normalize_email
+        self.dedup_memory = dedup_memory
+
+    def _to_backend(self, emails, rows):
+        originals = deque()  # (row, email) of every key handed to the prefilter, which keeps input order
+
+        def keys():
+            for row, email in enumerate(emails):
+                originals.append((row, email))
+                yield self.normalize(email)
+
+        for chunk in iter_chunks(prefilter(keys(), self.checker, self.processes), self.window):
+            passed = []
+            for key, failed in chunk:
+                row, email = originals.popleft()
+                if failed:
+                    rows.on_result(email, local_result(key, failed), LOCAL, row)
+                elif rows.claim(key, row, email):
+                    passed.append(key)
+            if self.store is not None and self.max_age:
+                cached, passed = self.store.split_fresh(passed, self.max_age)
+                for key, hit in cached:
+                    rows.settle(key, Result(hit.status, hit.reason, hit.suggestion, hit.mx, hit.smtp_code, hit.catch_all),
+                                STORED)
+            yield from passed
+
+    def run(self, emails, on_result):
+        rows = _Rows(on_result, self.dedup_memory)
+        try:
+            for key, result in self.backend.verify(self._to_backend(emails, rows)):
+                if self.store is not None:
+                    self.store.add(key, result.status, result.reason, result.mx, result.smtp_code, result.suggestion,
+                                   result.catch_all)
+                rows.settle(key, result, PROBED)
+        finally:
+            if self.store is not None:
+                self.store.flush()
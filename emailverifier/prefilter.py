@@ -0,0 +1,87 @@
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+from . import metrics
+from .domain_index import as_domain_index
+from .roles import ROLE_SEPARATORS, RoleMatcher
+from .runner import iter_chunks
+
+SYNTAX_REGEX = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+PREFILTER_PROCESSES = os.cpu_count() or 1  # Worker processes for the local checks (1 = in-process)
+PREFILTER_CHUNK = 1000                     # Addresses per task handed to a worker
+
+# Names of the checks an address can fail, in the order they are tried
+SYNTAX = 'syntax'
+DISPOSABLE = 'disposable'
+ROLE = 'role'
+FREE = 'free'
+
+class ListChecker:
+    # The pure-CPU checks (syntax, disposable, role, free provider) as one
+    # picklable object, so worker processes get their own copy of the lists
+    # once instead of sharing the GIL with the network threads. The domain
+    # lists are DomainIndex objects: subdomains of a listed domain match too,
+    # and snapshot-backed ones reach the workers as a path to map, not a copy.
+    # checker(email) -> name of the first failed check, or None.
+
+    def __init__(self, disposable=(), role_prefixes=(), free=(), role_separators=ROLE_SEPARATORS):
+        self.disposable = as_domain_index(disposable)
+        self.free = as_domain_index(free)
+        self.is_role_based = RoleMatcher(role_prefixes, role_separators)
+        self.syntax = re.compile(SYNTAX_REGEX)
+
+    def __call__(self, email):
+        email = email.strip().lower()
+        if not email or not self.syntax.match(email):
+            return SYNTAX
+        local, domain = email.split('@')
+        if domain in self.disposable:
+            return DISPOSABLE
+        if self.is_role_based(local):
+            return ROLE
+        if domain in self.free:
+            return FREE
+        return None
+
+_checker = None
+
+def _init_worker(checker):
+    global _checker
+    _checker = checker
+
+def _check_chunk(emails, checker=None):
+    # (failed check or None per address, seconds the checks took)
+    checker = checker or _checker
+    start = time.monotonic()
+    return [checker(email) for email in emails], time.monotonic() - start
+
+def prefilter(emails, checker, processes=PREFILTER_PROCESSES, chunk_size=PREFILTER_CHUNK):
+    # Yields (email, failed check or None) in input order. Chunks are checked
+    # across a process pool with at most two per worker queued, so input is
+    # still streamed. Inputs that fit in one chunk are checked in-process:
+    # starting the pool would cost more than the checks. The checks' own time
+    # is recorded per chunk as the "local" stage.
+    chunks = iter_chunks(emails, chunk_size)
+    first = list(islice(chunks, 2))
+    if processes <= 1 or len(first) < 2:
+        for chunk in chain(first, chunks):
+            failed, seconds = _check_chunk(chunk, checker)
+            metrics.observe(metrics.LOCAL, seconds, count=len(chunk))
+            yield from zip(chunk, failed)
+        return
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(checker,)) as pool:
+        pending = deque((chunk, pool.submit(_check_chunk, chunk)) for chunk in first)
+        for chunk in islice(chunks, 2 * processes - len(first)):
+            pending.append((chunk, pool.submit(_check_chunk, chunk)))
+        while pending:
+            chunk, future = pending.popleft()
+            failed, seconds = future.result()
+            metrics.observe(metrics.LOCAL, seconds, count=len(chunk))
+            refill = next(chunks, None)
+            if refill:
+                pending.append((refill, pool.submit(_check_chunk, refill)))
+            yield from zip(chunk, failed)
@@ -0,0 +1,70 @@
+import time
+from collections import namedtuple
+
+from .db import LocalConnection
+from .normalize import normalize_email
+from .smtp_session import UNKNOWN
+
+RESULTS_DB_FILE = 'verification_results.sqlite3'
+FRESHNESS_DAYS = 30                        # Re-probe addresses whose result is older than this
+FLUSH_EVERY = 500                          # Buffered writes per commit
+
+StoredResult = namedtuple('StoredResult', 'status reason mx smtp_code suggestion checked_at catch_all')
+
+class ResultStore:
+    # Durable per-address results so recurring lists only probe new or stale addresses
+
+    def __init__(self, path=RESULTS_DB_FILE):
+        self._conn = LocalConnection(path)
+        self._pending = []
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS results (email TEXT PRIMARY KEY, status TEXT NOT NULL, reason TEXT, "
+                     "mx TEXT, smtp_code INTEGER, suggestion TEXT, checked_at REAL NOT NULL, "
+                     "catch_all INTEGER NOT NULL DEFAULT 0)")
+        if 'catch_all' not in {column[1] for column in conn.execute("PRAGMA table_info(results)")}:
+            conn.execute("ALTER TABLE results ADD COLUMN catch_all INTEGER NOT NULL DEFAULT 0")  # Older databases
+        conn.commit()
+
+    def lookup(self, emails, max_age):
+        # {normalized email: StoredResult} for results newer than max_age seconds
+        cutoff = time.time() - max_age
+        keys = list({normalize_email(email) for email in emails})
+        found = {}
+        conn = self._conn()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = conn.execute("SELECT email, status, reason, mx, smtp_code, suggestion, checked_at, catch_all "
+                                f"FROM results WHERE checked_at >= ? AND email IN ({','.join('?' * len(chunk))})",
+                                (cutoff, *chunk))
+            for row in rows:
+                found[row[0]] = StoredResult(*row[1:7], bool(row[7]))
+        return found
+
+    def split_fresh(self, emails, max_age):
+        # Returns ([(email, StoredResult), ...], [emails still to probe]) in input order
+        fresh = self.lookup(emails, max_age)
+        cached, to_probe = [], []
+        for email in emails:
+            hit = fresh.get(normalize_email(email))
+            if hit:
+                cached.append((email, hit))
+            else:
+                to_probe.append(email)
+        return cached, to_probe
+
+    def add(self, email, status, reason, mx=None, smtp_code=None, suggestion=None, catch_all=False):
+        # catch_all: the domain accepts any address, a verdict without an RCPT code of its own
+        if status == UNKNOWN or (mx is not None and smtp_code is None and not catch_all):
+            return  # Temporary failure or no MX answered: probe again next run
+        self._pending.append((normalize_email(email), status, reason, mx, smtp_code, suggestion or None, time.time(),
+                              int(catch_all)))
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            conn = self._conn()
+            conn.executemany("INSERT OR REPLACE INTO results (email, status, reason, mx, smtp_code, suggestion, "
+                             "checked_at, catch_all) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._pending)
+            conn.commit()
+            self._pending = []
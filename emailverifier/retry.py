@@ -0,0 +1,44 @@
+import heapq
+import itertools
+import time
+
+RETRY_DELAYS = (60, 300, 900)              # Seconds before the 1st, 2nd, 3rd retry of a temporary failure
+
+class RetryQueue:
+    # Delayed re-attempts for temporary failures (greylisting, other 4xx,
+    # timeouts). The runners park a result the queue wants() here instead of
+    # reporting it, and submit the item again once its backoff has passed,
+    # while the rest of the list keeps running.
+    #   should_retry(result) -> True if the result is worth another attempt
+
+    def __init__(self, should_retry, delays=RETRY_DELAYS):
+        self.should_retry = should_retry
+        self.delays = tuple(delays)
+        self._heap = []
+        self._order = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def wants(self, result, attempt):
+        #   attempt: retries already made for this item (0 on the first pass)
+        return attempt < len(self.delays) and self.should_retry(result)
+
+    def schedule(self, item, attempt):
+        due = time.monotonic() + self.delays[attempt]
+        heapq.heappush(self._heap, (due, next(self._order), item, attempt + 1))
+
+    def due(self):
+        # [(item, attempt)] whose backoff has passed
+        now = time.monotonic()
+        ready = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, item, attempt = heapq.heappop(self._heap)
+            ready.append((item, attempt))
+        return ready
+
+    def wait_time(self):
+        # Seconds until the next item is due, or None if nothing is waiting
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
@@ -0,0 +1,37 @@
+import re
+
+ROLE_SEPARATORS = ('.', '-', '_')          # What may follow a role prefix: info.sales, info-us, info_eu
+
+_END = ''                                  # Trie key marking "a prefix ends here" (never a real character)
+
+def _trie_pattern(node):
+    # Nested alternation mirroring the trie: siblings never share a first
+    # character, so the regex engine only ever follows one branch
+    branches = [re.escape(ch) + _trie_pattern(node[ch]) for ch in sorted(node) if ch != _END]
+    if not branches:
+        return ''
+    pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    return f'(?:{pattern})?' if _END in node else pattern
+
+class RoleMatcher:
+    # Callable replacement for
+    #   any(local == p or local.startswith(p + sep) for p in prefixes for sep in separators)
+    # built once when the lists load. The prefixes become a trie compiled into
+    # one anchored regex, so a lookup costs about len(local) steps instead of
+    # len(prefixes) * len(separators) string comparisons. An empty separator
+    # means a bare prefix is enough (the old `sep in [..., '']` form).
+
+    def __init__(self, prefixes, separators=ROLE_SEPARATORS):
+        trie = {}
+        for prefix in prefixes:
+            node = trie
+            for ch in prefix:
+                node = node.setdefault(ch, {})
+            node[_END] = {}
+        self._match = None
+        if trie:
+            tail = '' if '' in separators else '(?:\\Z|[' + ''.join(re.escape(sep) for sep in separators) + '])'
+            self._match = re.compile(_trie_pattern(trie) + tail).match
+
+    def __call__(self, local):
+        return self._match is not None and self._match(local) is not None
@@ -0,0 +1,109 @@
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, wait
+from itertools import islice
+
+def iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def wait_for_retries(retry):
+    # Nothing in flight: sleep until the next retry is due. False if none are waiting.
+    if retry is None or not len(retry):
+        return False
+    time.sleep(retry.wait_time())
+    return True
+
+def verify_each(executor, emails, verify_fn, window=None, retry=None):
+    # Classic mode: one task (and one SMTP session) per address.
+    # Yields (email, result) as results complete. With a window, at most that
+    # many addresses are read ahead of the results, so any iterable can stream.
+    # With a retry.RetryQueue, results it wants retried are held back and the
+    # address is submitted again once its backoff has passed; addresses
+    # waiting for that count against the window too.
+    emails = iter(emails)
+    pending = {}
+    while True:
+        if retry is not None:
+            for email, attempt in retry.due():
+                pending[executor.submit(verify_fn, email)] = (email, attempt)
+        in_flight = len(pending) + (len(retry) if retry is not None else 0)
+        for email in islice(emails, max(0, window - in_flight) if window else None):
+            pending[executor.submit(verify_fn, email)] = (email, 0)
+        if not pending:
+            if wait_for_retries(retry):
+                continue
+            return
+        done, _ = wait(pending, timeout=retry.wait_time() if retry is not None else None,
+                       return_when=FIRST_COMPLETED)
+        for future in done:
+            email, attempt = pending.pop(future)
+            result = future.result()
+            if retry is not None and retry.wants(result, attempt):
+                retry.schedule(email, attempt)
+            else:
+                yield email, result
+
+def verify_grouped(executor, emails, local_check, verify_domain, window=None, retry=None):
+    # Session-reuse mode: local checks run inline, then one task per domain so
+    # all of a domain's recipients share one SMTP session.
+    #   local_check(normalized) -> result, or None to go on to SMTP
+    #     (None instead of a function when a prefilter stage already ran them)
+    #   verify_domain(domain, [normalized, ...]) -> {normalized: result}
+    # With a window, input is grouped a window at a time and refilled once half
+    # of the in-flight addresses have completed. Retried addresses of a domain
+    # are regrouped and go out together once their backoff has passed; until
+    # then they still count as in flight.
+    emails = iter(emails)
+    pending = {}
+    in_flight = 0
+    exhausted = False
+
+    def submit(domain, pairs, attempt):
+        nonlocal in_flight
+        pending[executor.submit(verify_domain, domain, sorted({n for _, n in pairs}))] = (domain, pairs, attempt)
+        in_flight += len(pairs)
+
+    while True:
+        if retry is not None:
+            for (domain, pairs), attempt in retry.due():
+                in_flight -= len(pairs)  # Counted while they waited
+                submit(domain, pairs, attempt)
+        if not exhausted and (not window or in_flight <= window // 2):
+            chunk = list(islice(emails, max(0, window - in_flight) if window else None))
+            exhausted = not chunk or not window
+            by_domain = defaultdict(list)
+            for email in chunk:
+                normalized = email.strip().lower()
+                result = local_check(normalized) if local_check else None
+                if result is not None:
+                    yield email, result
+                else:
+                    by_domain[normalized.split('@')[1]].append((email, normalized))
+            for domain, pairs in by_domain.items():
+                submit(domain, pairs, 0)
+            if chunk and not pending:
+                continue  # Whole chunk settled by local checks; read on
+        if not pending:
+            if wait_for_retries(retry):
+                continue
+            return
+        done, _ = wait(pending, timeout=retry.wait_time() if retry is not None else None,
+                       return_when=FIRST_COMPLETED)
+        for future in done:
+            domain, pairs, attempt = pending.pop(future)
+            in_flight -= len(pairs)
+            results = future.result()
+            again = []
+            for email, normalized in pairs:
+                if retry is not None and retry.wants(results[normalized], attempt):
+                    again.append((email, normalized))
+                else:
+                    yield email, results[normalized]
+            if again:
+                retry.schedule((domain, again), attempt)
+                in_flight += len(again)
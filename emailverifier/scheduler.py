@@ -0,0 +1,238 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import CancelledError, Future
+
+from .adaptive import ADAPTIVE_POLL
+
+PER_HOST_RATE = 2.0                        # New SMTP sessions per second to one MX host (0 = unlimited)
+PER_HOST_BURST = 5                         # Sessions a quiet host may get back to back
+PER_HOST_MAX_CONNECTIONS = 5               # Simultaneous sessions to one MX host (the cap, with adaptive limits)
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        # Takes a token and returns 0, or returns the seconds until one is due
+        if not self.rate:
+            return 0
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+def then(future, fn):
+    # Future of fn(future's result), once future has one (errors and
+    # cancellation carry over); if fn returns a Future, of that one's result
+    chained = Future()
+
+    def done(source):
+        if source.cancelled():
+            chained.cancel()
+        elif source.exception() is not None:
+            chained.set_exception(source.exception())
+        else:
+            try:
+                result = fn(source.result())
+            except BaseException as e:
+                chained.set_exception(e)
+                return
+            if isinstance(result, Future):
+                _follow(result, chained)
+            else:
+                chained.set_result(result)
+
+    future.add_done_callback(done)
+    return chained
+
+def _follow(source, target):
+    # Settles target the way source settled (a cancelled source fails it: target may be running already)
+    def done(source):
+        if source.cancelled():
+            target.set_exception(CancelledError())
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+
+    source.add_done_callback(done)
+
+def primary_mx_of(get_mx_record):
+    # Scheduling key for an address or a domain: its first MX host
+    def host_of(item):
+        mx_hosts = get_mx_record(item.rsplit('@', 1)[-1].strip().lower())
+        return mx_hosts[0] if mx_hosts else None
+    return host_of
+
+class MXScheduler:
+    # Executor-like front for a ThreadPoolExecutor: submit(fn, item, ...) first
+    # resolves item's MX host (host_of), then queues the call per host and only
+    # hands it to a worker once that host has a free connection slot and a rate
+    # token. Throttled hosts wait in their queue instead of holding threads, so
+    # every other host keeps going at full speed. Items without an MX (host
+    # None) are never throttled. submit_to() queues a call for a host the
+    # caller already knows (an MX race's probes) under the same caps, after
+    # `delay` seconds if given. A call may return a Future (a continuation,
+    # e.g. a race): its own future then follows that one, and the worker and
+    # the host's slot are free in the meantime.
+    # With `limits` (an adaptive.AdaptiveConcurrency) a host's sessions are
+    # admitted by limits.try_acquire(), which counts every scheduler sharing
+    # it (GUI jobs), so max_connections caps them all together; this run's
+    # sessions are also capped by max_running (its share of the pool).
+
+    def __init__(self, executor, host_of, rate=PER_HOST_RATE, burst=PER_HOST_BURST,
+                 max_connections=PER_HOST_MAX_CONNECTIONS, limits=None, max_running=None):
+        self.executor = executor
+        self.host_of = host_of
+        self.rate = rate
+        self.burst = burst
+        self.max_connections = max_connections
+        self.limits = limits
+        self.max_running = max_running
+        self._queues = {}
+        self._active = defaultdict(int)
+        self._running = 0
+        self._buckets = {}
+        self._later = []                   # Heap of (due, seq, host, job) for delayed submit_to()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._dispatch, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # Calls still waiting for their host are dropped (their futures
+        # cancelled): after a normal run the queues are empty anyway, and an
+        # abandoned run (error, cancelled job) shouldn't wait out a throttled host
+        with self._cond:
+            self._closed = True
+            dropped = [job[0] for queue in self._queues.values() for job in queue]
+            dropped += [job[0] for *_, job in self._later]
+            self._queues.clear()
+            self._later.clear()
+            self._cond.notify()
+        for future in dropped:
+            future.cancel()                # Outside the lock: callbacks (MX races) may queue more, which is refused
+        self._thread.join()
+
+    def submit(self, fn, item, *args):
+        future = Future()
+        self.executor.submit(self._route, future, fn, item, args)
+        return future
+
+    def submit_to(self, host, fn, item, *args, delay=0):
+        future = Future()
+        if not delay:
+            self._enqueue(host, (future, fn, item, args))
+            return future
+        with self._cond:
+            if self._closed:
+                future.cancel()
+                return future
+            heapq.heappush(self._later, (time.monotonic() + delay, next(self._seq), host, (future, fn, item, args)))
+            self._cond.notify()
+        return future
+
+    def _route(self, future, fn, item, args):
+        try:
+            host = self.host_of(item)
+        except Exception:
+            host = None
+        self._enqueue(host, (future, fn, item, args))
+
+    def _enqueue(self, host, job):
+        with self._cond:
+            if self._closed:
+                job[0].cancel()
+                return
+            self._queues.setdefault(host, deque()).append(job)
+            self._cond.notify()
+
+    def _bucket(self, host):
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return self._buckets[host]
+
+    def _has_room(self, host):
+        # Room as far as this scheduler can tell; limits.try_acquire() has the last word
+        if host is None:
+            return True
+        if self.limits is None:
+            return self._active[host] < self.max_connections
+        return self.max_running is None or self._running < self.max_running
+
+    def _claim(self, host):
+        if host is not None:
+            self._running += 1
+        self._active[host] += 1
+
+    def _dispatch(self):
+        with self._cond:
+            while True:
+                next_due = None
+                now = time.monotonic()
+                while self._later and self._later[0][0] <= now:
+                    _, _, host, job = heapq.heappop(self._later)
+                    self._queues.setdefault(host, deque()).append(job)
+                if self._later:
+                    next_due = self._later[0][0] - now
+                for host in list(self._queues):
+                    queue = self._queues[host]
+                    while queue and (queue[0][0].cancelled() or self._has_room(host)):
+                        if queue[0][0].cancelled():
+                            queue.popleft()  # E.g. a race's probe, not needed after all
+                            continue
+                        shared = host is not None and self.limits is not None
+                        if shared and not self.limits.try_acquire(host, self.max_connections):
+                            # Other runs' sessions may be what's in the way, and their end doesn't notify us
+                            next_due = ADAPTIVE_POLL if next_due is None else min(next_due, ADAPTIVE_POLL)
+                            break
+                        delay = self._bucket(host).take() if host is not None else 0
+                        if delay:
+                            if shared:
+                                self.limits.release(host)
+                            next_due = delay if next_due is None else min(next_due, delay)
+                            break
+                        self._claim(host)
+                        self.executor.submit(self._run, host, queue.popleft())
+                    if not queue:
+                        del self._queues[host]
+                if self._closed and not self._queues:
+                    return
+                self._cond.wait(next_due)
+
+    def _run(self, host, job):
+        future, fn, item, args = job
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(item, *args)
+                    if isinstance(result, Future):
+                        _follow(result, future)
+                    else:
+                        future.set_result(result)
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            with self._cond:
+                self._active[host] -= 1
+                if host is not None:
+                    self._running -= 1
+                    if self.limits is not None:
+                        self.limits.release(host)
+                self._cond.notify()
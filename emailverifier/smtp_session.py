@@ -0,0 +1,212 @@
+import re
+import smtplib
+import time
+from collections import deque, namedtuple
+
+from .metrics import BANNER, Stopwatch
+
+SENDER_EMAIL = 'verifier@example.com'
+RCPT_PER_TRANSACTION = 20                  # RCPT TO commands per MAIL transaction (RSET between)
+MAX_RCPT_PER_SESSION = 100                 # Per-MX recipient cap before reconnecting
+ACCEPT_CODES = (250, 251)
+TOO_MANY_RECIPIENTS = 452
+
+# Three-way verdict of a probe. Unknown covers greylisting, other 4xx
+# replies and servers that never answered: worth retrying later.
+VALID = 'Valid'
+INVALID = 'Invalid'
+UNKNOWN = 'Unknown'
+
+# How far an SMTP dialogue got
+CONNECT = 'connect'
+HELO = 'helo'
+MAIL = 'mail'
+RCPT = 'rcpt'
+
+ENHANCED_STATUS = re.compile(rb'^\s*([245]\.\d{1,3}\.\d{1,3})\b')
+
+def enhanced_status(message):
+    # RFC 3463 code at the start of a reply text (b'5.1.1 User unknown'), or None
+    match = ENHANCED_STATUS.match(message or b'')
+    return match.group(1).decode('ascii') if match else None
+
+class Probe(namedtuple('Probe', 'mx code enhanced phase')):
+    # One address's SMTP outcome: the MX asked, the last reply code (None if
+    # it never answered), that reply's enhanced status code, and the phase the
+    # dialogue stopped in. Only an answer to RCPT says anything about the mailbox.
+    __slots__ = ()
+
+    @property
+    def status(self):
+        if self.phase != RCPT or self.code is None:
+            return UNKNOWN
+        if self.code in ACCEPT_CODES:
+            return VALID
+        if 500 <= self.code <= 599:
+            return INVALID
+        return UNKNOWN
+
+    @property
+    def rcpt_code(self):
+        # The RCPT reply, or None if the dialogue never got that far
+        return self.code if self.phase == RCPT else None
+
+    def describe(self):
+        # "451 4.7.1 at rcpt", "no reply at connect"
+        if self.code is None:
+            return f"no reply at {self.phase}"
+        return ' '.join(str(part) for part in (self.code, self.enhanced) if part) + f" at {self.phase}"
+
+def no_probe(mx_host=None):
+    # Placeholder for an MX that was never contacted (circuit open, not tried yet)
+    return Probe(mx_host, None, None, CONNECT)
+
+class _TimedSMTP(smtplib.SMTP):
+    # Laps its Stopwatch as soon as the TCP connection is up, so the wait for
+    # the banner is timed apart from the connect
+
+    def __init__(self, watch, timeout):
+        self.watch = watch
+        super().__init__(timeout=timeout)
+
+    def _get_socket(self, host, port, timeout):
+        sock = super()._get_socket(host, port, timeout)
+        self.watch.lap(BANNER)
+        return sock
+
+def open_smtp(mx_host, timeout, watch):
+    # smtplib.SMTP connected to mx_host and past its 220 banner (SMTPConnectError otherwise)
+    server = _TimedSMTP(watch, timeout)
+    try:
+        code, message = server.connect(mx_host)
+        if code != 220:
+            raise smtplib.SMTPConnectError(code, message)
+    except Exception:
+        server.close()
+        raise
+    watch.lap(HELO)
+    return server
+
+def smtp_rcpt_many(emails, mx_host, sender=SENDER_EMAIL, timeout=10,
+                   rcpt_per_transaction=RCPT_PER_TRANSACTION, max_rcpt=MAX_RCPT_PER_SESSION, health=None):
+    # One connection per max_rcpt recipients; returns {email: Probe}.
+    # Addresses the MX never answered get the phase the session died in.
+    # With a health registry, each connection's first RCPT reply (or the lack
+    # of one) is recorded against the MX. Every stage is timed (metrics).
+    probes = {}
+    pending = deque(emails)
+    failed = no_probe(mx_host)
+    while pending:
+        if health is not None and health.is_open(mx_host):
+            break  # Circuit opened while we were queued or mid-list
+        start = time.monotonic()
+        watch = Stopwatch(CONNECT, mx_host)
+        answered = len(probes)
+        phase, server = CONNECT, None
+        try:
+            server = open_smtp(mx_host, timeout, watch)
+            phase = HELO
+            server.ehlo_or_helo_if_needed()
+            watch.lap(None)
+            sent = 0
+            while pending and sent < max_rcpt:
+                phase = MAIL
+                watch.start(MAIL)
+                code, message = server.mail(sender)
+                if code != 250:
+                    raise smtplib.SMTPSenderRefused(code, message, sender)
+                phase = RCPT
+                watch.lap(RCPT)
+                in_transaction = 0
+                while pending and in_transaction < rcpt_per_transaction and sent < max_rcpt:
+                    code, message = server.rcpt(pending[0])
+                    watch.lap(RCPT)
+                    if code == TOO_MANY_RECIPIENTS and in_transaction:
+                        break  # Server cap reached: retry the rest in a fresh transaction
+                    if health is not None and not sent:
+                        health.record(mx_host, code, time.monotonic() - start)
+                    probes[pending.popleft()] = Probe(mx_host, code, enhanced_status(message), RCPT)
+                    in_transaction += 1
+                    sent += 1
+                watch.start(None)
+                server.rset()
+            server.quit()
+        except smtplib.SMTPResponseException as e:
+            failed = Probe(mx_host, e.smtp_code, enhanced_status(e.smtp_error), phase)
+        except Exception:
+            failed = Probe(mx_host, None, None, phase)
+        else:
+            continue
+        watch.stop()  # The stage the session died in
+        if server is not None:
+            server.close()
+        if health is not None and len(probes) == answered:
+            health.record(mx_host, failed.code)
+        break
+    for email in pending:
+        probes[email] = failed
+    return probes
+
+def smtp_check(email, mx_host, sender=SENDER_EMAIL, timeout=10, health=None):
+    # Single-address probe -> Probe. An MX whose circuit is open isn't contacted.
+    if health is not None and health.is_open(mx_host):
+        return no_probe(mx_host)
+    start = time.monotonic()
+    watch = Stopwatch(CONNECT, mx_host)
+    phase, server, code, message = CONNECT, None, None, None
+    try:
+        server = open_smtp(mx_host, timeout, watch)
+        phase = HELO
+        server.ehlo_or_helo_if_needed()
+        watch.lap(MAIL)
+        phase = MAIL
+        code, message = server.mail(sender)
+        watch.lap(None)
+        if code == 250:
+            phase, code, message = RCPT, None, None
+            watch.start(RCPT)
+            code, message = server.rcpt(email)
+            watch.lap(None)
+        server.quit()
+    except smtplib.SMTPResponseException as e:
+        if code is None:
+            code, message = e.smtp_code, e.smtp_error
+    except Exception:
+        pass
+    finally:
+        if server is not None:
+            server.close()  # A no-op after quit(); a rejected HELO or failed QUIT still holds the socket
+    watch.stop()  # The stage it failed in, if any
+    if health is not None:
+        health.record(mx_host, code, time.monotonic() - start)
+    return Probe(mx_host, code, enhanced_status(message), phase)
+
+def smtp_probe(email, mx_host, sender=SENDER_EMAIL, timeout=10, health=None):
+    # Just the RCPT reply code, or None if the dialogue never got that far
+    return smtp_check(email, mx_host, sender, timeout, health).rcpt_code
+
+def merge_probes(probes, answers, remaining):
+    # Record one MX's answers; an MX that never reached RCPT doesn't erase an
+    # earlier RCPT reply. Returns the addresses still not accepted.
+    for email in remaining:
+        answer = answers.get(email)
+        if answer is not None and (answer.phase == RCPT or probes[email].phase != RCPT):
+            probes[email] = answer
+    return [email for email in remaining if probes[email].status != VALID]
+
+def smtp_probe_many(emails, mx_hosts, sender=SENDER_EMAIL, timeout=10,
+                    rcpt_per_transaction=RCPT_PER_TRANSACTION, max_rcpt=MAX_RCPT_PER_SESSION, health=None, mx_pause=0):
+    # Same semantics as trying each MX in turn per address: anything not
+    # accepted by one MX is retried on the next, after mx_pause seconds.
+    # Returns {email: Probe} with the MX that accepted, else the last RCPT
+    # answer (or failure) seen.
+    probes = {email: no_probe() for email in emails}
+    remaining = list(emails)
+    for i, mx in enumerate(mx_hosts):
+        if i and mx_pause:
+            time.sleep(mx_pause)
+        answers = smtp_rcpt_many(remaining, mx, sender, timeout, rcpt_per_transaction, max_rcpt, health)
+        remaining = merge_probes(probes, answers, remaining)
+        if not remaining:
+            break
+    return probes
@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+
+from .lists import LISTS_DIR, current_version, read_index
+
+TYPO_CORRECTIONS = {
+    'gamil.com': 'gmail.com', 'gmial.com': 'gmail.com', 'gmai.com': 'gmail.com',
+    'hotmial.com': 'hotmail.com', 'hotmai.com': 'hotmail.com',
+    'yaho.com': 'yahoo.com', 'yahhoo.com': 'yahoo.com',
+    'outllok.com': 'outlook.com', 'outlok.com': 'outlook.com',
+    'protontmail.com': 'protonmail.com', 'protomail.com': 'protonmail.com',
+}
+POPULAR_DOMAINS = ['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'aol.com', 'icloud.com', 'protonmail.com']
+TOP_DOMAINS_FILE = 'top_domains.txt'       # Optional: your own domains (e.g. top customers), one per line
+TYPO_MAX_DISTANCE = 1                      # Edits (insert, delete, replace, swap two neighbours) a typo may be from its domain
+MEMO_SIZE = 100000                         # Domains whose suggestion is remembered
+RELOAD_CHECK = 60                          # Seconds between checks for a new list snapshot
+
+def deletes(word, depth):
+    # word and every string made by removing up to depth of its characters
+    found = frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found = found | frontier
+    return found
+
+def edit_distance(s1, s2, limit):
+    # Optimal string alignment distance (Levenshtein plus swapped neighbours,
+    # so "gmial" is one edit from "gmail"), or limit + 1 as soon as it is
+    # certain to be more than limit
+    if abs(len(s1) - len(s2)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1, 1):
+        current = [i] + [0] * len(s2)
+        for j, c2 in enumerate(s2, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (c1 != c2))
+            if i > 1 and j > 1 and c1 != c2 and c1 == s2[j - 2] and s1[i - 2] == c2:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+class TypoSuggester:
+    # Closest reference domain to a mistyped one, SymSpell style: every
+    # reference domain is indexed under the strings left after deleting up to
+    # max_distance of its characters, so a lookup generates the deletes of the
+    # typo and only edit-checks the few domains sharing one, instead of
+    # comparing it with the whole list. Earlier reference domains win ties.
+    # Answers are memoized per domain (a list repeats its typos).
+
+    def __init__(self, domains, max_distance=TYPO_MAX_DISTANCE, corrections=TYPO_CORRECTIONS):
+        self.domains = list(dict.fromkeys(domain.strip().lower() for domain in domains if domain.strip()))
+        self.max_distance = max_distance
+        self.corrections = corrections
+        self._known = set(self.domains)
+        self._index = {}
+        for rank, domain in enumerate(self.domains):
+            for key in deletes(domain, max_distance):
+                self._index.setdefault(key, []).append(rank)
+        self._memo = {}
+
+    def _closest(self, domain):
+        if domain in self._known:
+            return None  # A real domain, not a typo
+        ranks = {rank for key in deletes(domain, self.max_distance) for rank in self._index.get(key, ())}
+        best, best_distance = None, self.max_distance + 1
+        for rank in sorted(ranks):
+            distance = edit_distance(domain, self.domains[rank], best_distance - 1)
+            if distance < best_distance:
+                best, best_distance = self.domains[rank], distance
+        return best
+
+    def suggest(self, domain):
+        # The domain a mistyped one was probably meant to be, or None
+        domain = domain.lower()
+        if domain not in self._memo:
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            self._memo[domain] = self.corrections.get(domain) or self._closest(domain)
+        return self._memo[domain]
+
+def reference_domains(path=LISTS_DIR, version=None, top_file=TOP_DOMAINS_FILE):
+    # Popular providers first, then TOP_DOMAINS_FILE, then the free-provider
+    # list of the current snapshot (when there is one)
+    domains = list(POPULAR_DOMAINS)
+    if os.path.exists(top_file):
+        with open(top_file, 'r', encoding='utf-8') as f:
+            domains.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    if version:
+        try:
+            domains.extend(read_index(path, version, 'free'))
+        except (OSError, EOFError, ValueError):
+            pass  # Damaged snapshot: load_lists() already refuses it; suggest from the rest
+    return domains
+
+_suggester = None
+_suggester_version = None
+_checked = 0
+_lock = threading.Lock()
+
+def default_suggester():
+    # Process-wide TypoSuggester over reference_domains(), rebuilt when
+    # tools/refresh_lists.py swaps in a new snapshot
+    global _suggester, _suggester_version, _checked
+    with _lock:
+        if _suggester is None or time.monotonic() - _checked >= RELOAD_CHECK:
+            _checked = time.monotonic()
+            version = current_version()
+            if _suggester is None or version != _suggester_version:
+                _suggester, _suggester_version = TypoSuggester(reference_domains(version=version)), version
+        return _suggester
+
+def suggest_domain(domain):
+    # The popular domain a mistyped one was probably meant to be, or None
+    return default_suggester().suggest(domain)
@@ -0,0 +1,164 @@
+import time
+from io import StringIO
+
+import pandas as pd
+import streamlit as st
+
+from .backends import SMTPBackend
+from .catch_all import CatchAllCache
+from .dns_cache import DNSCache
+from .export import csv_gz, parquet, to_frame
+from .jobs import CANCELLED, DONE, FINISHED, JOB_TTL, QUEUED, JobManager
+from .lists import ListsError, current_version, load_lists, make_checker
+from .metrics import METRICS_PORT, REGISTRY, start_metrics_server
+from .mx_health import HealthRegistry
+from .normalize import normalize_email
+from .smtp_session import INVALID, UNKNOWN, VALID
+
+# Streamlit pieces the GUIs share. Only the GUIs import this module, so the
+# CLI never needs streamlit installed.
+
+POLL_INTERVAL = 1.0                        # Seconds between refreshes of a running job
+PAGE_SIZE = 1000                           # Rows per page of the results table
+
+@st.cache_resource
+def get_dns_cache():
+    return DNSCache()  # Persistent, shared with other verifier processes
+
+@st.cache_resource
+def get_catch_all_cache():
+    return CatchAllCache()  # Per-domain catch-all verdicts, shared with the other verifiers
+
+@st.cache_resource
+def get_mx_health():
+    return HealthRegistry()  # Per-MX latency/failure counters and circuit breakers, shared by every run
+
+@st.cache_resource
+def get_metrics_server():
+    # Prometheus /metrics for every job of this app process; None if METRICS_PORT is taken (another GUI)
+    return start_metrics_server(METRICS_PORT, health=get_mx_health())
+
+@st.cache_resource
+def get_job_manager(app):
+    return JobManager(app)  # Background jobs and the probe threads they share, one set per app process
+
+@st.cache_resource
+def get_lists(version):
+    # Read from the local snapshot once per version (tools/refresh_lists.py swaps in new ones)
+    try:
+        return load_lists(version=version)
+    except ListsError as e:
+        st.error(str(e))
+        st.stop()
+
+@st.cache_resource
+def _list_checker(version, skip_free, bare_roles):
+    return make_checker(get_lists(version), skip_free, bare_roles)
+
+def get_list_checker(skip_free=False, bare_roles=False):
+    # Built once per list snapshot and shared by every job (checked in-process, see Pipeline)
+    return _list_checker(current_version(), skip_free, bare_roles)
+
+def smtp_backend(profile, executor=None):
+    return SMTPBackend(profile, get_dns_cache(), get_catch_all_cache(), get_mx_health(), executor)
+
+def read_upload(uploaded_file):
+    # Addresses from an uploaded .txt (one per line) or .csv (first column),
+    # duplicates kept: the pipeline verifies each mailbox once and answers every row
+    if uploaded_file.name.endswith('.csv'):
+        emails = pd.read_csv(uploaded_file).iloc[:, 0].dropna().astype(str).str.strip().tolist()
+    else:
+        emails = [line.strip() for line in StringIO(uploaded_file.getvalue().decode('utf-8'))]
+    return [email for email in emails if email]
+
+def show_loaded(emails):
+    distinct = len({normalize_email(email) for email in emails})
+    st.write(f"Loaded {len(emails):,} emails ({distinct:,} distinct — each is verified once, duplicates share its result)")
+
+def canonicalize_checkbox():
+    return st.checkbox("Treat provider aliases as one mailbox (Gmail dots, +tags at Gmail/Outlook/iCloud/...)", value=False)
+
+def current_job():
+    return st.query_params.get('job')
+
+def follow_job(job_id):
+    # The job ID goes in the URL, so a refresh (or the link, from another browser) comes back to it
+    st.query_params['job'] = job_id
+
+def show_job(manager, job_id, suffix, success, health=None, describe=None):
+    # Live view of a background job: progress and the latest results while it
+    # runs (refreshed every POLL_INTERVAL), then the paged results and downloads.
+    # Rows are read from the job store a page at a time, never kept in the session.
+    #   describe(processed, total, elapsed) -> status line (default "Processed x/y")
+    get_metrics_server()
+    info = manager.store.info(job_id)
+    if info is None:
+        st.warning(f"Job {job_id} not found (jobs are kept for {JOB_TTL // 86400} days).")
+        return
+
+    @st.fragment(run_every=None if info.status in FINISHED else POLL_INTERVAL)
+    def live():
+        job = manager.store.info(job_id)
+        if job.status in FINISHED:
+            if info.status not in FINISHED:
+                st.rerun()  # Whole page once, to stop polling and show the final results
+            return
+        st.caption(f"Job {job_id} — you can leave this page, verification keeps running")
+        if job.status == QUEUED:
+            st.info(f"Queued behind {manager.queue_position(job_id) or 0} other job(s)...")
+        else:
+            st.progress(job.done / job.total if job.total else 1.0)
+            elapsed = time.time() - job.started
+            st.text(describe(job.done, job.total, elapsed) if describe else f"Processed {job.done:,}/{job.total:,}")
+        if job.message:
+            st.text(job.message)
+        if st.button("Cancel job"):
+            manager.cancel(job_id)
+        st.dataframe(to_frame(manager.store.results(job_id, max(0, job.done - PAGE_SIZE))))  # The latest page
+
+    live()
+    if info.status in FINISHED:
+        if info.message:
+            st.text(info.message)
+        if info.status == DONE:
+            st.success(success)
+        elif info.status == CANCELLED:
+            st.warning("Job cancelled — results up to that point below.")
+        else:
+            st.error(f"Job failed: {info.error}")
+        show_results(manager.store, job_id, suffix, health)
+
+def show_results(store, job_id, suffix, health=None):
+    # Paged results table, downloads built only when clicked (valid_<suffix>.csv.gz
+    # per status and one Parquet file of everything), and the mail server health table
+    counts = store.counts(job_id)
+    st.text("   ".join(f"{status}: {count:,}" for status, count in sorted(counts.items())))
+    col1, col2 = st.columns(2)
+    shown = col1.selectbox("Show", ('All',) + tuple(sorted(counts)), key=f'show_{job_id}')
+    total = sum(counts.values()) if shown == 'All' else counts.get(shown, 0)
+    pages = max(1, -(-total // PAGE_SIZE))
+    page = col2.number_input(f"Page (of {pages:,}, {PAGE_SIZE:,} rows each)", 1, pages, 1, key=f'page_{job_id}_{shown}')
+    st.dataframe(to_frame(store.results(job_id, (page - 1) * PAGE_SIZE, PAGE_SIZE, None if shown == 'All' else shown,
+                                        input_order=True)))
+    for status in (VALID, INVALID, UNKNOWN):  # Unknown: no verdict (greylisted, timed out, MX unreachable)
+        st.download_button(f"Download {status} Emails", lambda status=status: csv_gz(store.iter_results(job_id, status)),
+                           f"{status.lower()}_{suffix}.csv.gz", mime='application/gzip')
+    st.download_button("Download all results (Parquet)", lambda: parquet(store.iter_results(job_id)),
+                       f"results_{suffix}.parquet", mime='application/vnd.apache.parquet')
+    if health is not None:
+        with st.expander("Mail server health"):
+            st.dataframe(pd.DataFrame.from_dict(health.snapshot(), orient='index'))
+    show_timing()
+
+def show_timing():
+    # Where verification time went (every job of this app process since it
+    # started) per stage, in milliseconds, and where to scrape it live
+    server = get_metrics_server()
+    with st.expander("Time by stage"):
+        st.caption(f"Live metrics: {server.url}" if server else f"Port {METRICS_PORT} is in use, no metrics endpoint")
+        stages = REGISTRY.stage_summary()
+        if stages:
+            frame = pd.DataFrame(stages).set_index('stage')
+            frame[['mean', 'p50', 'p95', 'p99']] *= 1000
+            st.dataframe(frame.rename(columns={'seconds': 'total s', 'mean': 'mean ms', 'p50': 'p50 ms',
+                                               'p95': 'p95 ms', 'p99': 'p99 ms'}))
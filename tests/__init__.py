@@ -0,0 +1 @@
+# Tests for the emailverifier package and its tools: python -m pytest
@@ -0,0 +1,60 @@
+import os
+import socket
+import sys
+
+import pytest
+
+# The tools (mock servers) aren't a package; import them the way the benchmarks do
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+
+from fake_smtp_farm import PROFILES, Farm
+
+FARM_PORT = 26600                          # One fake mail server per farm profile from here; not the benchmark's ports
+FARM_DNS_PORT = 26599
+
+@pytest.fixture(scope='session')
+def farm():
+    with Farm(list(PROFILES), FARM_PORT, FARM_DNS_PORT) as farm:
+        yield farm
+
+@pytest.fixture
+def mx(farm):
+    # {profile: "host:port"} of the farm's servers, counters and greylisting reset
+    farm.reset()
+    return {name: f'127.0.0.1:{server.port}' for name, server in zip(farm.profiles, farm.servers)}
+
+@pytest.fixture
+def servers(farm, mx):
+    # {profile: MailServer}, to read its stats or change its behaviour for one test
+    servers = dict(zip(farm.profiles, farm.servers))
+    yield servers
+    for name, server in servers.items():
+        vars(server).update({'latency': 0.0, 'banner_delay': 0.0, 'greylist': 0.0, 'catch_all': False, 'max_rcpt': 0,
+                             'max_connections': 0}, **PROFILES[name])
+
+@pytest.fixture
+def dead_mx():
+    # "host:port" that accepts TCP connections but never says a word
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(100)
+    yield '127.0.0.1:%d' % sock.getsockname()[1]
+    sock.close()
+
+@pytest.fixture
+def farm_dns(farm, monkeypatch):
+    # Every dnspython lookup goes to the farm's stub DNS server; returns
+    # domain_on(profile, n=0): the n-th domain served by that profile's server
+    import dns.asyncresolver
+    import dns.resolver
+    for module in (dns.resolver, dns.asyncresolver):
+        resolver = module.Resolver(configure=False)
+        resolver.nameservers = ['127.0.0.1']
+        resolver.port = FARM_DNS_PORT
+        monkeypatch.setattr(module, 'default_resolver', resolver)
+
+    def domain_on(profile, n=0):
+        return f'd{farm.profiles.index(profile) + n * len(farm.profiles)}.bench.test'
+    return domain_on
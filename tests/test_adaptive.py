@@ -0,0 +1,72 @@
+import pytest
+
+from emailverifier.adaptive import FAILURE_BACKOFF, AdaptiveConcurrency, AIMDLimit
+
+# The AIMD limits the adaptive schedulers run on
+
+def test_slow_start_adds_one_per_sample():
+    limit = AIMDLimit(2)
+    for _ in range(3):
+        limit.good()
+    assert limit.value == 5
+
+def test_congestion_backs_off_once_per_window():
+    limit = AIMDLimit(8)
+    limit.congested(0.5)
+    assert limit.value == 4 and not limit.slow_start
+    for _ in range(3):
+        limit.congested(0.5)  # The rest of the burst the first signal answered
+    assert limit.value == 4
+    limit.congested(0.5)
+    assert limit.value == 2
+
+def test_grows_by_one_per_window_after_slow_start():
+    limit = AIMDLimit(8)
+    limit.congested(0.5)
+    for _ in range(4):
+        limit.good()
+    assert limit.value == 4  # 4 + 1/4 + 1/4.25 + ... falls just short of 5
+    limit.good()
+    assert limit.value == 5
+
+def test_bounds():
+    limit = AIMDLimit(1)
+    limit.congested(0.1)
+    assert limit.value == 1
+    limit = AIMDLimit(5, maximum=6)
+    for _ in range(10):
+        limit.good()
+    assert limit.value == 6
+    assert AIMDLimit(50, maximum=10).value == 10
+
+def test_unused_limits_do_not_grow():
+    limit = AIMDLimit(3)
+    for _ in range(10):
+        limit.good(used=False)
+    assert limit.value == 3
+
+@pytest.fixture
+def limits():
+    return AdaptiveConcurrency(host_start=2, global_start=3)
+
+def test_try_acquire_respects_host_and_global_limits(limits):
+    assert limits.try_acquire('mx1') and limits.try_acquire('mx1')
+    assert not limits.try_acquire('mx1')
+    assert limits.try_acquire('mx2')
+    assert not limits.try_acquire('mx3')  # Global limit of 3 reached
+    limits.release('mx1')
+    assert limits.try_acquire('mx3')
+    assert limits.snapshot() == {'mx1': (2, 1), 'mx2': (2, 1), 'mx3': (2, 1), None: (3, 3)}
+
+def test_try_acquire_cap(limits):
+    assert limits.try_acquire('mx1', cap=1)
+    assert not limits.try_acquire('mx1', cap=1)
+    assert limits.try_acquire('mx1', cap=5)
+    assert not limits.try_acquire('mx1', cap=5)  # The learnt limit (2) still applies
+
+def test_failures_lower_the_host_limit(limits):
+    limits.sample('mx1', 450)
+    assert limits.host_limit('mx1') == int(2 * FAILURE_BACKOFF)
+    limits.sample('mx2', None)
+    assert limits.host_limit('mx2') == 1
+    assert limits.host_limit('mx3') == 2
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from emailverifier.aio import AsyncEngine
+from emailverifier.dns_cache import DNSCache
+from emailverifier.smtp_session import INVALID, VALID
+
+# The asyncio engine's SMTP sessions against the fake farm
+
+def addresses(n):
+    # Alternating existing (ok*) and unknown (no*) mailboxes
+    return [f"{'ok' if i % 2 else 'no'}{i}@example.com" for i in range(n)]
+
+def expected(email):
+    return VALID if email.startswith('ok') else INVALID
+
+@pytest.fixture
+def engine():
+    # run(coroutine function, *args) -> its result, on a started engine
+    engine = AsyncEngine(per_host_limit=3, per_host_rate=0)
+    engine._start()
+    engine.run = lambda coro_fn, *args, **kwargs: engine.submit(lambda: coro_fn(*args, **kwargs)).result()
+    yield engine
+    engine._stop()
+
+def test_recipients_share_one_session(engine, mx, servers):
+    emails = addresses(30)
+    probes = engine.run(engine.smtp_rcpt_many, emails, mx['fast'], rcpt_per_transaction=7)
+    assert {email: probe.status for email, probe in probes.items()} == {email: expected(email) for email in emails}
+    assert servers['fast'].stats['connections'] == 1
+    assert servers['fast'].stats['rcpt'] == 30
+
+def test_max_rcpt_starts_a_new_session(engine, mx, servers):
+    engine.run(engine.smtp_rcpt_many, addresses(25), mx['fast'], max_rcpt=10)
+    assert servers['fast'].stats['connections'] == 3
+
+def test_server_recipient_cap_starts_a_new_transaction(engine, mx, servers):
+    probes = engine.run(engine.smtp_rcpt_many, addresses(25), mx['strict'], rcpt_per_transaction=20)
+    assert {probe.code for probe in probes.values()} == {250, 550}
+    assert servers['strict'].stats['connections'] == 1
+
+def test_probe_many_tries_the_next_mx(engine, mx):
+    emails = addresses(6)
+    probes = engine.run(engine.smtp_probe_many, emails, [mx['fast'], mx['catchall']])
+    assert {email: (probes[email].mx, probes[email].status) for email in emails} == \
+        {email: (mx['fast'] if email.startswith('ok') else mx['catchall'], VALID) for email in emails}
+
+@pytest.mark.parametrize('mx_pause', [0, 0.3])
+def test_mx_pause(engine, mx, mx_pause):
+    start = time.monotonic()
+    engine.run(engine.smtp_probe_many, ['no1@example.com'], [mx['fast']] * 3, mx_pause=mx_pause)
+    elapsed = time.monotonic() - start
+    assert elapsed >= 2 * mx_pause and elapsed < 2 * mx_pause + 0.2
+
+def test_sessions_per_host_are_capped(engine, mx, servers):
+    # The busy server refuses a 4th simultaneous session; the engine never opens one
+    servers['busy'].latency = 0.05
+    futures = [engine.submit(engine.smtp_check, email, mx['busy']) for email in addresses(12)]
+    assert [future.result().status for future in futures] == [expected(email) for email in addresses(12)]
+    assert servers['busy'].stats['refused'] == 0
+
+def test_concurrent_lookups_share_one_query(engine, farm, farm_dns):
+    queries = farm.dns.queries
+    domain = farm_dns('fast')
+    futures = [engine.submit(engine.get_mx_record, domain) for _ in range(10)]
+    assert {tuple(future.result()) for future in futures} == {(f'127.0.0.1:{farm.servers[0].port}',)}
+    assert farm.dns.queries == queries + 1
+    assert engine._mx_lookups == {}
+
+def test_settled_lookups_come_from_the_cache(tmp_path, farm, farm_dns):
+    engine = AsyncEngine(dns_cache=DNSCache(str(tmp_path / 'cache.sqlite3')))
+    engine._start()
+    try:
+        queries = farm.dns.queries
+        domain = farm_dns('fast')
+        for _ in range(3):
+            assert engine.submit(engine.get_mx_record, domain).result() == [f'127.0.0.1:{farm.servers[0].port}']
+        assert farm.dns.queries == queries + 1
+        assert engine._mx_lookups == {}
+    finally:
+        engine._stop()
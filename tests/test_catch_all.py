@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from emailverifier import catch_all
+from emailverifier.aio import AsyncEngine
+from emailverifier.backends import SMTPBackend
+from emailverifier.catch_all import CatchAllCache, verdict_from_code
+from emailverifier.dns_cache import DNSCache
+from emailverifier.pipeline import THOROUGH
+from emailverifier.smtp_session import smtp_probe
+
+# Catch-all detection: the shared per-domain verdict, and the backends
+# skipping the mailbox probes of a domain that accepts anything
+
+@pytest.fixture
+def cache(tmp_path):
+    return CatchAllCache(str(tmp_path / 'cache.sqlite3'))
+
+def backend(tmp_path, **profile):
+    path = str(tmp_path / 'cache.sqlite3')
+    profile = THOROUGH._replace(per_host_rate=0, retry_delays=(), adaptive=False, **profile)
+    return SMTPBackend(profile, DNSCache(path), CatchAllCache(path))
+
+@pytest.mark.parametrize('code, verdict', [(250, True), (251, True), (550, False), (553, False), (450, None),
+                                           (None, None)])
+def test_verdict_from_code(code, verdict):
+    assert verdict_from_code(code) is verdict
+
+def test_concurrent_checks_share_one_probe(cache):
+    probes = []
+
+    def probe(address):
+        probes.append(address)
+        time.sleep(0.1)
+        return 250
+
+    verdicts = []
+    threads = [threading.Thread(target=lambda: verdicts.append(cache.check('a.test', probe))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert verdicts == [True] * 20
+    assert len(probes) == 1 and probes[0].startswith('nx-') and probes[0].endswith('@a.test')
+    assert cache._locks == {}
+
+def test_inconclusive_verdicts_are_not_kept(cache):
+    assert cache.check('a.test', lambda address: 451) is None
+    assert cache.get('a.test') == (False, None)
+    assert cache.check('a.test', lambda address: 550) is False
+    assert cache.check('a.test', lambda address: 250) is False
+
+def test_verdicts_are_shared_through_sqlite_and_expire(tmp_path, cache):
+    cache.put('a.test', True)
+    assert CatchAllCache(str(tmp_path / 'cache.sqlite3')).get('a.test') == (True, True)
+    short = CatchAllCache(str(tmp_path / 'cache.sqlite3'), ttl=0.05)
+    short.put('b.test', False)
+    time.sleep(0.1)
+    assert short.get('b.test') == (False, None)
+
+def test_memory_is_bounded(cache, monkeypatch):
+    monkeypatch.setattr(catch_all, 'MEMORY_SIZE', 3)
+    for n in range(10):
+        cache.put(f'd{n}.test', True)
+    assert len(cache._memory) <= 3
+    assert cache.get('d0.test') == (True, True)
+
+def test_canary_against_the_farm(cache, mx):
+    assert cache.check('a.test', lambda address: smtp_probe(address, mx['catchall'], THOROUGH.sender, 5)) is True
+    assert cache.check('b.test', lambda address: smtp_probe(address, mx['fast'], THOROUGH.sender, 5)) is False
+
+@pytest.mark.parametrize('profile', [dict(session_reuse=True), dict(session_reuse=False, mx_race=False),
+                                     dict(session_reuse=False, mx_race=True),
+                                     dict(session_reuse=True, async_engine=True),
+                                     dict(session_reuse=False, async_engine=True)],
+                         ids=['grouped', 'each', 'racing', 'async-grouped', 'async-each'])
+def test_catch_all_domains_skip_the_mailbox_probes(tmp_path, farm_dns, servers, profile):
+    catchall, fast = farm_dns('catchall'), farm_dns('fast')
+    emails = [f'ok{n}@{catchall}' for n in range(10)] + [f'no{n}@{fast}' for n in range(10)]
+    verifier = backend(tmp_path, **profile)
+    results = dict(verifier.verify(emails))
+    assert all(results[f'ok{n}@{catchall}'].catch_all for n in range(10))
+    assert not any(results[f'no{n}@{fast}'].catch_all for n in range(10))
+    assert servers['catchall'].stats['rcpt'] == 1
+    assert servers['fast'].stats['rcpt'] == 11
+    assert verifier.catch_all_cache.get(catchall) == (True, True)
+    assert verifier._catch_all_checks == {} and verifier.catch_all_cache._locks == {}
+
+def test_async_checks_leave_the_engine_once_settled(tmp_path, farm_dns, mx):
+    engine = AsyncEngine(catch_all_cache=CatchAllCache(str(tmp_path / 'cache.sqlite3')))
+    engine._start()
+    try:
+        checks = [engine.submit(engine.is_catch_all, 'x.test', mx['catchall']) for _ in range(5)]
+        assert [check.result() for check in checks] == [True] * 5
+        assert engine._catch_all_checks == {}
+    finally:
+        engine._stop()
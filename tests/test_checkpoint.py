@@ -0,0 +1,112 @@
+import csv
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from emailverifier.checkpoint import Checkpoint
+from emailverifier.lists import activate, write_snapshot
+
+# Checkpoints, and the CLI resuming from one after being killed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUTS = ['valid_emails.csv', 'invalid_emails.csv', 'unknown_emails.csv']
+
+# `python email_verifier_ultimate.py [--resume]` in the current directory,
+# with its Config block overridden and DNS pointed at the fake farm
+#   argv: DNS port, lists directory, {constant: value}, CLI arguments...
+RUN_CLI = '''
+import ast, functools, sys
+import dns.resolver
+import email_verifier_ultimate as cli
+from emailverifier.lists import load_lists
+
+resolver = dns.resolver.Resolver(configure=False)
+resolver.nameservers, resolver.port = ['127.0.0.1'], int(sys.argv[1])
+dns.resolver.default_resolver = resolver
+cli.load_lists = functools.partial(load_lists, path=sys.argv[2])
+for name, value in ast.literal_eval(sys.argv[3]).items():
+    setattr(cli, name, value)
+sys.argv[1:] = sys.argv[4:]
+cli.main()
+'''
+CONFIG = {'PER_HOST_RATE': 0, 'RETRY_DELAYS': (), 'METRICS_PORT': None, 'PREFILTER_PROCESSES': 1,
+          'CONSOLE_LEVEL': 'WARNING', 'CHECKPOINT_INTERVAL': 0.05, 'RESULTS_DB_FILE': None}
+
+@pytest.fixture
+def lists_dir(tmp_path):
+    path = str(tmp_path / 'lists')
+    os.makedirs(path)
+    activate(path, write_snapshot(path, {'disposable': set(), 'roles': {'info'}, 'free': set()}))
+    return path
+
+def start_cli(tmp_path, farm, lists_dir, *args):
+    return subprocess.Popen([sys.executable, '-c', RUN_CLI, str(farm.dns_port), lists_dir, repr(CONFIG), *args],
+                            cwd=tmp_path, env={**os.environ, 'PYTHONPATH': ROOT},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+def output_rows(tmp_path):
+    rows = []
+    for name in OUTPUTS:
+        if (tmp_path / name).exists():
+            with open(tmp_path / name, newline='', encoding='utf-8') as f:
+                rows.extend(csv.reader(f))
+    return rows
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGKILL'), reason='needs SIGKILL')
+def test_cli_resumes_after_sigkill(tmp_path, farm, servers, farm_dns, lists_dir):
+    servers['slow'].latency = 0.03
+    emails = [f"{'ok' if i % 2 else 'no'}{i}@{farm_dns('slow', i % 40)}" for i in range(400)]
+    (tmp_path / 'emails.csv').write_text(''.join(email + '\n' for email in emails))
+
+    cli = start_cli(tmp_path, farm, lists_dir)
+    deadline = time.monotonic() + 60
+    while len(output_rows(tmp_path)) < len(emails) // 3:
+        assert cli.poll() is None, 'the CLI finished before it could be killed: ' + cli.stderr.read()
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    cli.send_signal(signal.SIGKILL)
+    cli.wait()
+    cli.stderr.close()
+    assert (tmp_path / 'verification_checkpoint.json').exists()
+
+    farm.reset()
+    cli = start_cli(tmp_path, farm, lists_dir, '--resume')
+    assert cli.communicate(timeout=60)[1] == '' and cli.returncode == 0
+    assert servers['slow'].stats['rcpt'] < len(emails)  # Picked up where the checkpoint left off
+    rows = output_rows(tmp_path)
+    assert rows.count(['Email', 'Status', 'Reason', 'MX', 'SMTP Code']) == len(OUTPUTS)
+    assert sorted(row[0] for row in rows if row[0] != 'Email') == sorted(emails)
+    assert not (tmp_path / 'verification_checkpoint.json').exists()
+
+def test_changed_input_is_not_resumed(tmp_path):
+    (tmp_path / 'in.txt').write_text('someone@example.com\n')
+    state = str(tmp_path / 'state.json')
+    with open(tmp_path / 'out.txt', 'w') as out:
+        checkpoint = Checkpoint(state, str(tmp_path / 'in.txt'), [str(tmp_path / 'out.txt')], interval=0)
+        checkpoint.started(0, 'someone@example.com')
+        checkpoint.save([out], {}, force=True)
+    assert Checkpoint(state, str(tmp_path / 'in.txt'), [str(tmp_path / 'out.txt')]).load()
+    (tmp_path / 'in.txt').write_text('someone.else@example.com\n')
+    assert not Checkpoint(state, str(tmp_path / 'in.txt'), [str(tmp_path / 'out.txt')]).load()
+
+def test_pending_rows_are_redone_and_later_output_dropped(tmp_path):
+    emails = [f'user{i}@example.com' for i in range(5)]
+    (tmp_path / 'in.txt').write_text(''.join(email + '\n' for email in emails))
+    state = str(tmp_path / 'state.json')
+    with open(tmp_path / 'out.txt', 'w') as out:
+        checkpoint = Checkpoint(state, str(tmp_path / 'in.txt'), [str(tmp_path / 'out.txt')], interval=0)
+        for i, email in enumerate(emails):
+            checkpoint.started(i, email)
+        for i in (0, 2, 4):
+            out.write(emails[i] + '\n')
+            checkpoint.finished(emails[i])
+        checkpoint.save([out], {}, force=True)
+        out.write('written after the checkpoint\n')
+    checkpoint = Checkpoint(state, str(tmp_path / 'in.txt'), [str(tmp_path / 'out.txt')])
+    assert checkpoint.load()
+    assert [i for i in range(8) if checkpoint.should_process(i)] == [1, 3, 5, 6, 7]
+    assert (tmp_path / 'out.txt').read_text().splitlines() == [emails[0], emails[2], emails[4]]
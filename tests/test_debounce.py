@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+import mock_debounce
+from emailverifier import debounce
+from emailverifier.backends import DeBounceBackend
+from emailverifier.debounce import BulkError, DeBounceClient, ListHost, result_from_code
+
+# The DeBounce client and backend against tools/mock_debounce.py
+
+@pytest.fixture(scope='module')
+def lists_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp('lists'))
+
+@pytest.fixture(scope='module')
+def server(lists_dir):
+    server = mock_debounce.start(port=0, lists_dir=lists_dir)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def base_url(server):
+    return f'http://127.0.0.1:{server.server_address[1]}'
+
+@pytest.fixture
+def client(base_url, lists_dir):
+    return DeBounceClient('key', api_url=f'{base_url}/v1/', bulk_url=f'{base_url}/bulk/v1/',
+                          list_host=ListHost(lists_dir, f'{base_url}/lists/'))
+
+@pytest.mark.parametrize('email, expected', [
+    ('someone@example.com', ('Valid', 'Deliverable', '')),
+    ('bad.one@example.com', ('Invalid', 'Undeliverable', '')),
+    ('disp@example.com', ('Invalid', 'Disposable', '')),
+    ('catchme@example.com', ('Invalid', 'Catch-all', '')),
+    ('unk@example.com', ('Unknown', 'Unknown', '')),
+])
+def test_single(client, email, expected):
+    assert client.verify(email) == expected
+
+def test_single_without_key_is_unknown(client):
+    client.api_key = ''
+    assert client.verify('someone@example.com')[0] == 'Unknown'
+
+def test_single_calls_share_a_connection(client):
+    before = mock_debounce.stats['connections']
+    for i in range(5):
+        client.verify(f'user{i}@example.com')
+    assert mock_debounce.stats['connections'] - before == 1
+
+def test_bulk(client, lists_dir):
+    emails = [f'{prefix}{i}@example.com' for i in range(10) for prefix in ('ok', 'bad', 'disp', 'catch', 'unk')]
+    progress = []
+    results = client.verify_bulk(emails, progress.append, poll_interval=0)
+    assert progress[-1] == 100
+    assert results == {email: result_from_code(*mock_debounce.answer(email)) for email in emails}
+    assert os.listdir(lists_dir) == []  # The published list is removed once its results are in
+
+def test_bulk_lists_are_fetched_from_a_url(client, base_url):
+    # The bulk API takes a link to the list, never the list itself
+    assert client.session.post(f'{base_url}/bulk/v1/upload/', params={'api': 'key'},
+                               data=b'email\nsomeone@example.com\n').status_code == 405
+    for link in ('', 'file:///etc/hosts', f'{base_url}/lists/missing.csv'):
+        with pytest.raises(BulkError):
+            client.upload(link)
+
+def test_no_bulk_without_a_list_host(client, monkeypatch):
+    monkeypatch.setattr(debounce, 'DEBOUNCE_LIST_DIR', None)
+    client = DeBounceClient('key', api_url=client.api_url, bulk_url=client.bulk_url)
+    assert not client.can_bulk
+    with pytest.raises(BulkError):
+        client.verify_bulk(['someone@example.com'])
+    errors = []
+    uploads = mock_debounce.stats['upload']
+    results = dict(DeBounceBackend(client, bulk_min=1, on_bulk_error=errors.append).verify(['someone@example.com']))
+    assert results['someone@example.com'].status == 'Valid'
+    assert errors == [] and mock_debounce.stats['upload'] == uploads
+
+def test_backend_bulk_and_single_agree(client, monkeypatch):
+    monkeypatch.setattr(mock_debounce, 'POLLS_UNTIL_DONE', 1)
+    emails = [f'{prefix}{i}@example.com' for i in range(5) for prefix in ('ok', 'bad', 'unk')]
+    single = dict(DeBounceBackend(client, bulk_min=0).verify(emails))
+    uploads = mock_debounce.stats['upload']
+    bulk = dict(DeBounceBackend(client, bulk_min=len(emails)).verify(emails))
+    assert mock_debounce.stats['upload'] == uploads + 1
+    assert set(single) == set(emails)
+    assert single == bulk
+    assert [single[email].status for email in emails[:3]] == ['Valid', 'Invalid', 'Unknown']
+
+def test_backend_falls_back_to_single_calls(client):
+    errors = []
+    client.bulk_url = client.bulk_url.replace('/bulk/', '/nothing/')
+    results = dict(DeBounceBackend(client, bulk_min=2, on_bulk_error=errors.append).verify(['a@x.com', 'bad@x.com']))
+    assert len(errors) == 1
+    assert results['a@x.com'].status == 'Valid' and results['bad@x.com'].status == 'Invalid'
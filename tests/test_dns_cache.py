@@ -0,0 +1,35 @@
+import pytest
+
+from emailverifier import dns_cache
+from emailverifier.dns_cache import DNSCache
+
+# The shared MX cache, resolving through the fake farm's stub DNS server
+
+@pytest.fixture
+def cache(tmp_path):
+    return DNSCache(str(tmp_path / 'cache.sqlite3'))
+
+def test_answers_are_cached(cache, farm, mx, farm_dns):
+    domain = farm_dns('fast')
+    assert cache.get_mx_record(domain) == [mx['fast']]
+    assert cache.get_mx_record(domain) == [mx['fast']]
+    assert farm.dns.queries == 1
+
+def test_negative_answers_are_cached(cache, farm, mx, farm_dns):
+    assert cache.get_mx_record('nowhere.test') is None
+    assert cache.get('nowhere.test') == (True, None)
+    assert cache.get_mx_record('nowhere.test') is None
+    assert farm.dns.queries == 1
+
+def test_answers_are_shared_through_sqlite(tmp_path, cache, farm, mx, farm_dns):
+    domain = farm_dns('slow')
+    cache.get_mx_record(domain)
+    assert DNSCache(str(tmp_path / 'cache.sqlite3')).get_mx_record(domain) == [mx['slow']]
+    assert farm.dns.queries == 1
+
+def test_memory_is_bounded(cache, monkeypatch):
+    monkeypatch.setattr(dns_cache, 'MEMORY_SIZE', 3)
+    for n in range(10):
+        cache.put(f'd{n}.test', [f'mx{n}.test'], 300)
+    assert len(cache._memory) <= 3
+    assert cache.get('d0.test') == (True, ['mx0.test'])
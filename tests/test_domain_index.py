@@ -0,0 +1,68 @@
+import pickle
+import random
+
+import pytest
+
+from emailverifier.domain_index import DomainIndex, as_domain_index, write_index
+
+# DomainIndex against a set of domains searched label by label
+
+LABELS = ['a', 'b', 'ab', 'mail', 'x-y', 'com']
+
+def random_domain(rng):
+    return '.'.join(rng.choice(LABELS) for _ in range(rng.randint(1, 4)))
+
+def reference_match(domains, domain):
+    # The listed domain nearest the root that `domain` is, or is under
+    labels = domain.split('.')
+    for depth in range(1, len(labels) + 1):
+        if '.'.join(labels[-depth:]) in domains:
+            return '.'.join(labels[-depth:])
+    return None
+
+@pytest.fixture(params=['memory', 'file', 'pickled'])
+def index_of(request, tmp_path):
+    def index_of(domains):
+        if request.param == 'memory':
+            return DomainIndex.from_domains(domains)
+        path = str(tmp_path / 'domains.idx')
+        write_index(path, domains)
+        index = DomainIndex(path=path)
+        return pickle.loads(pickle.dumps(index)) if request.param == 'pickled' else index
+    return index_of
+
+@pytest.mark.parametrize('seed', range(5))
+def test_match_agrees_with_reference(index_of, seed):
+    rng = random.Random(seed)
+    domains = {random_domain(rng) for _ in range(rng.randint(0, 40))}
+    index = index_of(domains)
+    for domain in [random_domain(rng) for _ in range(500)] + sorted(domains):
+        assert index.match(domain) == reference_match(domains, domain), domain
+        assert (domain in index) == (reference_match(domains, domain) is not None)
+
+def test_len_and_iteration(index_of):
+    index = index_of([' Mail.Example.com ', 'example.org', 'example.org', '', 'b.a'])
+    assert len(index) == 3
+    assert sorted(index) == ['b.a', 'example.org', 'mail.example.com']
+
+def test_subdomains_match_their_listed_parent(index_of):
+    index = index_of(['tempdomain.xyz', 'mail.tempdomain.xyz'])
+    assert index.match('a.b.tempdomain.xyz') == 'tempdomain.xyz'
+    assert index.match('xyz') is None
+    assert index.match('othertempdomain.xyz') is None
+
+def test_pickles_as_its_path(tmp_path):
+    path = str(tmp_path / 'domains.idx')
+    write_index(path, ['example.com'])
+    assert len(pickle.dumps(DomainIndex(path=path))) < 200
+
+def test_as_domain_index_passes_indexes_through():
+    index = DomainIndex.from_domains(['example.com'])
+    assert as_domain_index(index) is index
+    assert 'mail.example.com' in as_domain_index({'example.com'})
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'other.idx'
+    path.write_bytes(b'not an index at all')
+    with pytest.raises(ValueError):
+        DomainIndex(path=str(path))
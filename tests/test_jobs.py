@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from emailverifier.jobs import JobRow, JobStore
+
+# Paging through a job's results
+
+def row(i):
+    return JobRow(f'user{i}@example.com', 'Valid' if i % 3 else 'Invalid', 'reason', None, 'mx.example.com', 250)
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / 'jobs.sqlite3'))
+
+@pytest.fixture
+def job(store):
+    # 20 results finishing out of input order, added in two flushes
+    job_id = store.create('test', 20)
+    finished = list(range(20))
+    random.Random(0).shuffle(finished)
+    store.add_results(job_id, 0, [(i, row(i)) for i in finished[:12]])
+    store.add_results(job_id, 12, [(i, row(i)) for i in finished[12:]])
+    return job_id, finished
+
+def test_pages_in_finishing_order(store, job):
+    job_id, finished = job
+    assert store.info(job_id).done == 20
+    assert store.results(job_id) == [row(i) for i in finished]
+    assert store.results(job_id, offset=5, limit=10) == [row(i) for i in finished[5:15]]
+    assert store.results(job_id, offset=18, limit=10) == [row(i) for i in finished[18:]]
+    assert store.results(job_id, offset=20) == []
+
+def test_pages_in_input_order(store, job):
+    job_id, _ = job
+    assert store.results(job_id, offset=4, limit=3, input_order=True) == [row(i) for i in range(4, 7)]
+
+def test_status_filter(store, job):
+    job_id, finished = job
+    invalid = [row(i) for i in finished if i % 3 == 0]
+    assert store.results(job_id, status='Invalid') == invalid
+    assert store.results(job_id, offset=2, limit=3, status='Invalid') == invalid[2:5]
+    assert store.results(job_id, status='Invalid', input_order=True) == [row(i) for i in range(0, 20, 3)]
+
+def test_iter_results_and_counts(store, job):
+    job_id, _ = job
+    batches = list(store.iter_results(job_id, batch_size=6))
+    assert [len(batch) for batch in batches] == [6, 6, 6, 2]
+    assert [r for batch in batches for r in batch] == [row(i) for i in range(20)]
+    assert store.counts(job_id) == {'Valid': 13, 'Invalid': 7}
+
+def test_jobs_are_separate(store, job):
+    other = store.create('test', 1)
+    store.add_results(other, 0, [(0, row(99))])
+    assert store.results(other) == [row(99)]
+    assert len(store.results(job[0])) == 20
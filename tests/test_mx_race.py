@@ -0,0 +1,110 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from emailverifier.adaptive import HOST_START
+from emailverifier.aio import AsyncEngine
+from emailverifier.mx_health import CLOSED, HealthRegistry
+from emailverifier.mx_race import MXRacer
+from emailverifier.scheduler import MXScheduler
+from emailverifier.smtp_session import INVALID, VALID, smtp_check
+
+# Happy-eyeballs MX failover against the fake farm, with threads (MXRacer)
+# and asyncio (AsyncEngine.race_probe)
+
+SENDER = 'verifier@example.com'
+STAGGER = 0.25
+TIMEOUT = 1
+
+class ThreadRace:
+    def __init__(self):
+        self.health = HealthRegistry()
+        self.executor = ThreadPoolExecutor(8)
+        self.scheduler = MXScheduler(self.executor, lambda item: None, rate=0)
+        self.racer = MXRacer(lambda email, mx: smtp_check(email, mx, SENDER, TIMEOUT), self.scheduler, STAGGER,
+                             self.health)
+
+    def __call__(self, email, mx_hosts):
+        return self.racer.race(email, mx_hosts).result()
+
+    def close(self):
+        self.scheduler.close()
+        self.executor.shutdown()
+
+class AsyncRace:
+    def __init__(self, per_host_limit=5):
+        self.health = HealthRegistry()
+        self.engine = AsyncEngine(per_host_limit=per_host_limit, per_host_rate=0, health=self.health)
+        self.engine._start()
+
+    def __call__(self, email, mx_hosts):
+        return self.engine.submit(self.engine.race_probe, email, mx_hosts, SENDER, TIMEOUT, STAGGER).result()
+
+    def close(self):
+        self.engine._stop()
+
+@pytest.fixture(params=[ThreadRace, AsyncRace])
+def race(request):
+    race = request.param()
+    yield race
+    race.close()
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.02)
+
+def test_preferred_mx_alone_when_it_answers(race, mx, servers):
+    probe = race('ok1@example.com', [mx['fast'], mx['slow']])
+    assert (probe.mx, probe.status) == (mx['fast'], VALID)
+    time.sleep(STAGGER + 0.1)
+    assert servers['slow'].stats['connections'] == 0
+
+def test_backup_joins_after_the_stagger(race, mx, dead_mx):
+    start = time.monotonic()
+    probe = race('nobody@example.com', [dead_mx, mx['fast']])
+    assert (probe.mx, probe.status) == (mx['fast'], INVALID)
+    assert STAGGER <= time.monotonic() - start < TIMEOUT
+    # The dead host's probe runs on until its own timeout, and only then counts as unanswered
+    wait_for(lambda: race.health.snapshot().get(dead_mx, {}).get('timeouts') == 1)
+
+def test_outrun_hosts_are_not_blamed(race, mx, servers):
+    # A slowish primary losing every race still gets its real replies recorded
+    servers['slow'].latency = 0.1
+    for i in range(4):
+        probe = race(f'ok{i}@example.com', [mx['slow'], mx['fast']])
+        assert (probe.mx, probe.status) == (mx['fast'], VALID)
+    wait_for(lambda: race.health.snapshot().get(mx['slow'], {}).get('probes') == 4)
+    health = race.health.snapshot()[mx['slow']]
+    assert (health['state'], health['timeouts'], health['accepted']) == (CLOSED, 0, 4)
+    assert race.health.concurrency.host_limit(mx['slow']) >= HOST_START
+
+def test_inconclusive_answers_fall_back_to_the_preferred_reply(race, mx, servers, dead_mx):
+    servers['greylist'].greylist = 1.0
+    probe = race('ok1@example.com', [mx['greylist'], dead_mx])
+    assert (probe.mx, probe.code) == (mx['greylist'], 451)
+
+def test_open_circuits_are_skipped(race, mx, servers):
+    for _ in range(race.health.failures):
+        race.health.record(mx['slow'], None)
+    probe = race('ok1@example.com', [mx['slow'], mx['fast']])
+    assert probe.mx == mx['fast']
+    assert servers['slow'].stats['connections'] == 0
+
+def test_probes_still_waiting_for_a_slot_are_dropped(mx, servers):
+    servers['slow'].latency = 0.2
+    race = AsyncRace(per_host_limit=1)
+    try:
+        engine = race.engine
+        busy = engine.submit(engine.smtp_check, 'ok0@example.com', mx['slow'], SENDER, TIMEOUT + 1)
+        wait_for(lambda: servers['slow'].stats['connections'] == 1)
+        probe = race('ok1@example.com', [mx['slow'], mx['fast']])
+        assert probe.mx == mx['fast']
+        assert busy.result().status == VALID
+        time.sleep(0.3)
+        assert race.health.snapshot()[mx['slow']]['probes'] == 1  # Only the probe that held the slot
+        assert servers['slow'].stats['connections'] == 1
+    finally:
+        race.close()
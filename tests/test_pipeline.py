@@ -0,0 +1,81 @@
+import pytest
+
+from emailverifier.backends import SMTPBackend
+from emailverifier.catch_all import CatchAllCache
+from emailverifier.dns_cache import DNSCache
+from emailverifier.normalize import canonical_email, normalize_email
+from emailverifier.pipeline import DUPLICATE, LOCAL, PROBED, STORED, THOROUGH, Pipeline, Result
+from emailverifier.prefilter import ListChecker
+from emailverifier.result_store import ResultStore
+from emailverifier.smtp_session import INVALID, VALID
+
+# The shared pipeline: normalization, deduplication and fanning each
+# mailbox's result back out to every input row that spells it
+
+class Recorder:
+    # A backend that answers Valid for ok* mailboxes and remembers what it was asked
+    def __init__(self):
+        self.probed = []
+
+    def verify(self, emails):
+        for email in emails:
+            self.probed.append(email)
+            yield email, Result(VALID if email.startswith('ok') else INVALID, 'recorded', None, 'mx.test', 250)
+
+def run(pipeline, emails):
+    # [(row, email, status, stage)] in the order on_result was called
+    calls = []
+    pipeline.run(emails, lambda email, result, stage, row: calls.append((row, email, result.status, stage)))
+    return calls
+
+@pytest.mark.parametrize('email, normalized, canonical', [
+    ('  J.Doe+News@Gmail.com ', 'j.doe+news@gmail.com', 'jdoe@gmail.com'),
+    ('j.doe@googlemail.com', 'j.doe@googlemail.com', 'jdoe@gmail.com'),
+    ('J.Doe+x@Outlook.com', 'j.doe+x@outlook.com', 'j.doe@outlook.com'),
+    ('j.doe+x@example.com', 'j.doe+x@example.com', 'j.doe+x@example.com'),
+    ('+tag@gmail.com', '+tag@gmail.com', '+tag@gmail.com'),
+    ('info@Bücher.de', 'info@xn--bcher-kva.de', 'info@xn--bcher-kva.de'),
+    ('no-at-sign', 'no-at-sign', 'no-at-sign'),
+])
+def test_normalize_and_canonical_email(email, normalized, canonical):
+    assert normalize_email(email) == normalized
+    assert canonical_email(email) == canonical
+
+def test_each_mailbox_is_probed_once_and_every_row_answered(tmp_path, farm_dns, servers):
+    path = str(tmp_path / 'cache.sqlite3')
+    domain = farm_dns('fast')
+    profile = THOROUGH._replace(per_host_rate=0, retry_delays=(), adaptive=False)
+    pipeline = Pipeline(SMTPBackend(profile, DNSCache(path), CatchAllCache(path)), ListChecker(), window=2)
+    emails = [f'ok1@{domain}', f' OK1@{domain.upper()}', 'not an address', f'no2@{domain}', f'ok1@{domain}',
+              f'no2@{domain}']
+    calls = sorted(run(pipeline, emails))
+    assert calls == [(0, emails[0], VALID, PROBED), (1, emails[1], VALID, DUPLICATE),
+                     (2, emails[2], INVALID, LOCAL), (3, emails[3], INVALID, PROBED),
+                     (4, emails[4], VALID, DUPLICATE), (5, emails[5], INVALID, DUPLICATE)]
+    assert servers['fast'].stats['rcpt'] == 3  # The catch-all canary and two mailboxes
+
+def test_canonicalize_folds_provider_spellings():
+    emails = ['ok.jdoe@gmail.com', 'okjdoe+news@googlemail.com', 'OK.J.Doe@gmail.com']
+    recorder = Recorder()
+    assert [stage for *_, stage in run(Pipeline(recorder, ListChecker(), canonicalize=True), emails)] == \
+        [PROBED, DUPLICATE, DUPLICATE]
+    assert recorder.probed == ['okjdoe@gmail.com']
+    recorder = Recorder()
+    run(Pipeline(recorder, ListChecker()), emails)
+    assert len(recorder.probed) == 3
+
+def test_duplicates_past_the_dedup_memory_are_probed_again():
+    recorder = Recorder()
+    emails = ['ok0@a.test', 'ok1@a.test', 'ok2@a.test', 'ok0@a.test', 'ok2@a.test']
+    run(Pipeline(recorder, ListChecker(), window=1, dedup_memory=2), emails)
+    assert recorder.probed == ['ok0@a.test', 'ok1@a.test', 'ok2@a.test', 'ok0@a.test']
+
+def test_fresh_results_come_from_the_store(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.sqlite3'))
+    recorder = Recorder()
+    run(Pipeline(recorder, ListChecker(), store, max_age=3600), ['ok0@a.test', 'no1@a.test'])
+    recorder = Recorder()
+    calls = run(Pipeline(recorder, ListChecker(), store, max_age=3600), ['OK0@a.test', 'no1@a.test', 'ok2@a.test'])
+    assert recorder.probed == ['ok2@a.test']
+    assert sorted(calls) == [(0, 'OK0@a.test', VALID, STORED), (1, 'no1@a.test', INVALID, STORED),
+                             (2, 'ok2@a.test', VALID, PROBED)]
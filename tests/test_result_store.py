@@ -0,0 +1,60 @@
+import sqlite3
+import time
+
+from emailverifier import result_store
+from emailverifier.result_store import ResultStore, StoredResult
+from emailverifier.smtp_session import INVALID, UNKNOWN, VALID
+
+# Durable per-address results: what is kept, for how long, and older databases
+
+def test_results_are_kept_under_the_normalized_address(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.sqlite3'))
+    store.add(' OK@Example.com', VALID, 'Valid (SMTP accepted)', 'mx.example.com', 250)
+    store.flush()
+    hit = ResultStore(str(tmp_path / 'results.sqlite3')).lookup(['ok@example.com', 'other@example.com'], 3600)
+    assert list(hit) == ['ok@example.com']
+    assert hit['ok@example.com'][:5] == (VALID, 'Valid (SMTP accepted)', 'mx.example.com', 250, None)
+    assert hit['ok@example.com'].catch_all is False
+
+def test_temporary_failures_are_not_kept(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.sqlite3'))
+    store.add('a@example.com', UNKNOWN, 'Unknown (timeout)', 'mx.example.com')
+    store.add('b@example.com', INVALID, 'Invalid (SMTP rejected)', 'mx.example.com')  # No RCPT code: no answer
+    store.add('c@example.com', INVALID, 'Catch-all domain', 'mx.example.com', catch_all=True)
+    store.add('d@example.com', INVALID, 'No MX record (domain inactive)')
+    store.flush()
+    hits = store.lookup(['a@example.com', 'b@example.com', 'c@example.com', 'd@example.com'], 3600)
+    assert sorted(hits) == ['c@example.com', 'd@example.com']
+    assert hits['c@example.com'].catch_all is True
+
+def test_only_fresh_results_are_returned(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.sqlite3'))
+    store.add('a@example.com', VALID, 'Valid', 'mx.example.com', 250)
+    store.flush()
+    time.sleep(0.05)
+    assert store.lookup(['a@example.com'], 0.01) == {}
+    cached, to_probe = store.split_fresh(['b@example.com', 'A@example.com'], 3600)
+    assert [email for email, _ in cached] == ['A@example.com'] and to_probe == ['b@example.com']
+
+def test_writes_are_batched(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_store, 'FLUSH_EVERY', 3)
+    store = ResultStore(str(tmp_path / 'results.sqlite3'))
+    reader = ResultStore(str(tmp_path / 'results.sqlite3'))
+    emails = [f'{i}@example.com' for i in range(4)]
+    for email in emails:
+        store.add(email, VALID, 'Valid', 'mx.example.com', 250)
+    assert sorted(reader.lookup(emails, 3600)) == emails[:3]
+    store.flush()
+    assert sorted(reader.lookup(emails, 3600)) == emails
+
+def test_older_databases_gain_the_catch_all_column(tmp_path):
+    path = str(tmp_path / 'results.sqlite3')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE results (email TEXT PRIMARY KEY, status TEXT NOT NULL, reason TEXT, mx TEXT, "
+                 "smtp_code INTEGER, suggestion TEXT, checked_at REAL NOT NULL)")
+    conn.execute("INSERT INTO results VALUES ('a@example.com', ?, 'Valid', 'mx.example.com', 250, NULL, ?)",
+                 (VALID, time.time()))
+    conn.commit()
+    conn.close()
+    hit = ResultStore(path).lookup(['a@example.com'], 3600)['a@example.com']
+    assert hit == StoredResult(VALID, 'Valid', 'mx.example.com', 250, None, hit.checked_at, False)
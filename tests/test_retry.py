@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from emailverifier.backends import SMTPBackend
+from emailverifier.catch_all import CatchAllCache
+from emailverifier.dns_cache import DNSCache
+from emailverifier.pipeline import THOROUGH
+from emailverifier.retry import RetryQueue
+from emailverifier.smtp_session import INVALID, UNKNOWN, VALID
+
+# Delayed retries of temporary failures, down to greylisting on the fake farm
+
+def test_items_come_back_after_their_backoff():
+    retry = RetryQueue(lambda result: result == 'temporary', (0.05, 0.1))
+    retry.schedule('b', 1)
+    retry.schedule('a', 0)
+    assert len(retry) == 2 and retry.due() == []
+    assert 0 < retry.wait_time() <= 0.05
+    time.sleep(0.06)
+    assert retry.due() == [('a', 1)]
+    time.sleep(0.05)
+    assert retry.due() == [('b', 2)]
+    assert len(retry) == 0 and retry.wait_time() is None
+
+def test_wants_only_retryable_results_while_delays_remain():
+    retry = RetryQueue(lambda result: result == 'temporary', (1, 2))
+    assert retry.wants('temporary', 0) and retry.wants('temporary', 1)
+    assert not retry.wants('temporary', 2)
+    assert not retry.wants('ok', 0)
+
+@pytest.mark.parametrize('profile', [dict(session_reuse=True), dict(session_reuse=False),
+                                     dict(session_reuse=True, async_engine=True),
+                                     dict(session_reuse=False, async_engine=True)],
+                         ids=['grouped', 'each', 'async-grouped', 'async-each'])
+@pytest.mark.parametrize('retry_delays', [(), (0.05,)], ids=['no-retries', 'retries'])
+def test_greylisted_addresses_are_retried(tmp_path, farm_dns, servers, profile, retry_delays):
+    path = str(tmp_path / 'cache.sqlite3')
+    profile = THOROUGH._replace(per_host_rate=0, adaptive=False, catch_all_check=False, retry_delays=retry_delays,
+                                **profile)
+    domain = farm_dns('greylist')
+    emails = [f"{'ok' if i % 2 else 'no'}{i}@{domain}" for i in range(40)]
+    results = dict(SMTPBackend(profile, DNSCache(path), CatchAllCache(path)).verify(emails))
+    assert servers['greylist'].stats['greylisted'] > 0
+    if retry_delays:
+        assert {email: result.status for email, result in results.items()} == \
+            {email: VALID if email.startswith('ok') else INVALID for email in emails}
+    else:
+        assert UNKNOWN in {result.status for result in results.values()}
@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+from emailverifier.roles import ROLE_SEPARATORS, RoleMatcher
+
+# RoleMatcher against the linear scan it replaces
+
+def reference(prefixes, separators, local):
+    return any(local == p or local.startswith(p + sep) for p in prefixes for sep in separators)
+
+def random_string(rng, alphabet, longest):
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, longest)))
+
+@pytest.mark.parametrize('separators', [ROLE_SEPARATORS, ('.', '-', '_', ''), ('-',)])
+@pytest.mark.parametrize('seed', range(5))
+def test_agrees_with_linear_scan(separators, seed):
+    rng = random.Random(seed)
+    prefixes = {random_string(rng, 'ab', 3) for _ in range(rng.randint(0, 8))} - {''}
+    matcher = RoleMatcher(prefixes, separators)
+    for _ in range(1000):
+        local = random_string(rng, 'ab.-_+', 6)
+        assert matcher(local) == reference(prefixes, separators, local), (prefixes, local)
+
+def test_examples():
+    matcher = RoleMatcher(['info', 'sales', 'admin'])
+    assert matcher('info') and matcher('info.sales') and matcher('sales-eu') and matcher('admin_1')
+    assert not matcher('information') and not matcher('jane') and not matcher('')
+    assert RoleMatcher(['info'], ROLE_SEPARATORS + ('',))('information')
+
+def test_regex_characters_are_literal():
+    matcher = RoleMatcher(['a+b', 'c.d'])
+    assert matcher('a+b') and matcher('c.d-x')
+    assert not matcher('aab') and not matcher('cxd')
+
+def test_no_prefixes_match_nothing():
+    assert not RoleMatcher([])('info')
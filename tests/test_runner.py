@@ -0,0 +1,86 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from emailverifier.retry import RetryQueue
+from emailverifier.runner import iter_chunks, verify_each, verify_grouped
+
+# The streaming runners: results as they complete, and never more than the
+# window's worth of input read ahead of them (retries waiting included)
+
+class Source:
+    # An input iterable that records how far it has been read
+    def __init__(self, n):
+        self.emails = [f"{'ok' if i % 3 else 'retry'}{i}@d{i % 4}.test" for i in range(n)]
+        self.read = 0
+
+    def __iter__(self):
+        for email in self.emails:
+            self.read += 1
+            yield email
+
+class Verifier:
+    # verify_email / verify_domain that answer after a short pause; "retry*"
+    # addresses are 'temporary' on their first attempt
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def attempt(self, email):
+        with self.lock:
+            self.calls[email] = self.calls.get(email, 0) + 1
+            return self.calls[email]
+
+    def email(self, email):
+        time.sleep(0.002)
+        return 'temporary' if email.startswith('retry') and self.attempt(email) == 1 else 'ok'
+
+    def domain(self, domain, emails):
+        return {email: self.email(email) for email in emails}
+
+def drain(results, source, window):
+    # The results, checking the read-ahead as each one arrives
+    out = []
+    for email, result in results:
+        out.append((email, result))
+        assert source.read - len(out) <= window
+    return out
+
+def retry_queue():
+    return RetryQueue(lambda result: result == 'temporary', (0.01,))
+
+@pytest.mark.parametrize('retry', [None, retry_queue], ids=['no-retries', 'retries'])
+def test_verify_each_reads_at_most_a_window_ahead(retry):
+    source, verifier = Source(200), Verifier()
+    with ThreadPoolExecutor(8) as executor:
+        out = drain(verify_each(executor, source, verifier.email, 10, retry and retry()), source, 10)
+    assert sorted(email for email, _ in out) == sorted(source.emails)
+    assert {result for _, result in out} == ({'ok'} if retry else {'ok', 'temporary'})
+
+@pytest.mark.parametrize('retry', [None, retry_queue], ids=['no-retries', 'retries'])
+def test_verify_grouped_reads_at_most_a_window_ahead(retry):
+    source, verifier = Source(200), Verifier()
+    with ThreadPoolExecutor(8) as executor:
+        out = drain(verify_grouped(executor, source, None, verifier.domain, 10, retry and retry()), source, 10)
+    assert sorted(email for email, _ in out) == sorted(source.emails)
+    assert {result for _, result in out} == ({'ok'} if retry else {'ok', 'temporary'})
+
+def test_verify_grouped_groups_by_domain_and_runs_local_checks():
+    domains = []
+
+    def verify_domain(domain, emails):
+        domains.append((domain, emails))
+        return {email: 'ok' for email in emails}
+
+    emails = [' A@x.test', 'bad', 'b@x.test', 'c@y.test', 'a@x.test']
+    with ThreadPoolExecutor(2) as executor:
+        out = dict(verify_grouped(executor, emails, lambda email: 'local' if '@' not in email else None,
+                                  verify_domain))
+    assert out == {' A@x.test': 'ok', 'bad': 'local', 'b@x.test': 'ok', 'c@y.test': 'ok', 'a@x.test': 'ok'}
+    assert sorted(domains) == [('x.test', ['a@x.test', 'b@x.test']), ('y.test', ['c@y.test'])]
+
+def test_iter_chunks():
+    assert list(iter_chunks(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(iter_chunks([], 3)) == []
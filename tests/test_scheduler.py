@@ -0,0 +1,123 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+from emailverifier.scheduler import MXScheduler, TokenBucket, then
+from emailverifier.smtp_session import INVALID, VALID, smtp_check
+
+# Per-MX-host pacing: connection caps, rate tokens, delayed and chained jobs
+
+class Peak:
+    # A job function that records how many calls ran at once, per host
+    def __init__(self, seconds=0.02):
+        self.seconds = seconds
+        self.running = {}
+        self.peak = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, item):
+        host = item.split('@')[1]
+        with self.lock:
+            self.running[host] = self.running.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.running[host])
+        time.sleep(self.seconds)
+        with self.lock:
+            self.running[host] -= 1
+        return item
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(20) as executor:
+        yield executor
+
+def by_domain(item):
+    return item.split('@')[1]
+
+def test_sessions_per_host_are_capped(executor):
+    peak = Peak()
+    with MXScheduler(executor, by_domain, rate=0, max_connections=2) as scheduler:
+        futures = [scheduler.submit(peak, f'{i}@{host}') for i in range(10) for host in ('a', 'b')]
+        assert sorted(future.result() for future in futures) == sorted(f'{i}@{h}' for i in range(10) for h in 'ab')
+    assert peak.peak == {'a': 2, 'b': 2}
+
+def test_busy_server_never_refuses(executor, mx, servers):
+    # The busy server takes 3 sessions at once and answers 421 to a 4th
+    emails = [f"{'ok' if i % 2 else 'no'}{i}@example.com" for i in range(20)]
+    with MXScheduler(executor, lambda email: mx['busy'], rate=0, max_connections=3) as scheduler:
+        futures = {email: scheduler.submit(smtp_check, email, mx['busy']) for email in emails}
+        assert {email: future.result().status for email, future in futures.items()} == \
+            {email: VALID if email.startswith('ok') else INVALID for email in emails}
+    assert servers['busy'].stats['refused'] == 0
+
+def test_rate_is_per_host(executor):
+    started = {}
+
+    def job(item):
+        started.setdefault(item.split('@')[1], []).append(time.monotonic())
+
+    with MXScheduler(executor, by_domain, rate=20, burst=2, max_connections=10) as scheduler:
+        futures = [scheduler.submit(job, f'{i}@slow') for i in range(6)]
+        fast = [scheduler.submit(job, f'{i}@{i}.fast') for i in range(6)]
+        for future in futures + fast:
+            future.result()
+    # Two tokens up front, then one every 50 ms; each other host has its own bucket
+    assert started['slow'][-1] - started['slow'][0] >= 0.18
+    assert all(len(times) == 1 for host, times in started.items() if host != 'slow')
+
+def test_items_without_a_host_are_not_throttled(executor):
+    peak = Peak()
+    with MXScheduler(executor, lambda item: None, rate=1, burst=1, max_connections=1) as scheduler:
+        for future in [scheduler.submit(peak, f'{i}@none') for i in range(10)]:
+            future.result()
+    assert peak.peak['none'] > 1
+
+def test_submit_to_waits_out_its_delay(executor):
+    with MXScheduler(executor, by_domain, rate=0) as scheduler:
+        start = time.monotonic()
+        later = scheduler.submit_to('a', lambda item: time.monotonic(), 'x@a', delay=0.1)
+        now = scheduler.submit_to('a', lambda item: time.monotonic(), 'y@a')
+        assert now.result() - start < 0.1 <= later.result() - start
+
+def test_a_returned_future_frees_the_slot(executor):
+    pending = Future()
+    with MXScheduler(executor, by_domain, rate=0, max_connections=1) as scheduler:
+        chained = scheduler.submit(lambda item: pending, 'x@a')
+        assert scheduler.submit(lambda item: item, 'y@a').result(timeout=2) == 'y@a'
+        assert not chained.done()
+        pending.set_result('done')
+        assert chained.result(timeout=2) == 'done'
+
+def test_close_drops_queued_jobs(executor):
+    scheduler = MXScheduler(executor, by_domain, rate=1, burst=1)
+    futures = [scheduler.submit_to('a', lambda item: item, f'{i}@a') for i in range(5)]
+    delayed = scheduler.submit_to('b', lambda item: item, 'x@b', delay=10)
+    futures[0].result(timeout=2)
+    scheduler.close()
+    assert all(future.cancelled() for future in futures[1:] + [delayed])
+    assert scheduler.submit_to('a', lambda item: item, 'late@a').cancelled()
+
+def test_then_chains_results_errors_and_futures():
+    source = Future()
+    inner = Future()
+    chained = then(source, lambda value: inner if value == 'wait' else value * 2)
+    source.set_result('wait')
+    assert not chained.done()
+    inner.set_result(42)
+    assert chained.result() == 42
+    failed = Future()
+    errors = then(failed, lambda value: value)
+    failed.set_exception(ValueError('boom'))
+    with pytest.raises(ValueError):
+        errors.result()
+    cancelled = Future()
+    follower = then(cancelled, lambda value: value)
+    cancelled.cancel()
+    assert follower.cancelled()
+
+def test_token_bucket():
+    bucket = TokenBucket(10, 2)
+    assert bucket.take() == 0 and bucket.take() == 0
+    assert 0 < bucket.take() <= 0.1
+    assert TokenBucket(0, 1).take() == 0
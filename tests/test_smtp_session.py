@@ -0,0 +1,95 @@
+import gc
+import socket
+import threading
+import time
+import warnings
+
+import pytest
+
+from emailverifier.smtp_session import HELO, INVALID, RCPT, UNKNOWN, VALID, smtp_check, smtp_probe_many, smtp_rcpt_many
+
+# smtplib probing against the fake farm: many recipients per session, caps, and MX fallback
+
+def addresses(n, domain='example.com'):
+    # Alternating existing (ok*) and unknown (no*) mailboxes
+    return [f"{'ok' if i % 2 else 'no'}{i}@{domain}" for i in range(n)]
+
+def expected(email):
+    return VALID if email.startswith('ok') else INVALID
+
+@pytest.fixture
+def rejecting_mx():
+    # "host:port" of a server that greets, then answers every command 554
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(10)
+
+    def serve():
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return
+            with conn, conn.makefile('rb') as f:
+                conn.sendall(b'220 reject.test ESMTP\r\n')
+                for line in f:
+                    conn.sendall(b'554 5.7.1 Go away\r\n')
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield '127.0.0.1:%d' % sock.getsockname()[1]
+    sock.close()
+
+def test_recipients_share_one_session(mx, servers):
+    emails = addresses(30)
+    probes = smtp_rcpt_many(emails, mx['fast'], rcpt_per_transaction=7)
+    assert {email: probe.status for email, probe in probes.items()} == {email: expected(email) for email in emails}
+    assert servers['fast'].stats['connections'] == 1
+    assert servers['fast'].stats['rcpt'] == 30
+
+def test_max_rcpt_starts_a_new_session(mx, servers):
+    smtp_rcpt_many(addresses(25), mx['fast'], max_rcpt=10)
+    assert servers['fast'].stats['connections'] == 3
+
+def test_server_recipient_cap_starts_a_new_transaction(mx, servers):
+    # The strict server answers 452 after 10 RCPTs in a transaction
+    emails = addresses(25)
+    probes = smtp_rcpt_many(emails, mx['strict'], rcpt_per_transaction=20)
+    assert {probe.code for probe in probes.values()} == {250, 550}
+    assert servers['strict'].stats['connections'] == 1
+
+def test_dead_mx_fails_every_address(dead_mx):
+    probes = smtp_rcpt_many(addresses(3), dead_mx, timeout=0.5)
+    assert {(probe.status, probe.code, probe.phase) for probe in probes.values()} == {(UNKNOWN, None, 'connect')}
+
+def test_probe_many_tries_the_next_mx(mx):
+    # fast rejects no* mailboxes, catchall accepts them
+    emails = addresses(6)
+    probes = smtp_probe_many(emails, [mx['fast'], mx['catchall']])
+    assert all(probe.status == VALID for probe in probes.values())
+    assert {email: probes[email].mx for email in emails} == \
+        {email: mx['fast'] if email.startswith('ok') else mx['catchall'] for email in emails}
+
+def test_probe_many_skips_a_dead_mx(mx, dead_mx):
+    emails = addresses(4)
+    probes = smtp_probe_many(emails, [dead_mx, mx['fast']], timeout=0.5)
+    assert {email: (probes[email].mx, probes[email].status) for email in emails} == \
+        {email: (mx['fast'], expected(email)) for email in emails}
+
+@pytest.mark.parametrize('mx_pause', [0, 0.3])
+def test_mx_pause(mx, mx_pause):
+    start = time.monotonic()
+    smtp_probe_many(['no1@example.com'], [mx['fast'], mx['fast'], mx['fast']], mx_pause=mx_pause)
+    elapsed = time.monotonic() - start
+    assert elapsed >= 2 * mx_pause and elapsed < 2 * mx_pause + 0.2
+
+def test_check_closes_rejected_sessions(rejecting_mx):
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', ResourceWarning)
+        probe = smtp_check('ok1@example.com', rejecting_mx)
+        gc.collect()
+    assert (probe.code, probe.phase) == (554, HELO)
+    assert not [w for w in caught if issubclass(w.category, ResourceWarning)]
+
+def test_check(mx):
+    assert smtp_check('ok1@example.com', mx['fast'])[1:] == (250, '2.1.5', RCPT)
+    assert smtp_check('no1@example.com', mx['fast']).status == INVALID
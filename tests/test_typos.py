@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from emailverifier.typos import TypoSuggester, edit_distance
+
+# TypoSuggester and edit_distance against plain dynamic programming over the whole list
+
+def reference_distance(s1, s2):
+    # Optimal string alignment distance, without any cut-off
+    d = [[i + j if i * j == 0 else 0 for j in range(len(s2) + 1)] for i in range(len(s1) + 1)]
+    for i in range(1, len(s1) + 1):
+        for j in range(1, len(s2) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (s1[i - 1] != s2[j - 1]))
+            if i > 1 and j > 1 and s1[i - 1] == s2[j - 2] and s1[i - 2] == s2[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+def reference_suggestion(domains, domain, max_distance):
+    # Closest domain within max_distance; the earliest one wins ties
+    if domain in domains:
+        return None
+    best, best_distance = None, max_distance + 1
+    for candidate in domains:
+        distance = reference_distance(domain, candidate)
+        if distance < best_distance:
+            best, best_distance = candidate, distance
+    return best
+
+def random_word(rng, longest=6):
+    return ''.join(rng.choice('abc') for _ in range(rng.randint(0, longest)))
+
+@pytest.mark.parametrize('seed', range(5))
+def test_edit_distance(seed):
+    rng = random.Random(seed)
+    for _ in range(2000):
+        s1, s2, limit = random_word(rng), random_word(rng), rng.randint(0, 3)
+        assert edit_distance(s1, s2, limit) == min(reference_distance(s1, s2), limit + 1), (s1, s2, limit)
+
+def test_swapped_neighbours_are_one_edit():
+    assert edit_distance('gmial.com', 'gmail.com', 2) == 1
+
+@pytest.mark.parametrize('max_distance', [1, 2])
+@pytest.mark.parametrize('seed', range(5))
+def test_suggest_agrees_with_reference(max_distance, seed):
+    rng = random.Random(seed)
+    domains = list(dict.fromkeys(random_word(rng, 4) + '.com' for _ in range(30)))
+    suggester = TypoSuggester(domains, max_distance=max_distance, corrections={})
+    for _ in range(500):
+        domain = random_word(rng, 5) + rng.choice(['.com', '.cm', 'com'])
+        assert suggester.suggest(domain) == reference_suggestion(domains, domain, max_distance), domain
+
+def test_known_domains_are_not_typos():
+    suggester = TypoSuggester(['gmail.com', 'gmai.com'], corrections={})
+    assert suggester.suggest('gmai.com') is None
+    assert suggester.suggest('GMAIL.COM') is None
+    assert suggester.suggest('Gmial.com') == 'gmail.com'
+
+def test_corrections_come_first():
+    suggester = TypoSuggester(['gmail.com', 'mail.com'], corrections={'gmai.com': 'mail.com'})
+    assert suggester.suggest('gmai.com') == 'mail.com'
+    assert suggester.suggest('gmaill.com') == 'gmail.com'
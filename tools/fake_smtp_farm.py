@@ -0,0 +1,233 @@
+import argparse
+import asyncio
+import threading
+import time
+import zlib
+
+import dns.flags
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+
+# Local mail servers and a stub DNS server for benchmarking the verifiers
+# without touching the internet. Domain d<N>.bench.test is served by server
+# N % (number of servers); its MX record points at "127.0.0.1:<port>", which
+# smtplib and the async engine both read as host:port. Any other domain is
+# NXDOMAIN. Mailboxes whose local part starts with "ok" exist, everything
+# else gets 550 (unless the server is catch-all).
+#
+#   python tools/fake_smtp_farm.py --servers fast,slow,greylist,tarpit --dns-port 5300
+#   (then point dnspython at 127.0.0.1:5300, see benchmarks/bench_verifiers.py)
+
+BASE_PORT = 2600                           # First mail server's port, the rest follow
+DNS_PORT = 5300
+DOMAIN_SUFFIX = '.bench.test'
+MX_TTL = 300
+
+# Behaviour of one mail server:
+#   latency       seconds before every reply
+#   banner_delay  seconds before the 220 greeting (tarpitting)
+#   greylist      share of recipients answered 451 on their first RCPT
+#   catch_all     accept every recipient
+#   max_rcpt      recipients per MAIL transaction before 452 (0 = no limit)
+#   max_connections  simultaneous sessions; more get "421 Too many connections" (0 = no limit)
+PROFILES = {
+    'fast': {},
+    'slow': {'latency': 0.05},
+    'greylist': {'latency': 0.005, 'greylist': 0.5},
+    'tarpit': {'latency': 0.5, 'banner_delay': 3.0},
+    'strict': {'latency': 0.01, 'max_rcpt': 10},
+    'catchall': {'latency': 0.005, 'catch_all': True},
+    'busy': {'latency': 0.02, 'max_connections': 3},
+}
+
+def domain_index(domain):
+    # d<N>.bench.test -> N, anything else -> None
+    if not domain.endswith(DOMAIN_SUFFIX) or not domain.startswith('d'):
+        return None
+    number = domain[1:-len(DOMAIN_SUFFIX)]
+    return int(number) if number.isdigit() else None
+
+def share(value, salt):
+    # Stable pseudo-random number in [0, 1) for an address
+    return zlib.crc32(salt + value.encode('utf-8')) / 2 ** 32
+
+class MailServer:
+    # One fake MX speaking just enough SMTP for RCPT probing
+
+    def __init__(self, port, latency=0.0, banner_delay=0.0, greylist=0.0, catch_all=False, max_rcpt=0,
+                 max_connections=0):
+        self.port = port
+        self.latency = latency
+        self.banner_delay = banner_delay
+        self.greylist = greylist
+        self.catch_all = catch_all
+        self.max_rcpt = max_rcpt
+        self.max_connections = max_connections
+        self.open = 0
+        self.reset()
+
+    def reset(self):
+        self.greylisted = set()
+        self.stats = {'connections': 0, 'refused': 0, 'rcpt': 0, 'accepted': 0, 'rejected': 0, 'greylisted': 0}
+
+    def rcpt_reply(self, address, rcpt_in_transaction):
+        self.stats['rcpt'] += 1
+        if self.max_rcpt and rcpt_in_transaction > self.max_rcpt:
+            return b'452 4.5.3 Too many recipients'
+        if self.greylist and address not in self.greylisted and share(address, b'grey') < self.greylist:
+            self.greylisted.add(address)
+            self.stats['greylisted'] += 1
+            return b'451 4.7.1 Greylisted, try again later'
+        if self.catch_all or address.split('@')[0].startswith('ok'):
+            self.stats['accepted'] += 1
+            return b'250 2.1.5 OK'
+        self.stats['rejected'] += 1
+        return b'550 5.1.1 No such user'
+
+    async def handle(self, reader, writer):
+        self.stats['connections'] += 1
+        if self.max_connections and self.open >= self.max_connections:
+            self.stats['refused'] += 1
+            writer.write(b'421 4.7.0 Too many connections, try again later\r\n')
+            writer.close()
+            return
+        self.open += 1
+        rcpt_in_transaction = 0
+        try:
+            await asyncio.sleep(self.banner_delay)
+            writer.write(b'220 bench.test ESMTP\r\n')
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode('utf-8', 'replace').strip()
+                verb = command[:4].upper()
+                await asyncio.sleep(self.latency)
+                if verb in ('EHLO', 'HELO', 'NOOP'):
+                    reply = b'250 OK'
+                elif verb in ('MAIL', 'RSET'):
+                    rcpt_in_transaction = 0
+                    reply = b'250 OK'
+                elif verb == 'RCPT':
+                    rcpt_in_transaction += 1
+                    reply = self.rcpt_reply(command.split(':', 1)[-1].strip(' <>').lower(), rcpt_in_transaction)
+                elif verb == 'QUIT':
+                    writer.write(b'221 Bye\r\n')
+                    await writer.drain()
+                    break
+                else:
+                    reply = b'502 5.5.2 Command not recognized'
+                writer.write(reply + b'\r\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.open -= 1
+            writer.close()
+
+class StubDNS(asyncio.DatagramProtocol):
+    # Answers MX queries for the farm's domains, NXDOMAIN for the rest
+
+    def __init__(self, farm, latency=0.0):
+        self.farm = farm
+        self.latency = latency
+        self.queries = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.queries += 1
+        try:
+            query = dns.message.from_wire(data)
+        except Exception:
+            return
+        response = dns.message.make_response(query)
+        response.flags |= dns.flags.AA
+        question = query.question[0]
+        mx_host = self.farm.mx_for(question.name.to_text(omit_final_dot=True).lower())
+        if mx_host is None:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        elif question.rdtype == dns.rdatatype.MX:
+            response.answer.append(dns.rrset.from_text(question.name, MX_TTL, 'IN', 'MX', f'10 {mx_host}.'))
+        wire = response.to_wire()
+        if self.latency:
+            asyncio.get_running_loop().call_later(self.latency, self.transport.sendto, wire, addr)
+        else:
+            self.transport.sendto(wire, addr)
+
+class Farm:
+    # The mail servers plus stub DNS on one event loop in a helper thread:
+    #   with Farm(['fast', 'greylist']) as farm: ...
+
+    def __init__(self, profiles, base_port=BASE_PORT, dns_port=DNS_PORT, dns_latency=0.0, host='127.0.0.1'):
+        self.host = host
+        self.dns_port = dns_port
+        self.profiles = list(profiles)
+        self.servers = [MailServer(base_port + i, **PROFILES[name]) for i, name in enumerate(self.profiles)]
+        self.dns = StubDNS(self, dns_latency)
+        self._loop = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def mx_for(self, domain):
+        index = domain_index(domain)
+        if index is None:
+            return None
+        return f"{self.host}:{self.servers[index % len(self.servers)].port}"
+
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+
+        async def listen():
+            for server in self.servers:
+                await asyncio.start_server(server.handle, self.host, server.port, backlog=1024)
+            await self._loop.create_datagram_endpoint(lambda: self.dns, local_addr=(self.host, self.dns_port))
+
+        self._loop.run_until_complete(listen())
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def reset(self):
+        # Forget greylisting state and counters, e.g. between benchmark targets
+        for server in self.servers:
+            server.reset()
+        self.dns.queries = 0
+
+    def stats(self):
+        return {'dns_queries': self.dns.queries,
+                'servers': {f"{name}:{server.port}": dict(server.stats) for name, server in zip(self.profiles, self.servers)}}
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake mail servers and stub DNS for benchmarks")
+    parser.add_argument('--servers', default='fast,slow,greylist,tarpit,strict',
+                        help=f"Comma-separated profiles, one server each ({', '.join(PROFILES)})")
+    parser.add_argument('--base-port', type=int, default=BASE_PORT)
+    parser.add_argument('--dns-port', type=int, default=DNS_PORT)
+    parser.add_argument('--dns-latency', type=float, default=0.0, help="Seconds before each DNS answer")
+    args = parser.parse_args()
+    with Farm(args.servers.split(','), args.base_port, args.dns_port, args.dns_latency) as farm:
+        for name, server in zip(farm.profiles, farm.servers):
+            print(f"{name:10} 127.0.0.1:{server.port}")
+        print(f"DNS        127.0.0.1:{args.dns_port} (udp), domains d<N>{DOMAIN_SUFFIX}")
+        try:
+            while True:
+                time.sleep(10)
+                print(farm.stats())
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+import argparse
+import csv
+import io
+import json
+import os
+import threading
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Local stand-in for the DeBounce single and bulk APIs, for testing without
+# spending credits. Answers are derived from the local part:
+#   bad* -> 7 (undeliverable), disp* -> 5 (disposable), catch* -> 8 (catch-all),
+#   unk* -> 6 (unknown), anything else -> 10 (deliverable)
+# Requests have the real APIs' shape: all GET, and a bulk list is uploaded as
+# upload/?api=KEY&url=LINK, the mock downloading the CSV/TXT file at LINK
+# itself (it must be http(s)). With --lists DIR it also publishes DIR under
+# /lists/, standing in for the web server the lists need in production:
+#
+#   python tools/mock_debounce.py --port 8765 --lists /tmp/debounce_lists
+#   DEBOUNCE_API_URL=http://127.0.0.1:8765/v1/ DEBOUNCE_BULK_URL=http://127.0.0.1:8765/bulk/v1/ \
+#   DEBOUNCE_LIST_DIR=/tmp/debounce_lists DEBOUNCE_LIST_URL=http://127.0.0.1:8765/lists/ \
+#       streamlit run email_verifier_debounce_gui.py
+# (any API key works)
+
+RULES = [('bad', '7', 'Invalid'), ('disp', '5', 'Disposable'), ('catch', '8', 'Accept-All'), ('unk', '6', 'Unknown')]
+POLLS_UNTIL_DONE = 3                       # Status calls before a list reports completed
+FETCH_TIMEOUT = 15                         # Seconds to download an uploaded list's file
+
+lists = {}
+stats = {'single': 0, 'upload': 0, 'status': 0, 'download': 0, 'connections': 0}
+lock = threading.Lock()
+published = {'dir': None}                  # Directory served under /lists/ (--lists)
+
+def answer(email):
+    local = email.split('@')[0].lower()
+    for prefix, code, result in RULES:
+        if local.startswith(prefix):
+            return code, result
+    return '10', 'Safe to Send'
+
+def fetch_list(link):
+    # The addresses in the CSV/TXT file at link: first column, rows without an @ (a header) skipped
+    with urllib.request.urlopen(link, timeout=FETCH_TIMEOUT) as response:
+        text = response.read().decode('utf-8-sig')
+    return [row[0].strip() for row in csv.reader(io.StringIO(text)) if row and '@' in row[0]]
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'          # Keep-alive, like the real API
+
+    def setup(self):
+        super().setup()
+        with lock:
+            stats['connections'] += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, body, content_type='application/json', status=200):
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_json(self, payload, status=200):
+        self.send(json.dumps(payload), status=status)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == '/stats':
+            return self.send_json(stats)
+        if url.path.startswith('/lists/'):
+            path = os.path.join(published['dir'] or '', os.path.basename(url.path))
+            if published['dir'] is None or not os.path.isfile(path):
+                return self.send('not found', 'text/plain', 404)
+            with open(path, 'rb') as f:
+                return self.send(f.read(), 'text/csv')
+        if 'download' not in url.path and not query.get('api'):
+            return self.send_json({'debounce': {'error': 'Wrong API'}, 'success': '0'})
+
+        if url.path == '/v1/':
+            with lock:
+                stats['single'] += 1
+            email = query.get('email', '')
+            code, result = answer(email)
+            return self.send_json({'debounce': {'email': email, 'code': code, 'reason': result, 'result': result,
+                                                'did_you_mean': ''}, 'success': '1'})
+
+        if url.path == '/bulk/v1/upload/':
+            link = query.get('url', '')
+            if urlparse(link).scheme not in ('http', 'https'):
+                return self.send_json({'debounce': {'error': 'Parameter url must be a public http(s) link to a '
+                                                             'CSV or TXT file'}, 'success': '0'})
+            try:
+                emails = fetch_list(link)
+            except (OSError, ValueError) as e:
+                return self.send_json({'debounce': {'error': f'Could not download the file: {e}'}, 'success': '0'})
+            list_id = uuid.uuid4().hex[:12]
+            with lock:
+                stats['upload'] += 1
+                lists[list_id] = {'emails': emails, 'polls': 0}
+            return self.send_json({'debounce': {'list_id': list_id}, 'success': '1'})
+
+        if url.path == '/bulk/v1/status/':
+            with lock:
+                stats['status'] += 1
+                entry = lists.get(query.get('list_id'))
+                if entry is None:
+                    return self.send_json({'debounce': {'error': 'Unknown list'}, 'success': '0'})
+                entry['polls'] += 1
+                done = entry['polls'] >= POLLS_UNTIL_DONE
+            state = {'list_id': query['list_id'], 'status': 'completed' if done else 'processing',
+                     'percentage': '100' if done else str(100 * entry['polls'] // POLLS_UNTIL_DONE)}
+            if done:
+                state['download_link'] = f"http://{self.headers['Host']}/bulk/download/{query['list_id']}.csv"
+            return self.send_json({'debounce': state, 'success': '1'})
+
+        if url.path.startswith('/bulk/download/'):
+            with lock:
+                stats['download'] += 1
+                entry = lists.get(url.path.rsplit('/', 1)[-1][:-len('.csv')])
+            if entry is None:
+                return self.send('not found', 'text/plain', 404)
+            out = io.StringIO()
+            writer = csv.writer(out)
+            writer.writerow(['email', 'debounce_code', 'debounce_result', 'debounce_reason', 'did_you_mean'])
+            for email in entry['emails']:
+                code, result = answer(email)
+                writer.writerow([email, code, result, result, ''])
+            return self.send(out.getvalue(), 'text/csv')
+
+        self.send('not found', 'text/plain', 404)
+
+    def do_POST(self):
+        # Neither API takes a request body
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send('method not allowed', 'text/plain', 405)
+
+def start(host='127.0.0.1', port=8765, lists_dir=None):
+    published['dir'] = lists_dir
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mock DeBounce API server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--lists', help="Directory to publish under /lists/ (DEBOUNCE_LIST_DIR)")
+    args = parser.parse_args()
+    published['dir'] = args.lists
+    print(f"Mock DeBounce on http://{args.host}:{args.port}/v1/ (bulk: /bulk/v1/, counters: /stats)"
+          + (f", publishing {args.lists} at http://{args.host}:{args.port}/lists/" if args.lists else ''))
+    ThreadingHTTPServer((args.host, args.port), Handler).serve_forever()
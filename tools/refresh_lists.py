@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emailverifier.lists import KEEP_VERSIONS, LISTS_DIR, LIST_TIMEOUT, MAX_SHRINK, SOURCES, activate, read_manifest, refresh_snapshot
+
+# Fetches the disposable / role / free-provider lists, shows what changed
+# since the current snapshot and swaps the new one in. The verifiers never
+# download lists themselves; run this once after cloning, then whenever you
+# want fresher lists (e.g. a daily cron job).
+#
+#   python tools/refresh_lists.py               # refresh (refused if a list looks truncated)
+#   python tools/refresh_lists.py --force       # swap in even so
+#   python tools/refresh_lists.py --show        # current snapshot
+#   python tools/refresh_lists.py --use 20250101-120000   # roll back to a kept snapshot
+
+SAMPLES = 5                                # Added/removed entries printed per list
+
+def show(path):
+    manifest = read_manifest(path)
+    if manifest is None:
+        print(f"No snapshot in {path} yet.")
+        return
+    print(f"Snapshot {manifest['version']} in {path}")
+    for name, info in manifest['lists'].items():
+        print(f"  {name:11} {info['entries']:>8,} entries  {info['source']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the local disposable/role/free list snapshot")
+    parser.add_argument('--dir', default=LISTS_DIR, help="Snapshot directory")
+    parser.add_argument('--timeout', type=float, default=LIST_TIMEOUT, help="Seconds per download")
+    parser.add_argument('--max-shrink', type=float, default=MAX_SHRINK,
+                        help="Refuse a list that lost more than this share of its entries")
+    parser.add_argument('--keep', type=int, default=KEEP_VERSIONS, help="Snapshots kept for rollback")
+    parser.add_argument('--force', action='store_true', help="Swap in even if a list looks truncated")
+    parser.add_argument('--show', action='store_true', help="Show the current snapshot and exit")
+    parser.add_argument('--use', metavar='VERSION', help="Make a kept snapshot current again and exit")
+    args = parser.parse_args()
+
+    if args.show:
+        return show(args.dir)
+    if args.use:
+        if read_manifest(args.dir, args.use) is None:
+            sys.exit(f"No snapshot {args.use} in {args.dir}")
+        activate(args.dir, args.use, keep=0)
+        return show(args.dir)
+
+    version, changes, problems = refresh_snapshot(args.dir, args.timeout, args.max_shrink, args.force, args.keep)
+    for problem in problems:
+        print(f"Warning: {problem}")
+    for name, (added, removed) in changes.items():
+        print(f"{SOURCES[name][0]}: +{len(added):,} -{len(removed):,}")
+        for entry in added[:SAMPLES]:
+            print(f"    + {entry}")
+        for entry in removed[:SAMPLES]:
+            print(f"    - {entry}")
+    if version is None:
+        sys.exit("Snapshot not updated" + (" (a download failed)" if len(changes) < len(SOURCES)
+                                           else " (use --force to swap it in anyway)"))
+    show(args.dir)
+
+if __name__ == '__main__':
+    main()